@@ -3,9 +3,9 @@ Configuration management for the API
 """
 import os
 from pathlib import Path
-from typing import List, Optional
-from pydantic_settings import BaseSettings
-from functools import lru_cache
+from typing import FrozenSet, Optional, Tuple
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import cached_property
 
 
 class Settings(BaseSettings):
@@ -14,7 +14,7 @@ class Settings(BaseSettings):
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 8000
-    api_workers: int = 4
+    api_workers: int = 1  # >1 only takes effect with WEBCAM_ENABLED=False and REDIS_ENABLED=True
     api_reload: bool = False
 
     # Model Configuration
@@ -23,6 +23,15 @@ class Settings(BaseSettings):
     model_conf_threshold: float = 0.25
     model_iou_threshold: float = 0.45
     model_device: str = ""  # Empty for auto-detect
+    model_preload: bool = True  # Load and warm up the video detector at startup
+    model_backend: str = "pytorch"  # "onnxruntime" runs an exported ONNX model (TensorRT/CUDA if available), "tensorrt" a native engine
+    model_onnx_path: str = ""  # Defaults to the weights path with a .onnx suffix
+    model_trt_engine_path: str = ""  # tensorrt backend: prebuilt engine (else built next to the ONNX model and cached)
+    model_compile: bool = False  # torch.compile the PyTorch model on CUDA (PyTorch 2.x)
+    model_compile_mode: str = "reduce-overhead"  # torch.compile mode
+    model_int8: bool = False  # onnxruntime/tensorrt backends: INT8 model calibrated on library footage
+    model_int8_calibration_frames: int = 64  # Frames sampled for INT8 calibration
+    model_int8_calibration_dir: str = ""  # Images/videos from the deployed camera (defaults to the upload dir)
 
     # Detection Classes
     detection_classes: str = "0,56"  # person=0, chair=56
@@ -32,6 +41,13 @@ class Settings(BaseSettings):
     sort_min_hits: int = 2
     sort_iou_threshold: float = 0.2
 
+    # Video Job Batching
+    video_batch_max_size: int = 8  # Max frames (across running jobs) per forward pass
+    video_batch_wait_ms: float = 5.0  # Max time to wait for a batch to fill
+    video_decoder: str = "opencv"  # "decord" decodes job videos in chunks (if installed)
+    motion_gate_threshold: float = 2.0  # Mean gray-level change below which frames skip inference (0 disables)
+    motion_gate_max_skip: int = 30  # Max consecutive frames that reuse the last detections
+
     # Occupancy Configuration
     occupancy_time_threshold: int = 10  # seconds
     occupancy_proximity_threshold: int = 100  # pixels
@@ -47,6 +63,16 @@ class Settings(BaseSettings):
     job_cleanup_after_hours: int = 24
     max_concurrent_jobs: int = 3
     job_timeout_minutes: int = 30
+    cleanup_interval_minutes: int = 10  # How often old jobs are cleaned up in the background
+    job_worker_process: bool = False  # Run video detection in a separate spawned process
+
+    # Webcam Configuration
+    webcam_enabled: bool = True  # Register /api/webcam and /api/process routes
+    webcam_infer_every: int = 3  # Server webcam stream: run the model on every Nth frame (others reuse detections)
+    webcam_cuda_graph: bool = True  # Server webcam stream: replay the PyTorch forward as a captured CUDA graph
+    frame_batch_max_size: int = 8  # Max browser frames per model forward pass
+    frame_batch_wait_ms: float = 10.0  # Max time to wait for a batch to fill
+    realtime_yield_threshold: int = 0  # Batch jobs pause while more real-time frames are in flight
 
     # Logging
     log_level: str = "INFO"
@@ -71,65 +97,92 @@ class Settings(BaseSettings):
     environment: str = "development"
     debug: bool = False
 
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = False
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=False,
+        frozen=True,
+    )
 
-    @property
+    @cached_property
     def base_dir(self) -> Path:
         """Get base directory of the project"""
         return Path(__file__).parent.parent
 
-    @property
+    @cached_property
     def upload_path(self) -> Path:
         """Get upload directory path"""
-        path = self.base_dir / self.upload_dir
-        path.mkdir(parents=True, exist_ok=True)
-        return path
+        return self.base_dir / self.upload_dir
 
-    @property
+    @cached_property
     def output_path(self) -> Path:
         """Get output directory path"""
-        path = self.base_dir / self.output_dir
-        path.mkdir(parents=True, exist_ok=True)
-        return path
+        return self.base_dir / self.output_dir
 
-    @property
+    @cached_property
     def jobs_path(self) -> Path:
         """Get jobs directory path"""
-        path = self.base_dir / self.jobs_dir
-        path.mkdir(parents=True, exist_ok=True)
-        return path
+        return self.base_dir / self.jobs_dir
 
-    @property
+    @cached_property
     def log_path(self) -> Path:
         """Get log file path"""
-        path = self.base_dir / self.log_file
-        path.parent.mkdir(parents=True, exist_ok=True)
-        return path
-
-    @property
+        return self.base_dir / self.log_file
+
+    @cached_property
+    def server_workers(self) -> int:
+        """
+        Number of server processes to run
+
+        Webcam/browser-frame state and the local job store live in one
+        process, so several workers are only safe with the webcam routes
+        off and jobs in Redis
+        """
+        if self.api_reload:
+            return 1  # Reload mode only supports a single worker
+        if self.api_workers > 1 and (self.webcam_enabled or not self.redis_enabled):
+            return 1
+        return max(1, self.api_workers)
+
+    @cached_property
+    def int8_calibration_path(self) -> Path:
+        """Get INT8 calibration frame directory path"""
+        return self.base_dir / self.model_int8_calibration_dir if self.model_int8_calibration_dir else self.upload_path
+
+    @cached_property
     def weights_path(self) -> Path:
         """Get model weights path"""
         return self.base_dir / self.model_weights_path
 
-    @property
-    def allowed_extensions(self) -> List[str]:
-        """Get list of allowed video extensions"""
-        return [ext.strip() for ext in self.allowed_video_extensions.split(",")]
+    @cached_property
+    def allowed_extensions(self) -> Tuple[str, ...]:
+        """Get allowed video extensions (parsed once)"""
+        return tuple(ext.strip() for ext in self.allowed_video_extensions.split(","))
+
+    @cached_property
+    def detection_class_list(self) -> Tuple[int, ...]:
+        """Get detection classes as integers (parsed once)"""
+        return tuple(int(cls.strip()) for cls in self.detection_classes.split(","))
 
-    @property
-    def detection_class_list(self) -> List[int]:
-        """Get list of detection classes as integers"""
-        return [int(cls.strip()) for cls in self.detection_classes.split(",")]
+    @cached_property
+    def allowed_extensions_set(self) -> FrozenSet[str]:
+        """Get normalized allowed extensions for O(1) membership tests"""
+        return frozenset(ext.lower().lstrip('.') for ext in self.allowed_extensions)
 
-    @property
-    def cors_origins_list(self) -> List[str]:
-        """Get list of CORS origins"""
-        if self.cors_origins == "*":
-            return ["*"]
-        return [origin.strip() for origin in self.cors_origins.split(",")]
+    @cached_property
+    def detection_class_set(self) -> FrozenSet[int]:
+        """Get detection classes for O(1) membership tests"""
+        return frozenset(self.detection_class_list)
+
+    @cached_property
+    def cors_origins_list(self) -> Tuple[str, ...]:
+        """Get CORS origins (parsed once)"""
+        return tuple(origin.strip() for origin in self.cors_origins.split(","))
+
+    def ensure_dirs(self):
+        """Create storage directories once at startup"""
+        for path in (self.upload_path, self.output_path, self.jobs_path, self.log_path.parent):
+            path.mkdir(parents=True, exist_ok=True)
 
     def get_redis_url(self) -> str:
         """Get Redis connection URL"""
@@ -138,11 +191,10 @@ class Settings(BaseSettings):
         return f"redis://{self.redis_host}:{self.redis_port}/{self.redis_db}"
 
 
-@lru_cache()
-def get_settings() -> Settings:
-    """Get cached settings instance"""
-    return Settings()
+# Global settings instance - import this directly
+settings = Settings()
 
 
-# Global settings instance
-settings = get_settings()
+def get_settings() -> Settings:
+    """Get the shared settings instance (for FastAPI dependencies)"""
+    return settings
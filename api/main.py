@@ -1,59 +1,133 @@
 """
 FastAPI main application for Library Seat Occupancy Detection
 """
+import asyncio
 import logging
+import time
+import orjson
 from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import ORJSONResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from api.config import settings
-from api.routes import detection, webcam, webcam_browser
-from api.models.schemas import HealthResponse, ErrorResponse
+from api.routes import detection
+from api.responses import NumpyORJSONResponse
+from api.models.schemas import HealthResponse
 from api.services.job_manager import get_job_manager
+from api.services.inference_arbiter import get_inference_arbiter
+from api.services.batch_worker import get_batch_worker
 from api.models.database import init_db
+from api.services.database_service import get_database_service
+
+# Resolved once at import
+_LOG_LEVEL = logging.getLevelName(settings.log_level.upper())
+if not isinstance(_LOG_LEVEL, int):
+    _LOG_LEVEL = logging.INFO
+_CORS_ORIGINS = list(settings.cors_origins_list)
+
+# (second, iso string) - response timestamps only need ~1s granularity
+_ts_cache = (0, "")
+
+
+def _timestamp() -> str:
+    """Return the current local ISO timestamp, rebuilt at most once per second"""
+    global _ts_cache
+    sec = int(time.time())
+    if sec != _ts_cache[0]:
+        # astimezone() looks the offset up for this second, so DST changes apply
+        _ts_cache = (sec, datetime.fromtimestamp(sec).astimezone().isoformat())
+    return _ts_cache[1]
 
 # Configure logging
 logging.basicConfig(
-    level=getattr(logging, settings.log_level),
+    level=_LOG_LEVEL,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
 
+async def _cleanup_loop(job_manager):
+    """Periodically remove old completed/failed jobs off the event loop"""
+    while True:
+        try:
+            await asyncio.to_thread(job_manager.cleanup_old_jobs, settings.job_cleanup_after_hours)
+        except Exception as e:
+            logger.error("Periodic job cleanup failed: %s", e, exc_info=True)
+        await asyncio.sleep(settings.cleanup_interval_minutes * 60)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     # Startup
     logger.info("Starting API server...")
-    logger.info(f"Environment: {settings.environment}")
-    logger.info(f"Debug mode: {settings.debug}")
-    logger.info(f"Model weights: {settings.weights_path}")
+    logger.info("Environment: %s", settings.environment)
+    logger.info("Debug mode: %s", settings.debug)
+    logger.info("Model weights: %s", settings.weights_path)
+
+    # Create storage directories
+    settings.ensure_dirs()
+
+    # Resolve the dashboard page once; try new app first, fallback to old index
+    app.state.root_file = None
+    for candidate in ("app.html", "index.html"):
+        path = settings.base_dir / "static" / candidate
+        if path.exists():
+            app.state.root_file = path
+            break
+
+    # Webcam routers pull in OpenCV/torch capture code; load them only when enabled
+    if settings.webcam_enabled:
+        from api.routes import webcam, webcam_browser
+        from api.services.frame_batcher import get_frame_batcher
+        app.include_router(webcam.router)
+        app.include_router(webcam_browser.router)
+        get_frame_batcher().start()
+        logger.info("Webcam routes enabled")
 
     # Initialize database
     try:
         init_db()
         logger.info("Database initialized successfully")
     except Exception as e:
-        logger.error(f"Failed to initialize database: {e}")
+        logger.error("Failed to initialize database: %s", e)
+
+    # Load the detector now so the first /detect request doesn't pay for
+    # weight loading, CUDA context creation and cuDNN kernel selection
+    # (with a worker process, the model loads there instead)
+    if settings.job_worker_process:
+        get_batch_worker().start()
+    elif settings.model_preload:
+        try:
+            await asyncio.to_thread(detection.get_detector)
+        except Exception as e:
+            logger.error("Failed to preload detector, will retry on first request: %s", e)
 
     # Initialize job manager
     job_manager = get_job_manager()
-    logger.info(f"Job manager initialized with {job_manager.max_workers} workers")
+    logger.info("Job manager initialized with %d workers", job_manager.max_workers)
 
-    # Cleanup old jobs on startup
-    job_manager.cleanup_old_jobs(max_age_hours=settings.job_cleanup_after_hours)
+    # Cleanup old jobs on startup and then periodically
+    cleanup_task = asyncio.create_task(_cleanup_loop(job_manager))
 
     yield
 
     # Shutdown
     logger.info("Shutting down API server...")
+    cleanup_task.cancel()
+    if settings.webcam_enabled:
+        await get_frame_batcher().stop()
     job_manager.shutdown()
+    if settings.job_worker_process:
+        await asyncio.to_thread(get_batch_worker().stop)
+    await asyncio.to_thread(get_database_service().flush_events, 5.0)
 
 
 # Create FastAPI app
@@ -81,6 +155,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=NumpyORJSONResponse,
     lifespan=lifespan
 )
 
@@ -88,23 +163,49 @@ app = FastAPI(
 if settings.cors_enabled:
     app.add_middleware(
         CORSMiddleware,
-        allow_origins=settings.cors_origins_list,
+        allow_origins=_CORS_ORIGINS,
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
     )
-    logger.info(f"CORS enabled for origins: {settings.cors_origins_list}")
+    logger.info("CORS enabled for origins: %s", _CORS_ORIGINS)
 
-# Include routers
+# Include routers (webcam routers are added in lifespan)
 app.include_router(detection.router)
-app.include_router(webcam.router)
-app.include_router(webcam_browser.router)
 
 # Mount static files
 static_path = settings.base_dir / "static"
 if static_path.exists():
     app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
-    logger.info(f"Mounted static files from {static_path}")
+    logger.info("Mounted static files from %s", static_path)
+
+
+# Static response payloads, encoded once at import
+_HEALTH_PAYLOAD = {
+    "status": "healthy",
+    "version": "1.0.0"
+}
+
+_ROOT_PAYLOAD = {
+    "message": "Library Seat Occupancy Detection API",
+    "version": "1.0.0",
+    "docs": "/docs",
+    "health": "/health",
+    "monitor": "/",
+    "endpoints": {
+        "detect": "POST /api/detect - Upload video for detection",
+        "status": "GET /api/jobs/{job_id} - Get job status",
+        "download": "GET /api/download/{job_id} - Download results",
+        "list_jobs": "GET /api/jobs - List all jobs",
+        "delete_job": "DELETE /api/jobs/{job_id} - Delete a job",
+        "metrics": "GET /api/metrics - Inference scheduling metrics",
+        "webcam_start": "POST /api/webcam/start - Start webcam detection",
+        "webcam_stop": "POST /api/webcam/stop - Stop webcam detection",
+        "webcam_stream": "GET /api/webcam/stream - Video stream",
+        "webcam_occupancy": "GET /api/webcam/occupancy - Get occupancy data"
+    }
+}
+_ROOT_BYTES = orjson.dumps(_ROOT_PAYLOAD)
 
 
 # Health check endpoint
@@ -115,108 +216,103 @@ async def health_check():
 
     Returns the API status and basic information.
     """
-    model_loaded = False
-    try:
-        from api.routes.detection import _detector
-        model_loaded = _detector is not None
-    except Exception:
-        pass
-
-    return HealthResponse(
-        status="healthy",
-        version="1.0.0",
-        model_loaded=model_loaded,
-        timestamp=datetime.now()
-    )
+    if settings.job_worker_process:
+        model_loaded = get_batch_worker().is_alive
+    else:
+        model_loaded = detection._detector is not None
+
+    # Returned directly so the static fields skip response_model validation
+    return ORJSONResponse({
+        **_HEALTH_PAYLOAD,
+        "model_loaded": model_loaded,
+        "timestamp": _timestamp()
+    })
+
+
+# Metrics endpoint
+@app.get("/api/metrics", tags=["health"])
+async def metrics():
+    """
+    Inference scheduling metrics
+
+    Reports in-flight real-time requests and how often / how long batch
+    video jobs yielded the model to them.
+    """
+    return get_inference_arbiter().metrics()
 
 
 # Root endpoint
 @app.get("/", tags=["root"])
-async def root():
+async def root(request: Request):
     """
     Root endpoint
 
     Serves the frontend monitoring dashboard or returns API information.
     """
-    # Try new app first, fallback to old index
-    static_app = settings.base_dir / "static" / "app.html"
-    static_index = settings.base_dir / "static" / "index.html"
-
-    if static_app.exists():
-        return FileResponse(static_app)
-    elif static_index.exists():
-        return FileResponse(static_index)
-
-    return {
-        "message": "Library Seat Occupancy Detection API",
-        "version": "1.0.0",
-        "docs": "/docs",
-        "health": "/health",
-        "monitor": "/",
-        "endpoints": {
-            "detect": "POST /api/detect - Upload video for detection",
-            "status": "GET /api/jobs/{job_id} - Get job status",
-            "download": "GET /api/download/{job_id} - Download results",
-            "list_jobs": "GET /api/jobs - List all jobs",
-            "delete_job": "DELETE /api/jobs/{job_id} - Delete a job",
-            "webcam_start": "POST /api/webcam/start - Start webcam detection",
-            "webcam_stop": "POST /api/webcam/stop - Stop webcam detection",
-            "webcam_stream": "GET /api/webcam/stream - Video stream",
-            "webcam_occupancy": "GET /api/webcam/occupancy - Get occupancy data"
-        }
-    }
+    root_file = getattr(request.app.state, "root_file", None)
+    if root_file is not None:
+        return FileResponse(root_file)
+
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 
 # Exception handlers
+def _err(status: int, error: str, message: str, detail: Optional[str] = None) -> ORJSONResponse:
+    """Build an error response shaped like ErrorResponse without model validation"""
+    return ORJSONResponse(
+        status_code=status,
+        content={
+            "error": error,
+            "message": message,
+            "detail": detail,
+            "timestamp": _timestamp()
+        }
+    )
+
+
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     """Handle HTTP exceptions"""
-    return JSONResponse(
-        status_code=exc.status_code,
-        content=ErrorResponse(
-            error="HTTPException",
-            message=exc.detail,
-            timestamp=datetime.now()
-        ).model_dump(mode='json')
-    )
+    return _err(exc.status_code, "HTTPException", exc.detail)
 
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle validation errors"""
-    return JSONResponse(
-        status_code=422,
-        content=ErrorResponse(
-            error="ValidationError",
-            message="Request validation failed",
-            detail=str(exc),
-            timestamp=datetime.now()
-        ).model_dump(mode='json')
-    )
+    return _err(422, "ValidationError", "Request validation failed", str(exc))
 
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle general exceptions"""
-    logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
-        status_code=500,
-        content=ErrorResponse(
-            error="InternalServerError",
-            message="An unexpected error occurred",
-            detail=str(exc) if settings.debug else None,
-            timestamp=datetime.now()
-        ).model_dump(mode='json')
+    logger.error("Unhandled exception: %s", exc, exc_info=True)
+    return _err(
+        500,
+        "InternalServerError",
+        "An unexpected error occurred",
+        str(exc) if settings.debug else None
     )
 
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
 
+    workers = settings.server_workers
+    if workers < settings.api_workers and not settings.api_reload:
+        logger.warning(
+            "API_WORKERS=%d ignored; running 1 worker. The webcam detector, browser frame "
+            "sessions and the local job store are per process, so extra workers need "
+            "WEBCAM_ENABLED=False and REDIS_ENABLED=True", settings.api_workers
+        )
     uvicorn.run(
         "api.main:app",
         host=settings.api_host,
         port=settings.api_port,
         reload=settings.api_reload,
+        # uvloop is not available on Windows
+        loop="asyncio" if sys.platform == 'win32' else "uvloop",
+        http="httptools",
+        workers=workers,
         log_level=settings.log_level.lower()
     )
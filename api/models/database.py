@@ -1,11 +1,15 @@
 """
 Database models for seat occupancy tracking
 """
+import logging
+import msgspec
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event, Index, String, Text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, scoped_session, sessionmaker
+from sqlalchemy.sql import func
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 # Create database directory
 db_dir = Path(__file__).parent.parent.parent / "data"
@@ -14,18 +18,63 @@ db_dir.mkdir(exist_ok=True)
 # Database URL
 DATABASE_URL = f"sqlite:///{db_dir}/occupancy.db"
 
+# Bump whenever tables, columns or indexes change so init_db() re-applies the schema
+# v2: composite history index, duplicate indexes dropped
+# v3: timestamp columns rebuilt with their server defaults
+SCHEMA_VERSION = 3
+
+# Indexes from earlier schema versions that duplicate the primary key or
+# the leftmost prefix of a composite index; they only slow down writes
+_OBSOLETE_INDEXES = (
+    "ix_seats_id",
+    "ix_occupancy_history_id",
+    "ix_occupancy_history_seat_number",
+    "ix_occupancy_stats_id",
+)
+
+logger = logging.getLogger(__name__)
+
 # Create engine
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False},  # Needed for SQLite
+    pool_size=8,  # a few request/frame threads, each with its own session
+    max_overflow=16,
     echo=False  # Set to True for SQL debugging
 )
 
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragma(dbapi_connection, _connection_record):
+    """
+    Tune SQLite for frequent small writes from the frame pipeline
+
+    The DB-API connection keeps pysqlite's default transaction handling
+    (isolation_level is left alone): BEGIN is issued lazily before the first
+    write, so read-only request sessions that never commit don't pin an old
+    WAL snapshot. Bulk writes are already grouped per frame by
+    DatabaseService.begin_frame()/end_frame().
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer
+    cursor.execute("PRAGMA synchronous=NORMAL")  # fsync on checkpoint, not every commit
+    cursor.execute("PRAGMA cache_size=-65536")  # 64MB page cache
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256MB
+    cursor.close()
+
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# One session per thread for the service layer; rows stay loaded after commit
+# so hot paths don't re-SELECT what they just wrote
+ScopedSession = scoped_session(
+    sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+)
+
 # Base class for models
-Base = declarative_base()
+class Base(DeclarativeBase):
+    pass
 
 
 class Seat(Base):
@@ -34,29 +83,33 @@ class Seat(Base):
     """
     __tablename__ = "seats"
 
-    id = Column(Integer, primary_key=True, index=True)
-    seat_number = Column(String, unique=True, nullable=False, index=True)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    seat_number: Mapped[str] = mapped_column(String, unique=True, index=True)
 
     # Current status
-    status = Column(String, default="available")  # available, occupied
+    status: Mapped[Optional[str]] = mapped_column(String, default="available")  # available, occupied
 
     # Person tracking
-    person_id = Column(Integer, nullable=True)
+    person_id: Mapped[Optional[int]]
 
     # Timing
-    occupied_since = Column(DateTime, nullable=True)
-    duration = Column(Integer, default=0)  # Duration in seconds
-    duration_exceeded = Column(Boolean, default=False)
+    occupied_since: Mapped[Optional[datetime]]
+    duration: Mapped[Optional[int]] = mapped_column(default=0)  # Duration in seconds
+    duration_exceeded: Mapped[Optional[bool]] = mapped_column(default=False)
 
     # Location (bounding box)
-    bbox_x1 = Column(Float, nullable=True)
-    bbox_y1 = Column(Float, nullable=True)
-    bbox_x2 = Column(Float, nullable=True)
-    bbox_y2 = Column(Float, nullable=True)
+    bbox_x1: Mapped[Optional[float]]
+    bbox_y1: Mapped[Optional[float]]
+    bbox_x2: Mapped[Optional[float]]
+    bbox_y2: Mapped[Optional[float]]
 
     # Metadata
-    last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # Client-side default too: tables created before server defaults existed
+    # have no DDL DEFAULT, and create_all never alters them
+    last_updated: Mapped[Optional[datetime]] = mapped_column(
+        default=func.now(), server_default=func.now(), onupdate=func.now()
+    )
+    created_at: Mapped[Optional[datetime]] = mapped_column(default=func.now(), server_default=func.now())
 
     def to_dict(self):
         """Convert to dictionary for API responses"""
@@ -67,30 +120,65 @@ class Seat(Base):
             "occupied_since": self.occupied_since.isoformat() if self.occupied_since else None,
             "duration": self.duration,
             "duration_exceeded": self.duration_exceeded,
-            "bbox": [self.bbox_x1, self.bbox_y1, self.bbox_x2, self.bbox_y2] if self.bbox_x1 else None,
+            "bbox": [self.bbox_x1, self.bbox_y1, self.bbox_x2, self.bbox_y2] if self.bbox_x1 is not None else None,
             "last_updated": self.last_updated.isoformat() if self.last_updated else None
         }
 
 
+class SeatDTO(msgspec.Struct):
+    """Read-only seat projection, encoded directly with msgspec.json"""
+    id: str
+    status: str
+    person_id: Optional[int]
+    occupied_since: Optional[datetime]
+    duration: int
+    duration_exceeded: bool
+    bbox: Optional[Tuple[float, float, float, float]]
+    last_updated: Optional[datetime]
+
+
+def seat_to_dto(seat) -> SeatDTO:
+    """
+    Project a Seat, or a row selecting the same-named Seat columns, into a
+    SeatDTO (same shape as Seat.to_dict())
+    """
+    bbox = (seat.bbox_x1, seat.bbox_y1, seat.bbox_x2, seat.bbox_y2)
+    return SeatDTO(
+        seat.seat_number,
+        seat.status,
+        seat.person_id,
+        seat.occupied_since,
+        seat.duration,
+        seat.duration_exceeded,
+        bbox if bbox[0] is not None else None,
+        seat.last_updated,
+    )
+
+
 class OccupancyHistory(Base):
     """
     Occupancy history - tracks all occupancy events
     """
     __tablename__ = "occupancy_history"
+    # Also serves seat_number-only lookups (leftmost prefix); SQLite walks it
+    # backwards for ORDER BY timestamp DESC
+    __table_args__ = (
+        Index('ix_history_seat_ts', 'seat_number', 'timestamp'),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    seat_number = Column(String, index=True)
-    person_id = Column(Integer, nullable=True)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    seat_number: Mapped[Optional[str]] = mapped_column(String)
+    person_id: Mapped[Optional[int]]
 
     # Event details
-    event_type = Column(String)  # occupied, freed, duration_exceeded
+    event_type: Mapped[Optional[str]] = mapped_column(String)  # occupied, freed, duration_exceeded
 
     # Timing
-    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
-    duration = Column(Integer, nullable=True)  # Duration when freed
+    timestamp: Mapped[Optional[datetime]] = mapped_column(default=func.now(), server_default=func.now(), index=True)
+    duration: Mapped[Optional[int]]  # Duration when freed
 
     # Metadata
-    notes = Column(Text, nullable=True)
+    notes: Mapped[Optional[str]] = mapped_column(Text)
 
     def to_dict(self):
         """Convert to dictionary for API responses"""
@@ -99,7 +187,7 @@ class OccupancyHistory(Base):
             "seat_number": self.seat_number,
             "person_id": self.person_id,
             "event_type": self.event_type,
-            "timestamp": self.timestamp.isoformat(),
+            "timestamp": self.timestamp.isoformat() if self.timestamp else None,
             "duration": self.duration,
             "notes": self.notes
         }
@@ -111,16 +199,16 @@ class OccupancyStats(Base):
     """
     __tablename__ = "occupancy_stats"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(primary_key=True)
 
     # Counts
-    total_seats = Column(Integer, default=0)
-    occupied_seats = Column(Integer, default=0)
-    available_seats = Column(Integer, default=0)
-    person_count = Column(Integer, default=0)
+    total_seats: Mapped[Optional[int]] = mapped_column(default=0)
+    occupied_seats: Mapped[Optional[int]] = mapped_column(default=0)
+    available_seats: Mapped[Optional[int]] = mapped_column(default=0)
+    person_count: Mapped[Optional[int]] = mapped_column(default=0)
 
     # Timestamp
-    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    timestamp: Mapped[Optional[datetime]] = mapped_column(default=func.now(), server_default=func.now(), index=True)
 
     def to_dict(self):
         """Convert to dictionary for API responses"""
@@ -129,7 +217,7 @@ class OccupancyStats(Base):
             "occupied_seats": self.occupied_seats,
             "available_seats": self.available_seats,
             "person_count": self.person_count,
-            "timestamp": self.timestamp.isoformat()
+            "timestamp": self.timestamp.isoformat() if self.timestamp else None
         }
 
 
@@ -144,12 +232,134 @@ def get_db():
         db.close()
 
 
+def upsert_seat(db: Session, seat_number: str, **fields) -> Seat:
+    """
+    Insert or update a seat in one INSERT ... ON CONFLICT DO UPDATE RETURNING
+
+    Args:
+        db: Database session (caller commits)
+        seat_number: Seat identifier (unique key)
+        **fields: Seat column values to set
+
+    Returns:
+        The persisted Seat row
+    """
+    stmt = sqlite_insert(Seat).values(seat_number=seat_number, **fields)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Seat.seat_number],
+        # onupdate= is not applied to ON CONFLICT, so bump last_updated here
+        set_={**fields, "last_updated": func.now()},
+    ).returning(Seat)
+    return db.execute(stmt, execution_options={"populate_existing": True}).scalar_one()
+
+
+# Rows per multi-VALUES upsert; keeps bound parameters well under SQLite's limit
+UPSERT_CHUNK_SIZE = 500
+
+
+def bulk_upsert_seats(db: Session, rows: List[Dict]):
+    """
+    Insert or update many seats with multi-row INSERT ... ON CONFLICT DO UPDATE
+
+    Every row must carry the same keys, including seat_number; conflicting
+    rows take all of those values. The caller commits.
+
+    Args:
+        db: Database session
+        rows: Seat column dictionaries
+    """
+    if not rows:
+        return
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = sqlite_insert(Seat).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Seat.seat_number],
+            set_={
+                **{key: stmt.excluded[key] for key in rows[0] if key != "seat_number"},
+                "last_updated": func.now(),
+            },
+        )
+        db.execute(stmt)
+
+
+def bulk_record_events(db, events: List[Dict]):
+    """
+    Insert many occupancy history events with a single commit
+
+    Args:
+        db: Database session
+        events: List of OccupancyHistory column dictionaries
+    """
+    if not events:
+        return
+    db.bulk_insert_mappings(OccupancyHistory, events)
+    db.commit()
+
+
+def _rebuild_stale_tables(conn):
+    """
+    Rebuild existing tables whose columns lack a server default the model declares
+
+    SQLite can't ALTER a column's DEFAULT, so the table is renamed, recreated
+    from the model (with its indexes) and its rows copied back. NULLs written
+    while the default was missing are filled with the default on the way.
+    """
+    for table in Base.metadata.sorted_tables:
+        existing = {row[1]: row[4] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+        missing = [column for column in table.columns
+                   if column.server_default is not None and existing.get(column.name, "") is None]
+        if not missing:
+            continue
+
+        old = f"{table.name}_old"
+        conn.exec_driver_sql(f"ALTER TABLE {table.name} RENAME TO {old}")
+        # Renamed indexes keep their names, which the new table needs
+        for (name,) in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (old,)
+        ).fetchall():
+            conn.exec_driver_sql(f"DROP INDEX {name}")
+        table.create(bind=conn)
+
+        columns = [column for column in table.columns if column.name in existing]
+        values = [
+            f"COALESCE({column.name}, {column.server_default.arg.compile(dialect=conn.dialect)})"
+            if column in missing else column.name
+            for column in columns
+        ]
+        conn.exec_driver_sql(
+            f"INSERT INTO {table.name} ({', '.join(column.name for column in columns)}) "
+            f"SELECT {', '.join(values)} FROM {old}"
+        )
+        conn.exec_driver_sql(f"DROP TABLE {old}")
+        logger.info("Rebuilt table %s with server defaults for %s",
+                    table.name, ", ".join(column.name for column in missing))
+
+
+def _apply_schema(conn):
+    """Migrate existing tables, create missing tables and indexes, drop obsolete ones, then stamp the schema version"""
+    _rebuild_stale_tables(conn)
+    Base.metadata.create_all(bind=conn)
+    for name in _OBSOLETE_INDEXES:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+    # create_all only builds indexes together with new tables
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+    conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
 def init_db():
     """
     Initialize database - create all tables
+
+    Skipped when the stored schema version already matches SCHEMA_VERSION.
     """
-    Base.metadata.create_all(bind=engine)
-    print(f"✅ Database initialized at {DATABASE_URL}")
+    with engine.begin() as conn:
+        if conn.exec_driver_sql("PRAGMA user_version").scalar() == SCHEMA_VERSION:
+            logger.info("Database schema v%d up to date at %s", SCHEMA_VERSION, DATABASE_URL)
+            return
+        _apply_schema(conn)
+    logger.info("Database initialized at %s (schema v%d)", DATABASE_URL, SCHEMA_VERSION)
 
 
 def reset_db():
@@ -157,10 +367,12 @@ def reset_db():
     Reset database - drop and recreate all tables
     """
     Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-    print("✅ Database reset complete")
+    with engine.begin() as conn:
+        _apply_schema(conn)
+    logger.info("Database reset complete")
 
 
 if __name__ == "__main__":
     # Initialize database when run directly
+    logging.basicConfig(level=logging.INFO)
     init_db()
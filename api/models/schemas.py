@@ -4,7 +4,18 @@ Pydantic models for API request/response schemas
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from enum import Enum
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+
+def _now() -> datetime:
+    """Timezone-aware local time (offset looked up per call, so it follows DST changes)"""
+    return datetime.now().astimezone()
+
+
+# Schemas are immutable value objects; freezing skips copy-on-validate.
+# Unknown fields are still ignored, so older clients and stored job JSON
+# keep validating when fields are added.
+_FROZEN = ConfigDict(frozen=True)
 
 
 class JobStatus(str, Enum):
@@ -18,6 +29,8 @@ class JobStatus(str, Enum):
 
 class BoundingBox(BaseModel):
     """Bounding box coordinates"""
+    model_config = _FROZEN
+
     x1: float = Field(..., description="Top-left x coordinate")
     y1: float = Field(..., description="Top-left y coordinate")
     x2: float = Field(..., description="Bottom-right x coordinate")
@@ -26,6 +39,8 @@ class BoundingBox(BaseModel):
 
 class Detection(BaseModel):
     """Single detection in a frame"""
+    model_config = _FROZEN
+
     class_id: int = Field(..., description="Class ID (0=person, 56=chair)")
     class_name: str = Field(..., description="Class name")
     confidence: float = Field(..., description="Detection confidence score")
@@ -35,6 +50,8 @@ class Detection(BaseModel):
 
 class OccupancyEvent(BaseModel):
     """Seat occupancy event"""
+    model_config = _FROZEN
+
     seat_id: int = Field(..., description="Unique seat identifier")
     bbox: BoundingBox = Field(..., description="Seat bounding box")
     occupied_duration: float = Field(..., description="Duration in seconds")
@@ -45,6 +62,8 @@ class OccupancyEvent(BaseModel):
 
 class FrameStatistics(BaseModel):
     """Statistics for a single frame"""
+    model_config = _FROZEN
+
     frame_number: int
     total_detections: int
     person_count: int
@@ -54,6 +73,8 @@ class FrameStatistics(BaseModel):
 
 class DetectionResults(BaseModel):
     """Complete detection results"""
+    model_config = _FROZEN
+
     total_frames: int = Field(..., description="Total number of frames processed")
     total_detections: int = Field(..., description="Total detections across all frames")
     person_detections: int = Field(..., description="Total person detections")
@@ -67,6 +88,8 @@ class DetectionResults(BaseModel):
 
 class DetectionParameters(BaseModel):
     """Optional detection parameters to override defaults"""
+    model_config = _FROZEN
+
     conf_threshold: Optional[float] = Field(None, ge=0.0, le=1.0, description="Confidence threshold")
     iou_threshold: Optional[float] = Field(None, ge=0.0, le=1.0, description="IOU threshold")
     img_size: Optional[int] = Field(None, gt=0, description="Image size for inference")
@@ -78,6 +101,8 @@ class DetectionParameters(BaseModel):
 
 class JobCreateResponse(BaseModel):
     """Response when creating a new detection job"""
+    model_config = _FROZEN
+
     job_id: str = Field(..., description="Unique job identifier")
     status: JobStatus = Field(..., description="Current job status")
     message: str = Field(..., description="Status message")
@@ -86,6 +111,8 @@ class JobCreateResponse(BaseModel):
 
 class JobStatusResponse(BaseModel):
     """Response for job status query"""
+    model_config = _FROZEN
+
     job_id: str = Field(..., description="Job identifier")
     status: JobStatus = Field(..., description="Current job status")
     created_at: datetime = Field(..., description="Job creation timestamp")
@@ -100,12 +127,16 @@ class JobStatusResponse(BaseModel):
 
 class JobListResponse(BaseModel):
     """Response for listing jobs"""
+    model_config = _FROZEN
+
     jobs: List[JobStatusResponse] = Field(..., description="List of jobs")
     total: int = Field(..., description="Total number of jobs")
 
 
 class HealthResponse(BaseModel):
     """Health check response"""
+    model_config = _FROZEN
+
     status: str = Field(..., description="API status")
     version: str = Field(..., description="API version")
     model_loaded: bool = Field(..., description="Whether model is loaded")
@@ -114,21 +145,25 @@ class HealthResponse(BaseModel):
 
 class ErrorResponse(BaseModel):
     """Error response"""
+    model_config = _FROZEN
+
     error: str = Field(..., description="Error type")
     message: str = Field(..., description="Error message")
     detail: Optional[str] = Field(None, description="Additional error details")
-    timestamp: datetime = Field(default_factory=datetime.now, description="Error timestamp")
+    timestamp: datetime = Field(default_factory=_now, description="Error timestamp")
 
 
 class DetectionRequest(BaseModel):
     """Request body for detection with URL or base64 video"""
+    model_config = _FROZEN
+
     video_url: Optional[str] = Field(None, description="URL to video file")
     video_base64: Optional[str] = Field(None, description="Base64 encoded video")
     parameters: Optional[DetectionParameters] = Field(None, description="Detection parameters")
 
-    @validator('video_url', 'video_base64')
-    def check_video_input(cls, v, values):
+    @model_validator(mode='after')
+    def check_video_input(self) -> 'DetectionRequest':
         """Ensure at least one video input is provided"""
-        if not v and 'video_url' not in values and 'video_base64' not in values:
+        if not self.video_url and not self.video_base64:
             raise ValueError('Either video_url or video_base64 must be provided')
-        return v
+        return self
@@ -0,0 +1,20 @@
+"""
+Shared response classes
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class NumpyORJSONResponse(JSONResponse):
+    """
+    JSON response rendered by orjson, including NumPy arrays and scalars
+
+    Hot polling endpoints return this directly, skipping FastAPI's
+    jsonable_encoder pass, so occupancy arrays and counters computed with
+    NumPy can be handed over without .tolist()/int() conversions.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
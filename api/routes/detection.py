@@ -1,12 +1,12 @@
 """
 Detection API routes
 """
+import asyncio
 import logging
-from datetime import datetime
+import threading
 from pathlib import Path
 from typing import Optional
-import aiofiles
-from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Request
 from fastapi.responses import FileResponse
 
 from api.models.schemas import (
@@ -14,39 +14,80 @@ from api.models.schemas import (
     DetectionParameters, JobStatus
 )
 from api.services.job_manager import get_job_manager
-from api.services.detection_service import SeatOccupancyDetector
+from api.services.detection_service import SeatOccupancyDetector, count_video_frames
+from api.services.upload_service import UploadError, UploadTooLargeError, stream_upload_to_disk
+from api.services.batch_worker import get_batch_worker
 from api.config import settings
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["detection"])
 
-# Global detector instance (lazy loaded)
+
+class VideoFileResponse(FileResponse):
+    """
+    FileResponse tuned for large result videos
+
+    Reads in 1MB chunks instead of Starlette's 64KB default to cut per-chunk
+    overhead. On servers advertising the ASGI `http.response.pathsend`
+    extension, Starlette hands the path to the server instead, which can
+    sendfile() it with no Python-side copies.
+    """
+    chunk_size = 1 << 20
+
+# Global detector instance (preloaded at startup, lazy loaded as a fallback)
 _detector: Optional[SeatOccupancyDetector] = None
+_detector_lock = threading.Lock()
 
 
 def get_detector() -> SeatOccupancyDetector:
     """Get or create global detector instance"""
     global _detector
-    if _detector is None:
-        logger.info("Initializing SeatOccupancyDetector")
-        _detector = SeatOccupancyDetector(
-            weights_path=str(settings.weights_path),
-            img_size=settings.model_img_size,
-            conf_threshold=settings.model_conf_threshold,
-            iou_threshold=settings.model_iou_threshold,
-            device=settings.model_device,
-            classes=settings.detection_class_list,
-            occupancy_time_threshold=settings.occupancy_time_threshold,
-            proximity_threshold=settings.occupancy_proximity_threshold
-        )
+    if _detector is not None:
+        return _detector
+    with _detector_lock:
+        if _detector is None:
+            logger.info("Initializing SeatOccupancyDetector")
+            _detector = SeatOccupancyDetector(
+                weights_path=str(settings.weights_path),
+                img_size=settings.model_img_size,
+                conf_threshold=settings.model_conf_threshold,
+                iou_threshold=settings.model_iou_threshold,
+                device=settings.model_device,
+                classes=settings.detection_class_list,
+                occupancy_time_threshold=settings.occupancy_time_threshold,
+                proximity_threshold=settings.occupancy_proximity_threshold
+            )
     return _detector
 
 
-@router.post("/detect", response_model=JobCreateResponse)
+# Documents the multipart body that create_detection_job parses itself
+_DETECT_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["video"],
+                    "properties": {
+                        "video": {
+                            "type": "string",
+                            "format": "binary",
+                            "description": "Video file to process"
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+
+
+@router.post("/detect", response_model=JobCreateResponse, openapi_extra=_DETECT_REQUEST_BODY)
 async def create_detection_job(
+    request: Request,
     background_tasks: BackgroundTasks,
-    video: UploadFile = File(..., description="Video file to process"),
     conf_threshold: Optional[float] = Query(None, ge=0.0, le=1.0, description="Detection confidence threshold"),
     iou_threshold: Optional[float] = Query(None, ge=0.0, le=1.0, description="IOU threshold for NMS"),
     occupancy_time_threshold: Optional[int] = Query(None, gt=0, description="Occupancy time threshold in seconds"),
@@ -64,38 +105,28 @@ async def create_detection_job(
     - **include_frame_stats**: Include detailed per-frame statistics
 
     Returns a job ID that can be used to check status and download results.
-    """
-    # Validate file extension
-    file_ext = Path(video.filename).suffix.lower().lstrip('.')
-    if file_ext not in settings.allowed_extensions:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file type. Allowed: {', '.join(settings.allowed_extensions)}"
-        )
 
-    # Validate file size
-    video.file.seek(0, 2)  # Seek to end
-    file_size = video.file.tell()
-    video.file.seek(0)  # Reset
-    if file_size > settings.max_upload_size:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Maximum size: {settings.max_upload_size / 1024 / 1024:.0f}MB"
-        )
-
-    # Save uploaded file
+    The multipart body is parsed as it streams in and the video is written
+    directly to the uploads directory (no intermediate spool file).
+    """
+    # Save uploaded file while parsing, enforcing type and size limits as we go
     job_manager = get_job_manager()
-    upload_filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{video.filename}"
-    upload_path = settings.upload_path / upload_filename
-
     try:
-        async with aiofiles.open(upload_path, 'wb') as f:
-            content = await video.read()
-            await f.write(content)
-        logger.info(f"Saved uploaded file: {upload_path}")
+        upload_path = await stream_upload_to_disk(
+            request,
+            field_name="video",
+            upload_dir=settings.upload_path,
+            max_size=settings.max_upload_size,
+            allowed_extensions=settings.allowed_extensions_set
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to save upload: {e}")
         raise HTTPException(status_code=500, detail="Failed to save uploaded file")
+    logger.info(f"Saved uploaded file: {upload_path}")
 
     # Build parameters
     parameters = {
@@ -109,11 +140,12 @@ async def create_detection_job(
     if occupancy_time_threshold is not None:
         parameters['occupancy_time_threshold'] = occupancy_time_threshold
 
-    # Create job
-    job = job_manager.create_job(str(upload_path), parameters)
+    # Create job; frame count drives shortest-job-first scheduling
+    estimated_work = await asyncio.to_thread(count_video_frames, upload_path)
+    job = job_manager.create_job(str(upload_path), parameters, estimated_work=estimated_work)
 
-    # Submit job for background processing
-    detector = get_detector()
+    # Submit job for background processing, in-process or via the worker process
+    detector = get_batch_worker() if settings.job_worker_process else get_detector()
     background_tasks.add_task(job_manager.submit_job_async, job, detector)
 
     return JobCreateResponse(
@@ -156,13 +188,7 @@ async def list_jobs(
     Returns a list of jobs with their current status.
     """
     job_manager = get_job_manager()
-    jobs = job_manager.list_jobs(limit=limit, status_filter=status)
-
-    job_responses = []
-    for job in jobs:
-        response = job_manager.get_job_status_response(job.job_id)
-        if response:
-            job_responses.append(response)
+    job_responses = job_manager.list_job_responses(limit=limit, status_filter=status)
 
     return JobListResponse(
         jobs=job_responses,
@@ -210,7 +236,7 @@ async def download_result_video(job_id: str):
     if not output_path.exists():
         raise HTTPException(status_code=404, detail="Output video not found")
 
-    return FileResponse(
+    return VideoFileResponse(
         path=output_path,
         media_type="video/mp4",
         filename=f"detection_result_{job_id}.mp4"
@@ -218,22 +244,24 @@ async def download_result_video(job_id: str):
 
 
 @router.post("/cleanup")
-async def cleanup_old_jobs(max_age_hours: int = Query(24, ge=1, description="Maximum age in hours")):
+async def cleanup_old_jobs(max_age_hours: Optional[int] = Query(None, ge=1, description="Maximum age in hours")):
     """
     Cleanup old completed/failed jobs
 
-    - **max_age_hours**: Maximum age in hours for jobs to keep (default: 24)
+    Cleanup runs periodically in the background (every CLEANUP_INTERVAL_MINUTES).
+
+    - **max_age_hours**: Run a cleanup now with this age limit; omit to return
+      the result of the most recent background run
 
     Returns the number of jobs cleaned up.
     """
     job_manager = get_job_manager()
-    initial_count = len(job_manager.jobs)
-    job_manager.cleanup_old_jobs(max_age_hours=max_age_hours)
-    final_count = len(job_manager.jobs)
-    cleaned = initial_count - final_count
+    if max_age_hours is None:
+        result = job_manager.last_cleanup
+    else:
+        result = await asyncio.to_thread(job_manager.cleanup_old_jobs, max_age_hours)
 
     return {
-        "message": f"Cleaned up {cleaned} old jobs",
-        "jobs_cleaned": cleaned,
-        "jobs_remaining": final_count
+        "message": f"Cleaned up {result['jobs_cleaned']} old jobs",
+        **result
     }
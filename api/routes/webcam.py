@@ -1,6 +1,8 @@
 """
 Webcam detection API routes for real-time monitoring
 """
+import base64
+import binascii
 import logging
 import asyncio
 from fastapi import APIRouter, HTTPException, Query
@@ -8,7 +10,9 @@ from fastapi.responses import StreamingResponse, JSONResponse
 from typing import Optional
 
 from api.services.webcam_service import get_webcam_detector
+from api.services.camera_probe import get_cached_probe, invalidate_probe, probe_camera
 from api.models.schemas import ErrorResponse
+from api.responses import NumpyORJSONResponse
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +38,8 @@ async def start_webcam(camera_index: int = Query(0, ge=0, description="Camera in
                 "camera_index": camera_index
             }
 
-        success = detector.start_webcam(camera_index)
+        # Opening the camera blocks; keep it off the event loop
+        success = await asyncio.to_thread(detector.start_webcam, camera_index)
 
         if not success:
             raise HTTPException(
@@ -69,7 +74,9 @@ async def stop_webcam():
                 "status": "stopped"
             }
 
-        detector.stop_webcam()
+        # Waits for the streaming pipeline's threads to finish their frame
+        await asyncio.to_thread(detector.stop_webcam)
+        invalidate_probe()
 
         return {
             "message": "Webcam stopped successfully",
@@ -134,7 +141,11 @@ async def video_stream():
 
 
 @router.get("/occupancy")
-async def get_occupancy():
+async def get_occupancy(
+    since_bitmap: Optional[str] = Query(
+        None, description="URL-safe base64 bitmap from a previous response; only changed seats are returned"
+    )
+):
     """
     Get current seat occupancy statistics
 
@@ -145,7 +156,16 @@ async def get_occupancy():
     - Individual seat status with duration and time exceeded alerts
 
     Poll this endpoint regularly to get updated occupancy information.
+    Each response carries a `bitmap`; pass it back as `since_bitmap` to get
+    only the seats whose state changed since that poll.
     """
+    previous = None
+    if since_bitmap is not None:
+        try:
+            previous = base64.urlsafe_b64decode(since_bitmap)
+        except (binascii.Error, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid since_bitmap")
+
     try:
         detector = get_webcam_detector()
 
@@ -156,14 +176,17 @@ async def get_occupancy():
                 "data": None
             }
 
-        stats = detector.get_occupancy_stats()
+        bitmap, stats = detector.get_occupancy_delta(previous)
 
-        return {
+        # Polled at stream rate; rendered directly, skipping jsonable_encoder
+        return NumpyORJSONResponse({
             "status": "running",
             "message": "Occupancy data retrieved successfully",
             "data": stats,
+            "bitmap": base64.urlsafe_b64encode(bitmap).decode('ascii'),
+            "delta": previous is not None,
             "timestamp": asyncio.get_event_loop().time()
-        }
+        })
 
     except Exception as e:
         logger.error(f"Error getting occupancy data: {e}", exc_info=True)
@@ -180,21 +203,18 @@ async def test_camera(camera_index: int = Query(0, ge=0, description="Camera ind
     Returns information about camera availability and details.
     """
     try:
-        import cv2
-
-        logger.info(f"Testing camera {camera_index}...")
+        cached = get_cached_probe(camera_index) is not None
+        if not cached:
+            logger.info(f"Testing camera {camera_index}...")
 
-        # Try to open the camera
-        cap = cv2.VideoCapture(camera_index)
+        # Opening a camera blocks for a while; run the probe off the event loop
+        probe = await asyncio.to_thread(probe_camera, camera_index)
 
-        if not cap.isOpened():
-            # Try with DirectShow on Windows
-            cap = cv2.VideoCapture(camera_index, cv2.CAP_DSHOW)
-
-        if not cap.isOpened():
+        if not probe["opened"]:
             return {
                 "success": False,
                 "camera_index": camera_index,
+                "cached": cached,
                 "message": f"Camera {camera_index} could not be opened",
                 "suggestions": [
                     "Check if camera is connected",
@@ -205,25 +225,19 @@ async def test_camera(camera_index: int = Query(0, ge=0, description="Camera ind
                 ]
             }
 
-        # Get camera properties
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
-
-        # Try to read a frame
-        ret, frame = cap.read()
-        cap.release()
+        camera_info = {
+            "width": probe["width"],
+            "height": probe["height"],
+            "fps": probe["fps"]
+        }
 
-        if not ret:
+        if not probe["success"]:
             return {
                 "success": False,
                 "camera_index": camera_index,
+                "cached": cached,
                 "message": f"Camera {camera_index} opened but could not read frame",
-                "camera_info": {
-                    "width": width,
-                    "height": height,
-                    "fps": fps
-                },
+                "camera_info": camera_info,
                 "suggestions": [
                     "Camera might be in use by another application",
                     "Try restarting the application",
@@ -234,13 +248,9 @@ async def test_camera(camera_index: int = Query(0, ge=0, description="Camera ind
         return {
             "success": True,
             "camera_index": camera_index,
+            "cached": cached,
             "message": f"Camera {camera_index} is working correctly!",
-            "camera_info": {
-                "width": width,
-                "height": height,
-                "fps": fps,
-                "frame_shape": list(frame.shape) if frame is not None else None
-            }
+            "camera_info": {**camera_info, "frame_shape": probe["frame_shape"]}
         }
 
     except Exception as e:
@@ -2,119 +2,139 @@
 Browser-based webcam detection routes
 Frontend captures video, backend processes frames
 """
+import asyncio
 import logging
 import base64
-import cv2
-import numpy as np
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse
-from typing import Optional
-import io
-from PIL import Image
+import msgspec
+from fastapi import APIRouter, HTTPException, Query, Request, UploadFile, File, Form
+from fastapi.responses import JSONResponse, Response
+from typing import Dict, Optional
 
 from api.services.frame_processor import get_frame_processor
+from api.services.frame_batcher import get_frame_batcher
+from api.services.jpeg import decode_image
 from api.services.database_service import get_database_service
+from api.responses import NumpyORJSONResponse
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/process", tags=["frame-processing"])
 
+# Identifies a client (camera) with its own seat tracking; also prefixes its seat numbers
+SESSION_ID_PATTERN = r"^[A-Za-z0-9_-]{1,32}$"
+SESSION_ID_DESCRIPTION = "Client session with its own seat tracking (shared default if omitted)"
 
-@router.post("/frame")
-async def process_frame(
-    frame_data: str = Form(..., description="Base64 encoded image frame")
-):
-    """
-    Process a single frame from browser webcam
+_encoder = msgspec.json.Encoder()
 
-    Frontend captures video frame and sends as base64 image.
-    Backend processes with YOLO and returns detections.
 
-    - **frame_data**: Base64 encoded JPEG/PNG image
+def _struct_response(content: Dict) -> Response:
+    """JSON response encoded straight from the frame processor's structs, bypassing Pydantic"""
+    return Response(content=_encoder.encode(content), media_type="application/json")
 
-    Returns detection results including bounding boxes and occupancy stats.
-    """
-    try:
-        # Decode base64 image
-        if ',' in frame_data:
-            # Remove data:image/jpeg;base64, prefix if present
-            frame_data = frame_data.split(',')[1]
 
-        image_bytes = base64.b64decode(frame_data)
-
-        # Convert to numpy array
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+async def _process_image_bytes(image_bytes: bytes, session_id: Optional[str] = None) -> Response:
+    """Decode an encoded frame off the event loop and run it through the batcher"""
+    try:
+        frame = await asyncio.to_thread(decode_image, image_bytes)
 
         if frame is None:
             raise ValueError("Failed to decode image")
 
-        # Process frame with detection service
-        processor = get_frame_processor()
-        results = processor.process_frame(frame)
+        # Process frame with detection service (batched with concurrent requests)
+        results = await get_frame_batcher().submit(frame, session_id)
 
-        return {
+        return _struct_response({
             "success": True,
             "detections": results['detections'],
             "occupancy": results['occupancy'],
             "timestamp": results['timestamp']
-        }
+        })
 
     except Exception as e:
         logger.error(f"Error processing frame: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Frame processing error: {str(e)}")
 
 
-@router.post("/frame-binary")
-async def process_frame_binary(
-    frame: UploadFile = File(..., description="Image file (JPEG/PNG)")
+@router.post("/frame-raw")
+async def process_frame_raw(
+    request: Request,
+    session_id: Optional[str] = Query(None, pattern=SESSION_ID_PATTERN, description=SESSION_ID_DESCRIPTION)
 ):
     """
-    Process a single frame (binary upload)
+    Process a single frame sent as the raw request body
+
+    Preferred endpoint for the browser client: post the JPEG bytes directly,
+    e.g. `fetch('/api/process/frame-raw', {method: 'POST', body: blob})` with a
+    blob from `canvas.toBlob(cb, 'image/jpeg', 0.8)`. Avoids base64 encoding
+    on the client and decoding on the server.
+
+    - **session_id**: Optional client id; each session tracks its own seats
+
+    Returns detection results including bounding boxes and occupancy stats.
+    """
+    return await _process_image_bytes(await request.body(), session_id)
+
 
-    Alternative endpoint for binary image upload.
+@router.post("/frame")
+async def process_frame(
+    frame_data: str = Form(..., description="Base64 encoded image frame"),
+    session_id: Optional[str] = Form(None, pattern=SESSION_ID_PATTERN, description=SESSION_ID_DESCRIPTION)
+):
+    """
+    Process a single frame from browser webcam (base64, deprecated)
+
+    Kept for backwards compatibility; new clients should use /frame-raw.
+
+    - **frame_data**: Base64 encoded JPEG/PNG image
+    - **session_id**: Optional client id; each session tracks its own seats
+
+    Returns detection results including bounding boxes and occupancy stats.
     """
+    # Remove data:image/jpeg;base64, prefix if present
+    if ',' in frame_data:
+        frame_data = frame_data.split(',')[1]
+
     try:
-        # Read image file
-        contents = await frame.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image_bytes = base64.b64decode(frame_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid base64 frame data: {e}")
 
-        if img is None:
-            raise ValueError("Failed to decode image")
+    return await _process_image_bytes(image_bytes, session_id)
 
-        # Process frame
-        processor = get_frame_processor()
-        results = processor.process_frame(img)
 
-        return {
-            "success": True,
-            "detections": results['detections'],
-            "occupancy": results['occupancy'],
-            "timestamp": results['timestamp']
-        }
+@router.post("/frame-binary")
+async def process_frame_binary(
+    frame: UploadFile = File(..., description="Image file (JPEG/PNG)"),
+    session_id: Optional[str] = Form(None, pattern=SESSION_ID_PATTERN, description=SESSION_ID_DESCRIPTION)
+):
+    """
+    Process a single frame (binary upload)
 
-    except Exception as e:
-        logger.error(f"Error processing frame: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Frame processing error: {str(e)}")
+    Alternative endpoint for multipart binary image upload.
+    """
+    return await _process_image_bytes(await frame.read(), session_id)
 
 
 @router.get("/stats")
-async def get_current_stats():
+async def get_current_stats(
+    session_id: Optional[str] = Query(None, pattern=SESSION_ID_PATTERN, description=SESSION_ID_DESCRIPTION)
+):
     """
     Get current occupancy statistics
 
     Returns the latest occupancy data without processing a new frame.
+
+    - **session_id**: Client session to report on (shared default if omitted)
     """
     try:
         processor = get_frame_processor()
-        stats = processor.get_current_stats()
+        stats = processor.get_current_stats(session_id)
 
-        return {
+        return _struct_response({
             "success": True,
             "occupancy": stats,
             "message": "Current statistics retrieved"
-        }
+        })
 
     except Exception as e:
         logger.error(f"Error getting stats: {e}", exc_info=True)
@@ -122,15 +142,20 @@ async def get_current_stats():
 
 
 @router.post("/reset")
-async def reset_tracking():
+async def reset_tracking(
+    session_id: Optional[str] = Query(None, pattern=SESSION_ID_PATTERN, description=SESSION_ID_DESCRIPTION)
+):
     """
     Reset seat tracking
 
     Clears all tracked seats and resets counters.
+
+    - **session_id**: Reset only this client session (the default session
+      reset also clears the seats table)
     """
     try:
         processor = get_frame_processor()
-        processor.reset()
+        processor.reset(session_id)
 
         return {
             "success": True,
@@ -143,23 +168,23 @@ async def reset_tracking():
 
 
 @router.get("/seats")
-async def get_all_seats():
+async def get_all_seats(summary_only: bool = False):
     """
     Get all seats from database
 
     Returns complete list of all tracked seats with their current status.
+
+    - **summary_only**: Return only the seat counts, skipping the per-seat list
     """
     try:
         db_service = get_database_service()
-        occupancy = db_service.get_current_occupancy()
+        occupancy = db_service.get_current_occupancy(include_seats=not summary_only)
 
-        return {
-            "success": True,
-            "seats": occupancy['seats'],
-            "total_seats": occupancy['total_seats'],
-            "occupied_seats": occupancy['occupied_seats'],
-            "available_seats": occupancy['available_seats']
-        }
+        # Encoded straight from the SeatDTO structs, bypassing Pydantic
+        return Response(
+            content=msgspec.json.encode({"success": True, **occupancy}),
+            media_type="application/json"
+        )
 
     except Exception as e:
         logger.error(f"Error getting seats from database: {e}", exc_info=True)
@@ -180,10 +205,10 @@ async def get_seat(seat_number: str):
         if not seat:
             raise HTTPException(status_code=404, detail=f"Seat {seat_number} not found")
 
-        return {
+        return NumpyORJSONResponse({
             "success": True,
             "seat": seat.to_dict()
-        }
+        })
 
     except HTTPException:
         raise
@@ -209,17 +234,48 @@ async def get_occupancy_history(
         db_service = get_database_service()
         history = db_service.get_seat_history(seat_number=seat_number, limit=limit)
 
-        return {
+        return NumpyORJSONResponse({
             "success": True,
             "history": [h.to_dict() for h in history],
             "count": len(history)
-        }
+        })
 
     except Exception as e:
         logger.error(f"Error getting history: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/snapshot")
+async def get_snapshot(
+    seat_number: Optional[str] = None,
+    limit: int = 100
+):
+    """
+    Get occupancy history and statistics history in one call
+
+    Equivalent to /history plus /stats/history, read in a single database
+    transaction. Dashboards polling both should use this instead.
+
+    - **seat_number**: Filter occupancy history by seat (optional)
+    - **limit**: Maximum number of records per list (default: 100)
+    """
+    try:
+        db_service = get_database_service()
+        history, stats_history = db_service.get_snapshot(limit=limit, seat_number=seat_number)
+
+        return NumpyORJSONResponse({
+            "success": True,
+            "history": history,
+            "stats": stats_history,
+            "history_count": len(history),
+            "stats_count": len(stats_history)
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting snapshot: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/stats/history")
 async def get_stats_history(limit: int = 100):
     """
@@ -233,11 +289,11 @@ async def get_stats_history(limit: int = 100):
         db_service = get_database_service()
         stats_history = db_service.get_stats_history(limit=limit)
 
-        return {
+        return NumpyORJSONResponse({
             "success": True,
             "stats": [s.to_dict() for s in stats_history],
             "count": len(stats_history)
-        }
+        })
 
     except Exception as e:
         logger.error(f"Error getting stats history: {e}", exc_info=True)
@@ -0,0 +1,200 @@
+"""
+Out-of-process video detection worker
+Runs SeatOccupancyDetector in a spawned child process so batch inference
+never competes with the API process for the GIL
+"""
+import logging
+import threading
+import multiprocessing as mp
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Optional, Tuple
+from uuid import uuid4
+
+from api.config import settings
+from api.models.schemas import DetectionResults
+
+logger = logging.getLogger(__name__)
+
+# How often a waiting job thread checks that the worker is still alive
+_LIVENESS_POLL_SECONDS = 5.0
+
+
+def _worker_main(task_queue, event_queue, max_workers: int):
+    """
+    Child process entry point
+
+    Loads the detector once, then runs tasks from task_queue on a thread pool
+    (so concurrent jobs still share batched forward passes) and reports
+    progress/completed/failed events on event_queue. A None task stops it.
+    """
+    from api.services.detection_service import SeatOccupancyDetector
+
+    detector = SeatOccupancyDetector(
+        weights_path=str(settings.weights_path),
+        img_size=settings.model_img_size,
+        conf_threshold=settings.model_conf_threshold,
+        iou_threshold=settings.model_iou_threshold,
+        device=settings.model_device,
+        classes=settings.detection_class_list,
+        occupancy_time_threshold=settings.occupancy_time_threshold,
+        proximity_threshold=settings.occupancy_proximity_threshold
+    )
+    event_queue.put(("ready", None, None))
+
+    def run(task_id: str, kwargs: Dict):
+        def progress_callback(current_frame, total_frames):
+            event_queue.put(("progress", task_id, (current_frame, total_frames)))
+
+        try:
+            results = detector.detect_video(progress_callback=progress_callback, **kwargs)
+            event_queue.put(("completed", task_id, results.model_dump(mode='json')))
+        except Exception as e:
+            event_queue.put(("failed", task_id, str(e)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            pool.submit(run, *task)
+
+    detector.cleanup()
+
+
+class BatchWorkerProcess:
+    """
+    Proxy for a detector running in a separate process
+
+    Exposes the same blocking detect_video() as SeatOccupancyDetector, so
+    JobManager can hand it to its executor threads unchanged: each call
+    enqueues a task and waits for the child to report the outcome. Progress
+    events are relayed to the caller's callback from a listener thread.
+    """
+
+    def __init__(self, max_workers: int = 3):
+        """Initialize worker proxy (the process starts on start())"""
+        self.max_workers = max_workers
+        self._ctx = mp.get_context('spawn')
+        self._process: Optional[mp.Process] = None
+        self._task_queue = None
+        self._event_queue = None
+        self._listener: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # task_id -> (future, progress_callback)
+        self._tasks: Dict[str, Tuple[Future, Optional[Callable]]] = {}
+
+    @property
+    def is_alive(self) -> bool:
+        """Whether the worker process is running"""
+        return self._process is not None and self._process.is_alive()
+
+    def start(self):
+        """Spawn the worker process and the event listener"""
+        with self._lock:
+            if self.is_alive:
+                return
+            self._task_queue = self._ctx.Queue()
+            self._event_queue = self._ctx.Queue()
+            self._process = self._ctx.Process(
+                target=_worker_main,
+                args=(self._task_queue, self._event_queue, self.max_workers),
+                name="batch-worker",
+                daemon=True
+            )
+            self._process.start()
+            self._listener = threading.Thread(target=self._listen, name="batch-worker-events", daemon=True)
+            self._listener.start()
+        logger.info("Started batch worker process (pid %s)", self._process.pid)
+
+    def stop(self):
+        """Ask the worker to finish its tasks and exit"""
+        with self._lock:
+            if self._process is None:
+                return
+            self._task_queue.put(None)
+            self._process.join(timeout=settings.job_timeout_minutes * 60)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._event_queue.put(None)
+            self._process = None
+        self._fail_all(RuntimeError("Batch worker stopped"))
+
+    def detect_video(
+        self,
+        source_path: str,
+        output_path: Optional[str] = None,
+        save_video: bool = True,
+        include_frame_stats: bool = False,
+        progress_callback: Optional[Callable] = None
+    ) -> DetectionResults:
+        """Run detection in the worker process and block until it finishes"""
+        if not self.is_alive:
+            self.start()
+
+        task_id = uuid4().hex
+        future: Future = Future()
+        self._tasks[task_id] = (future, progress_callback)
+        self._task_queue.put((task_id, {
+            'source_path': source_path,
+            'output_path': output_path,
+            'save_video': save_video,
+            'include_frame_stats': include_frame_stats
+        }))
+
+        # A crashed child never reports back; don't let job threads hang on it
+        while True:
+            try:
+                return future.result(timeout=_LIVENESS_POLL_SECONDS)
+            except FutureTimeout:
+                if not self.is_alive:
+                    self._tasks.pop(task_id, None)
+                    raise RuntimeError("Batch worker process exited unexpectedly")
+
+    def _listen(self):
+        """Resolve task futures from worker events"""
+        event_queue = self._event_queue
+        while True:
+            event = event_queue.get()
+            if event is None:
+                break
+            kind, task_id, payload = event
+
+            if kind == "ready":
+                logger.info("Batch worker process loaded its model")
+                continue
+
+            if kind == "progress":
+                entry = self._tasks.get(task_id)
+                if entry and entry[1]:
+                    try:
+                        entry[1](*payload)
+                    except Exception as e:
+                        logger.error("Progress callback failed: %s", e)
+                continue
+
+            entry = self._tasks.pop(task_id, None)
+            if entry is None:
+                continue
+            if kind == "completed":
+                entry[0].set_result(DetectionResults(**payload))
+            else:
+                entry[0].set_exception(RuntimeError(payload))
+
+    def _fail_all(self, error: Exception):
+        """Fail every outstanding task"""
+        while self._tasks:
+            _, (future, _) = self._tasks.popitem()
+            if not future.done():
+                future.set_exception(error)
+
+
+# Global batch worker instance
+_batch_worker: Optional[BatchWorkerProcess] = None
+
+
+def get_batch_worker() -> BatchWorkerProcess:
+    """Get or create global batch worker instance"""
+    global _batch_worker
+    if _batch_worker is None:
+        _batch_worker = BatchWorkerProcess(max_workers=settings.max_concurrent_jobs)
+    return _batch_worker
@@ -0,0 +1,107 @@
+"""
+Camera probing with a short-lived result cache
+Opening a VideoCapture can take hundreds of ms (DirectShow init, codec
+probe), so repeated /test-camera and /start calls reuse recent results
+"""
+import os
+import sys
+import time
+import logging
+
+# MSMF's hardware transforms can stall camera open for seconds; OpenCV
+# reads this when the backend first initializes, so it has to be set
+# before any VideoCapture (start_webcam opens through this module)
+os.environ.setdefault("OPENCV_VIDEOIO_MSMF_ENABLE_HW_TRANSFORMS", "0")
+
+import cv2
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CAMERA_PROBE_TTL = 60.0  # seconds
+
+# camera_index -> (probed_at, probe result)
+_camera_probe_cache: Dict[int, Tuple[float, Dict]] = {}
+
+
+def camera_backends() -> List[int]:
+    """VideoCapture backends to try, in order, for this platform"""
+    if sys.platform == 'win32':
+        # CAP_ANY resolves to MSMF, which is slow to open; DirectShow first
+        return [cv2.CAP_DSHOW, cv2.CAP_MSMF]
+    if sys.platform.startswith('linux'):
+        # V4L2 honours the MJPG FOURCC and buffer size start_webcam asks for
+        return [cv2.CAP_V4L2, cv2.CAP_ANY]
+    return [cv2.CAP_ANY]
+
+
+def get_cached_probe(camera_index: int) -> Optional[Dict]:
+    """Get a probe result for camera_index if it is younger than the TTL"""
+    entry = _camera_probe_cache.get(camera_index)
+    if entry is None:
+        return None
+    probed_at, result = entry
+    if time.monotonic() - probed_at > CAMERA_PROBE_TTL:
+        _camera_probe_cache.pop(camera_index, None)
+        return None
+    return result
+
+
+def cache_probe(camera_index: int, result: Dict):
+    """Store a probe result for camera_index"""
+    _camera_probe_cache[camera_index] = (time.monotonic(), result)
+
+
+def invalidate_probe(camera_index: Optional[int] = None):
+    """Drop the cached probe for one camera, or for all cameras"""
+    if camera_index is None:
+        _camera_probe_cache.clear()
+    else:
+        _camera_probe_cache.pop(camera_index, None)
+
+
+def probe_camera(camera_index: int, use_cache: bool = True) -> Dict:
+    """
+    Check whether a camera can be opened and deliver frames
+
+    Returns:
+        Dict with success, opened, backend (the VideoCapture API that
+        worked), width, height, fps and frame_shape
+    """
+    if use_cache:
+        cached = get_cached_probe(camera_index)
+        if cached is not None:
+            return cached
+
+    result = {
+        "success": False,
+        "opened": False,
+        "backend": None,
+        "width": 0,
+        "height": 0,
+        "fps": 0,
+        "frame_shape": None
+    }
+
+    for backend in camera_backends():
+        cap = cv2.VideoCapture(camera_index, backend)
+        try:
+            if not cap.isOpened():
+                continue
+
+            result["opened"] = True
+            result["backend"] = backend
+            result["width"] = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            result["height"] = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            result["fps"] = int(cap.get(cv2.CAP_PROP_FPS))
+
+            # grab() proves frames arrive without decoding one
+            if cap.grab():
+                result["success"] = True
+                result["frame_shape"] = [result["height"], result["width"], 3]
+            break
+        finally:
+            cap.release()
+
+    cache_probe(camera_index, result)
+    return result
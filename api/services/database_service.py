@@ -1,35 +1,220 @@
 """
 Database service for seat occupancy management
 """
+import time
+import queue
+import logging
+import threading
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
+from sqlalchemy import delete, func, select
 from sqlalchemy.orm import Session
-from api.models.database import Seat, OccupancyHistory, OccupancyStats, SessionLocal
+from api.models.database import (
+    Seat, OccupancyHistory, OccupancyStats, ScopedSession, SeatDTO,
+    bulk_record_events, bulk_upsert_seats, seat_to_dto
+)
+
+logger = logging.getLogger(__name__)
+
+EVENT_FLUSH_INTERVAL = 0.5  # seconds a queued event may wait for its batch
+EVENT_FLUSH_BATCH = 256  # max events per history INSERT
+
+
+class _EventWriter:
+    """
+    Background writer for individually logged occupancy events
+
+    Events are queued by the caller and written by one daemon thread with
+    its own session, as one bulk INSERT + commit per batch: whichever comes
+    first of EVENT_FLUSH_BATCH events or EVENT_FLUSH_INTERVAL after the
+    batch's first event. History reads may lag by up to that interval.
+    """
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def put(self, event: Dict):
+        """Queue one OccupancyHistory column dictionary"""
+        self.put_many((event,))
+
+    def put_many(self, events):
+        """Queue several OccupancyHistory column dictionaries"""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="occupancy-events", daemon=True)
+                    self._thread.start()
+        for event in events:
+            self._queue.put(event)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every event queued so far is committed"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch: List[Dict] = []
+            waiters: List[threading.Event] = []
+            item = self._queue.get()
+            deadline = time.monotonic() + EVENT_FLUSH_INTERVAL
+
+            # Fill the batch; a flush() marker writes it right away
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= EVENT_FLUSH_BATCH:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch:
+                db = ScopedSession()
+                try:
+                    bulk_record_events(db, batch)
+                except Exception as e:
+                    db.rollback()
+                    logger.error("Failed to write %d occupancy events: %s", len(batch), e)
+            for waiter in waiters:
+                waiter.set()
+
+
+def _seat_key(seat_data: Dict) -> str:
+    """Seat number of an ingested seat dict (callers may pass an int 'id')"""
+    seat_number = seat_data.get('seat_number') or seat_data.get('id')
+    return seat_number if isinstance(seat_number, str) else str(seat_number)
 
 
 class DatabaseService:
     """
     Service for managing seat occupancy database operations
+
+    Safe to share across threads: each thread gets its own session from
+    ScopedSession (and its own frame-transaction depth), backed by the
+    engine's connection pool.
+
+    bulk_upsert_seats() keeps the last row it wrote for each seat, so
+    unchanged seats are skipped without touching the database. Rows a
+    thread writes are staged per thread and only reach the shared cache
+    once its transaction commits; any other seat write, or a rolled-back
+    frame, invalidates the affected cached rows.
     """
 
     def __init__(self):
-        self.db: Optional[Session] = None
+        self._local = threading.local()
+        self._events = _EventWriter()
+        # seat_number -> last committed row written by bulk_upsert_seats()
+        self._seat_cache: Dict[str, Dict] = {}
+        self._cache_lock = threading.Lock()
+
+    @property
+    def _frame_depth(self) -> int:
+        return getattr(self._local, 'frame_depth', 0)
+
+    @_frame_depth.setter
+    def _frame_depth(self, value: int):
+        self._local.frame_depth = value
+
+    @property
+    def _pending_seats(self) -> Dict[str, Optional[Dict]]:
+        """Seat rows this thread wrote but hasn't committed (None: invalidated)"""
+        pending = getattr(self._local, 'pending_seats', None)
+        if pending is None:
+            pending = self._local.pending_seats = {}
+        return pending
+
+    def _invalidate_seat(self, seat_number: str):
+        """Drop a seat's cached row now and again when this thread commits"""
+        with self._cache_lock:
+            self._seat_cache.pop(seat_number, None)
+        self._pending_seats[seat_number] = None
+
+    def _publish_seats(self):
+        """Apply this thread's committed seat rows to the shared cache"""
+        pending = self._pending_seats
+        if not pending:
+            return
+        with self._cache_lock:
+            for seat_number, row in pending.items():
+                if row is None:
+                    self._seat_cache.pop(seat_number, None)
+                else:
+                    self._seat_cache[seat_number] = row
+        pending.clear()
+
+    def _discard_seats(self):
+        """Forget this thread's uncommitted seat rows after a rollback or failed commit"""
+        pending = self._pending_seats
+        with self._cache_lock:
+            for seat_number in pending:
+                self._seat_cache.pop(seat_number, None)
+        pending.clear()
 
     def get_session(self) -> Session:
-        """Get database session"""
-        if self.db is None:
-            self.db = SessionLocal()
-        return self.db
+        """Get the calling thread's database session"""
+        return ScopedSession()
 
     def close(self):
-        """Close database session"""
-        if self.db:
-            self.db.close()
-            self.db = None
+        """Close the calling thread's database session"""
+        ScopedSession.remove()
+
+    # ===== Transaction Boundaries =====
+
+    def begin_frame(self):
+        """
+        Open a frame-level transaction
+
+        Until the matching end_frame(), writes are only flushed, so every
+        seat, event and stats row for a frame shares one commit (one fsync).
+        Calls nest; only the outermost end_frame() commits.
+        """
+        self._frame_depth += 1
+
+    def end_frame(self, commit: bool = True):
+        """Close a frame-level transaction, committing or rolling back the frame's writes"""
+        self._frame_depth = max(0, self._frame_depth - 1)
+        if self._frame_depth:
+            return
+        db = self.get_session()
+        if commit:
+            try:
+                db.commit()
+            except Exception:
+                self._discard_seats()
+                raise
+            self._publish_seats()
+        else:
+            db.rollback()
+            self._discard_seats()
+
+    def _commit(self):
+        """Commit now, or just flush when inside begin_frame()/end_frame()"""
+        db = self.get_session()
+        if self._frame_depth:
+            db.flush()
+            return
+        try:
+            db.commit()
+        except Exception:
+            self._discard_seats()
+            raise
+        self._publish_seats()
 
     # ===== Seat Operations =====
 
-    def upsert_seat(self, seat_data: Dict) -> Seat:
+    def upsert_seat(self, seat_data: Dict, events: Optional[List[Dict]] = None) -> Seat:
         """
         Insert or update seat data
 
@@ -41,13 +226,16 @@ class DatabaseService:
                 - bbox: list[float] (optional)
                 - duration: int (optional)
                 - duration_exceeded: bool (optional)
+            events: Optional buffer; status change events are appended here
+                instead of being written immediately
         """
         db = self.get_session()
 
-        seat_number = seat_data.get('seat_number') or seat_data.get('id')
+        seat_number = _seat_key(seat_data)
+        self._invalidate_seat(seat_number)
 
         # Try to find existing seat
-        seat = db.query(Seat).filter(Seat.seat_number == str(seat_number)).first()
+        seat = db.query(Seat).filter(Seat.seat_number == seat_number).first()
 
         if seat:
             # Update existing seat
@@ -71,22 +259,24 @@ class DatabaseService:
             elif seat.status == 'available':
                 seat.occupied_since = None
 
-            seat.last_updated = datetime.utcnow()
-
             # Log status change
             if old_status != seat.status:
-                self._log_occupancy_event(
-                    seat_number=seat_number,
-                    person_id=seat.person_id,
-                    event_type='occupied' if seat.status == 'occupied' else 'freed',
-                    duration=seat.duration if seat.status == 'available' else None
-                )
+                event = {
+                    'seat_number': seat_number,
+                    'person_id': seat.person_id,
+                    'event_type': 'occupied' if seat.status == 'occupied' else 'freed',
+                    'duration': seat.duration if seat.status == 'available' else None
+                }
+                if events is not None:
+                    events.append(event)
+                else:
+                    self._log_occupancy_event(**event)
 
         else:
             # Create new seat
             bbox = seat_data.get('bbox', [None, None, None, None])
             seat = Seat(
-                seat_number=str(seat_number),
+                seat_number=seat_number,
                 status=seat_data.get('status', 'available'),
                 person_id=seat_data.get('person_id'),
                 duration=seat_data.get('duration', 0),
@@ -99,14 +289,13 @@ class DatabaseService:
             )
             db.add(seat)
 
-        db.commit()
-        db.refresh(seat)
+        self._commit()
         return seat
 
     def get_seat(self, seat_number: str) -> Optional[Seat]:
         """Get seat by number"""
         db = self.get_session()
-        return db.query(Seat).filter(Seat.seat_number == str(seat_number)).first()
+        return db.query(Seat).filter(Seat.seat_number == seat_number).first()
 
     def get_all_seats(self) -> List[Seat]:
         """Get all seats"""
@@ -116,18 +305,41 @@ class DatabaseService:
     def delete_seat(self, seat_number: str) -> bool:
         """Delete seat"""
         db = self.get_session()
-        seat = db.query(Seat).filter(Seat.seat_number == str(seat_number)).first()
+        seat = db.query(Seat).filter(Seat.seat_number == seat_number).first()
+        self._invalidate_seat(seat_number)
         if seat:
             db.delete(seat)
             db.commit()
+            self._publish_seats()
             return True
         return False
 
+    def delete_session_seats(self, session_id: str) -> int:
+        """Delete a frame session's "<session_id>-<n>" seats; returns how many were removed"""
+        db = self.get_session()
+        prefix = f"{session_id}-"
+        seat_numbers = [
+            seat_number for (seat_number,) in
+            db.execute(select(Seat.seat_number).where(Seat.seat_number.startswith(prefix, autoescape=True)))
+            if seat_number[len(prefix):].isdigit()  # not another session whose id extends this one
+        ]
+        if not seat_numbers:
+            return 0
+        for seat_number in seat_numbers:
+            self._invalidate_seat(seat_number)
+        db.execute(delete(Seat).where(Seat.seat_number.in_(seat_numbers)))
+        db.commit()
+        self._publish_seats()
+        return len(seat_numbers)
+
     def clear_all_seats(self):
         """Clear all seats (for reset)"""
         db = self.get_session()
+        self._pending_seats.clear()
         db.query(Seat).delete()
         db.commit()
+        with self._cache_lock:
+            self._seat_cache.clear()
 
     # ===== Occupancy History Operations =====
 
@@ -138,9 +350,12 @@ class DatabaseService:
         event_type: str,
         duration: Optional[int] = None,
         notes: Optional[str] = None
-    ) -> OccupancyHistory:
+    ):
         """
-        Log occupancy event to history
+        Queue an occupancy event for the background history writer
+
+        The caller never waits on a commit; the event keeps the time it
+        was logged, not the time its batch is written.
 
         Args:
             seat_number: Seat identifier
@@ -149,21 +364,44 @@ class DatabaseService:
             duration: Duration in seconds (for freed events)
             notes: Additional notes
         """
-        db = self.get_session()
+        self._events.put({
+            'seat_number': seat_number,
+            'person_id': person_id,
+            'event_type': event_type,
+            'duration': duration,
+            'notes': notes,
+            'timestamp': datetime.utcnow()
+        })
+
+    def bulk_log_events(self, events: List[Dict]):
+        """
+        Queue a burst of occupancy events (e.g. a whole area freed at once)
 
-        event = OccupancyHistory(
-            seat_number=str(seat_number),
-            person_id=person_id,
-            event_type=event_type,
-            duration=duration,
-            notes=notes,
-            timestamp=datetime.utcnow()
+        Same keys as _log_occupancy_event(). The background writer turns
+        them into executemany INSERTs of up to EVENT_FLUSH_BATCH rows, each
+        in a single transaction, so the caller never waits on the database.
+        """
+        now = datetime.utcnow()
+        self._events.put_many(
+            {
+                'seat_number': event['seat_number'],
+                'person_id': event.get('person_id'),
+                'event_type': event['event_type'],
+                'duration': event.get('duration'),
+                'notes': event.get('notes'),
+                'timestamp': event.get('timestamp') or now
+            }
+            for event in events
         )
 
-        db.add(event)
-        db.commit()
-        db.refresh(event)
-        return event
+    def flush_events(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for queued occupancy events to be committed
+
+        Returns:
+            False if timeout expired first
+        """
+        return self._events.flush(timeout)
 
     def get_seat_history(
         self,
@@ -181,7 +419,7 @@ class DatabaseService:
         query = db.query(OccupancyHistory).order_by(OccupancyHistory.timestamp.desc())
 
         if seat_number:
-            query = query.filter(OccupancyHistory.seat_number == str(seat_number))
+            query = query.filter(OccupancyHistory.seat_number == seat_number)
 
         return query.limit(limit).all()
 
@@ -204,13 +442,11 @@ class DatabaseService:
             total_seats=stats_data.get('total_seats', 0),
             occupied_seats=stats_data.get('occupied_seats', 0),
             available_seats=stats_data.get('available_seats', 0),
-            person_count=stats_data.get('person_count', 0),
-            timestamp=datetime.utcnow()
+            person_count=stats_data.get('person_count', 0)
         )
 
         db.add(stats)
-        db.commit()
-        db.refresh(stats)
+        self._commit()
         return stats
 
     def get_latest_stats(self) -> Optional[OccupancyStats]:
@@ -223,8 +459,142 @@ class DatabaseService:
         db = self.get_session()
         return db.query(OccupancyStats).order_by(OccupancyStats.timestamp.desc()).limit(limit).all()
 
+    def get_snapshot(
+        self,
+        limit: int = 100,
+        seat_number: Optional[str] = None
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Get occupancy history and statistics history together
+
+        Both SELECTs run on one connection inside a single read transaction,
+        so dashboards polling both lists pay for one session checkout and
+        see a consistent view.
+
+        Args:
+            limit: Max number of records per list
+            seat_number: Filter history by seat number (optional)
+
+        Returns:
+            (occupancy history, statistics history) as dicts, newest first;
+            rows are serialized before commit expires them
+        """
+        db = self.get_session()
+        if db.in_transaction():
+            db.commit()  # end any stale read so the snapshot is current
+
+        with db.begin():
+            history = [h.to_dict() for h in self.get_seat_history(seat_number=seat_number, limit=limit)]
+            stats_history = [s.to_dict() for s in self.get_stats_history(limit=limit)]
+        return history, stats_history
+
     # ===== Bulk Operations =====
 
+    def bulk_upsert_seats(self, seats_data: List[Dict]) -> int:
+        """
+        Insert or update many seats in O(1) round-trips
+
+        Same field semantics as upsert_seat(): the current state of the
+        affected seats comes from the write-through cache (one SELECT for
+        seats not cached yet), status transitions and occupied_since are
+        resolved in Python, then only seats whose row actually changed are
+        written, as one multi-row UPSERT plus one history INSERT under a
+        single commit. Nothing is written when no seat changed.
+
+        Args:
+            seats_data: List of seat dictionaries (see upsert_seat)
+
+        Returns:
+            Number of status change events recorded
+        """
+        db = self.get_session()
+
+        # Last entry wins if a seat appears twice
+        by_number = {_seat_key(d): d for d in seats_data}
+        if not by_number:
+            return 0
+
+        # This thread's uncommitted rows win over the shared cache
+        pending = self._pending_seats
+        with self._cache_lock:
+            cache = {seat_number: self._seat_cache.get(seat_number) for seat_number in by_number}
+        cache.update((seat_number, row) for seat_number, row in pending.items() if seat_number in by_number)
+        misses = [seat_number for seat_number, row in cache.items() if row is None]
+        if misses:
+            for row in db.execute(
+                select(
+                    Seat.seat_number, Seat.status, Seat.person_id, Seat.occupied_since,
+                    Seat.duration, Seat.duration_exceeded,
+                    Seat.bbox_x1, Seat.bbox_y1, Seat.bbox_x2, Seat.bbox_y2
+                ).where(Seat.seat_number.in_(misses))
+            ):
+                cache[row.seat_number] = pending[row.seat_number] = row._asdict()
+
+        now = datetime.utcnow()
+        rows: List[Dict] = []
+        events: List[Dict] = []
+        for seat_number, seat_data in by_number.items():
+            old = cache.get(seat_number)
+            bbox = seat_data.get('bbox')
+
+            if old is None:
+                status = seat_data.get('status', 'available')
+                row = {
+                    'seat_number': seat_number,
+                    'status': status,
+                    'person_id': seat_data.get('person_id'),
+                    'duration': seat_data.get('duration', 0),
+                    'duration_exceeded': seat_data.get('duration_exceeded', False),
+                    'occupied_since': now if status == 'occupied' else None
+                }
+            else:
+                status = seat_data.get('status', old['status'])
+                if status == 'occupied' and old['status'] == 'available':
+                    occupied_since = now
+                elif status == 'available':
+                    occupied_since = None
+                else:
+                    occupied_since = old['occupied_since']
+                row = {
+                    'seat_number': seat_number,
+                    'status': status,
+                    'person_id': seat_data.get('person_id', old['person_id']),
+                    'duration': seat_data.get('duration', old['duration']),
+                    'duration_exceeded': seat_data.get('duration_exceeded', old['duration_exceeded']),
+                    'occupied_since': occupied_since
+                }
+                if old['status'] != status:
+                    events.append({
+                        'seat_number': seat_number,
+                        'person_id': row['person_id'],
+                        'event_type': 'occupied' if status == 'occupied' else 'freed',
+                        'duration': row['duration'] if status == 'available' else None
+                    })
+                if not bbox:
+                    bbox = (old['bbox_x1'], old['bbox_y1'], old['bbox_x2'], old['bbox_y2'])
+
+            bbox = bbox or (None, None, None, None)
+            row.update(bbox_x1=bbox[0], bbox_y1=bbox[1], bbox_x2=bbox[2], bbox_y2=bbox[3])
+            if row != old:
+                rows.append(row)
+
+        if not rows:
+            if not self._frame_depth:
+                self._publish_seats()
+            return 0
+
+        # Staged until the commit; a rolled-back frame discards them in end_frame()
+        pending.update((row['seat_number'], row) for row in rows)
+        try:
+            bulk_upsert_seats(db, rows)
+            if events:
+                db.bulk_insert_mappings(OccupancyHistory, events)
+        except Exception:
+            self._discard_seats()
+            raise
+        self._commit()
+        return len(events)
+
     def update_all_seats(self, seats_data: List[Dict]):
         """
         Update all seats at once (for frame processing)
@@ -232,31 +602,54 @@ class DatabaseService:
         Args:
             seats_data: List of seat dictionaries
         """
-        for seat_data in seats_data:
-            self.upsert_seat(seat_data)
+        self.bulk_upsert_seats(seats_data)
 
-    def get_current_occupancy(self) -> Dict:
+    def get_occupancy_counts(self) -> Dict:
+        """
+        Get seat counts by status, aggregated in SQL
+
+        Returns:
+            Dictionary with total_seats, occupied_seats, available_seats
+        """
+        db = self.get_session()
+        counts = dict(db.execute(select(Seat.status, func.count(Seat.id)).group_by(Seat.status)).all())
+
+        return {
+            'total_seats': sum(counts.values()),
+            'occupied_seats': counts.get('occupied', 0),
+            'available_seats': counts.get('available', 0)
+        }
+
+    def get_occupancy_detail(self) -> List[SeatDTO]:
+        """Get every seat as a SeatDTO, projected from columns without loading ORM objects"""
+        db = self.get_session()
+        rows = db.execute(
+            select(
+                Seat.seat_number, Seat.status, Seat.person_id, Seat.occupied_since,
+                Seat.duration, Seat.duration_exceeded,
+                Seat.bbox_x1, Seat.bbox_y1, Seat.bbox_x2, Seat.bbox_y2, Seat.last_updated
+            ).order_by(Seat.seat_number)
+        )
+        return [seat_to_dto(row) for row in rows]
+
+    def get_current_occupancy(self, include_seats: bool = True) -> Dict:
         """
         Get current occupancy summary
 
+        Args:
+            include_seats: Whether to include the per-seat list
+
         Returns:
             Dictionary with occupancy info:
                 - total_seats: int
                 - occupied_seats: int
                 - available_seats: int
-                - seats: List[Dict]
+                - seats: List[SeatDTO] (if include_seats)
         """
-        seats = self.get_all_seats()
-
-        occupied = sum(1 for s in seats if s.status == 'occupied')
-        available = sum(1 for s in seats if s.status == 'available')
-
-        return {
-            'total_seats': len(seats),
-            'occupied_seats': occupied,
-            'available_seats': available,
-            'seats': [seat.to_dict() for seat in seats]
-        }
+        occupancy = self.get_occupancy_counts()
+        if include_seats:
+            occupancy['seats'] = self.get_occupancy_detail()
+        return occupancy
 
 
 # Global instance
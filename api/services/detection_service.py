@@ -2,33 +2,51 @@
 Detection service - Refactored seat occupancy detection logic
 """
 import os
+import copy
 import cv2
+import threading
 import time
 import torch
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import List, Optional, Tuple, Any
 import numpy as np
 from random import randint
 import torch.backends.cudnn as cudnn
 
-from models.experimental import attempt_load
-from utils.datasets import LoadImages
 from utils.general import (
-    check_img_size, non_max_suppression, scale_coords,
+    scale_coords,
     set_logging, increment_path
 )
-from utils.torch_utils import select_device, time_synchronized, TracedModel
+from utils.torch_utils import select_device, time_synchronized
 from sort import Sort
 
 from api.models.schemas import (
     DetectionResults, OccupancyEvent, BoundingBox,
     FrameStatistics
 )
+from api.services.seat_registry import SeatRegistry
+from api.services.labels import label_width, occupied_label
+from api.services.nms import batched_nms
+from api.services.inference_scheduler import BatchInferenceScheduler
+from api.services.inference_backend import input_memory_format, load_model
+from api.services.video_writer import AsyncVideoWriter
+from api.services.video_reader import open_video_frames
+from api.services.motion_gate import MotionGate
+from api.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+def count_video_frames(path: str) -> int:
+    """Read a video's frame count from its container metadata (0 if unknown)"""
+    cap = cv2.VideoCapture(str(path))
+    try:
+        return max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0) if cap.isOpened() else 0
+    finally:
+        cap.release()
+
+
 class SeatOccupancyDetector:
     """
     Seat occupancy detection and tracking service
@@ -71,16 +89,17 @@ class SeatOccupancyDetector:
         self.trace = trace
 
         # State tracking
-        self.global_identities: Dict = {}
+        self.global_identities: SeatRegistry = SeatRegistry()
         self.start_time: float = 0
         self.person_moved: int = 0
-        self.occupancy_events: List[Dict] = []
 
         # Statistics
         self.total_detections = 0
         self.person_detections = 0
         self.chair_detections = 0
-        self.frame_stats: List[FrameStatistics] = []
+        # Per-frame rows of (frame_number, total_detections, person_count,
+        # chair_count, occupied_seats); models are only built for the response
+        self.frame_stats: List[Tuple[int, int, int, int, int]] = []
 
         # Initialize model
         self.device = None
@@ -92,6 +111,10 @@ class SeatOccupancyDetector:
 
         self._initialize_model()
 
+        # Cross-job batch scheduler (started on first detect_video call)
+        self.scheduler: Optional[BatchInferenceScheduler] = None
+        self._scheduler_lock = threading.Lock()
+
         # Initialize SORT tracker
         self.sort_tracker = Sort(max_age=5, min_hits=2, iou_threshold=0.2)
 
@@ -101,39 +124,47 @@ class SeatOccupancyDetector:
         """Initialize the YOLO model"""
         set_logging()
         self.device = select_device(self.device_name)
-        self.half = self.device.type != 'cpu'
 
         # Load model
         logger.info(f"Loading model from {self.weights_path}")
-        self.model = attempt_load(str(self.weights_path), map_location=self.device)
-        self.stride = int(self.model.stride.max())
-        self.img_size = check_img_size(self.img_size, s=self.stride)
-
-        if self.trace:
-            self.model = TracedModel(self.model, self.device, self.img_size)
-
-        if self.half:
-            self.model.half()
+        self.model, self.stride, self.img_size, self.names, self.half = load_model(
+            self.weights_path, self.device, self.img_size, trace=self.trace
+        )
 
-        # Get names and colors
-        self.names = self.model.module.names if hasattr(self.model, 'module') else self.model.names
+        # Get colors
         self.colors = [[randint(0, 255) for _ in range(3)] for _ in self.names]
 
-        # Run inference once for warmup
-        if self.device.type != 'cpu':
-            self.model(torch.zeros(1, 3, self.img_size, self.img_size)
-                      .to(self.device)
-                      .type_as(next(self.model.parameters())))
-
+        self.warmup()
         logger.info("Model loaded and warmed up")
 
-    def _is_close(self, box_key: Tuple, threshold: Optional[int] = None) -> Tuple[bool, Tuple, bool]:
+    def warmup(self):
+        """
+        Run dummy forward passes so cuDNN kernel selection happens before
+        the first real job, at both single-frame and full batch sizes
+        """
+        if self.device.type == 'cpu':
+            return
+
+        dtype = torch.float16 if self.half else torch.float32
+        memory_format = input_memory_format(self.model, self.device)
+        with torch.inference_mode():
+            for batch_size in sorted({1, max(1, settings.video_batch_max_size)}):
+                self.model(torch.zeros(batch_size, 3, self.img_size, self.img_size,
+                                       device=self.device, dtype=dtype).to(memory_format=memory_format))
+
+    def _is_close(
+        self,
+        box_key: Tuple,
+        threshold: Optional[int] = None,
+        center: Optional[Tuple[float, float]] = None
+    ) -> Tuple[bool, Tuple, bool]:
         """
         Check if a bounding box is close to existing tracked seats
 
         Args:
             box_key: Bounding box coordinates (x1, y1, x2, y2)
             threshold: Distance threshold in pixels
+            center: Precomputed box center (cx, cy), if available
 
         Returns:
             Tuple of (is_close, existing_box_coord, is_first_person)
@@ -144,17 +175,12 @@ class SeatOccupancyDetector:
         if len(self.global_identities) == 0:
             return False, box_key, True
 
-        for existing_box_coord, _ in self.global_identities.items():
-            existing_center = np.array([
-                (existing_box_coord[0] + existing_box_coord[2]) / 2,
-                (existing_box_coord[1] + existing_box_coord[3]) / 2
-            ])
-            current_center = np.array([
-                (box_key[0] + box_key[2]) / 2,
-                (box_key[1] + box_key[3]) / 2
-            ])
-            if np.linalg.norm(existing_center - current_center) < threshold:
-                return True, existing_box_coord, False
+        if center is None:
+            existing_box_coord = self.global_identities.first_within(box_key, threshold)
+        else:
+            existing_box_coord = self.global_identities.first_near(center[0], center[1], threshold)
+        if existing_box_coord is not None:
+            return True, existing_box_coord, False
 
         return False, box_key, False
 
@@ -179,17 +205,19 @@ class SeatOccupancyDetector:
         Returns:
             Image with drawn boxes
         """
-        for i, box in enumerate(bbox):
-            x1, y1, x2, y2 = [int(i) for i in box]
-            x1 += offset[0]
-            x2 += offset[0]
-            y1 += offset[1]
-            y2 += offset[1]
-            cat = int(categories[i]) if categories is not None else 0
+        # Geometry for all boxes at once; the loop below only tracks and draws
+        boxes = np.asarray(bbox).astype(np.int32)
+        boxes[:, [0, 2]] += offset[0]
+        boxes[:, [1, 3]] += offset[1]
+        centers = ((boxes[:, :2] + boxes[:, 2:]) / 2).tolist()
+        cats = np.asarray(categories).astype(int).tolist() if categories is not None else [0] * len(boxes)
+
+        for i, (x1, y1, x2, y2) in enumerate(boxes.tolist()):
+            cat = cats[i]
 
             if cat == 0:  # Person
                 box_key = (x1, y1, x2, y2)
-                box_exist, existing_box_coord, first_person = self._is_close(box_key)
+                box_exist, existing_box_coord, first_person = self._is_close(box_key, center=centers[i])
 
                 if not box_exist and first_person:
                     obj_id = len(self.global_identities) + 1
@@ -199,7 +227,7 @@ class SeatOccupancyDetector:
                         self.person_moved = 0
                     obj_id = self.global_identities[existing_box_coord]
                     label = f"{self.names[cat]} id:{obj_id}"
-                    (w, h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)
+                    w = label_width(label)
                     cv2.rectangle(img, (existing_box_coord[0], existing_box_coord[1]),
                                 (existing_box_coord[2], existing_box_coord[3]), (255, 0, 20), 2)
                     cv2.rectangle(img, (existing_box_coord[0], existing_box_coord[1] - 20),
@@ -212,20 +240,14 @@ class SeatOccupancyDetector:
                     self.start_time = time.time()
 
             elif self.person_moved == 1 and cat == 56:  # Chair
-                for chair_coord, seat_id in self.global_identities.items():
-                    duration = time.time() - self.start_time
-                    time_exceeded = duration >= self.occupancy_time_threshold
-
-                    if duration < self.occupancy_time_threshold:
-                        label = f"Occupied for {duration:.2f} seconds"
-                        color = (0, 0, 255)  # Red
-                        fill = 2
-                    else:
-                        label = f"Occupied for {duration:.2f} seconds - TIME EXCEEDED"
-                        color = (0, 0, 255)
-                        fill = -1  # Filled
-
-                    (w, h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)
+                # Every seat shares one timer, so one label serves them all
+                duration = time.time() - self.start_time
+                time_exceeded = duration >= self.occupancy_time_threshold
+                label, w = occupied_label(duration, time_exceeded)
+                color = (0, 0, 255)  # Red
+                fill = -1 if time_exceeded else 2  # Filled once exceeded
+
+                for chair_coord in self.global_identities:
                     cv2.rectangle(img, (chair_coord[0], chair_coord[1]),
                                 (chair_coord[2], chair_coord[3]), color, fill)
                     cv2.rectangle(img, (chair_coord[0], chair_coord[1] - 20),
@@ -246,6 +268,10 @@ class SeatOccupancyDetector:
         """
         Detect and track objects in a video
 
+        Safe to call from several job threads at once: each call tracks on
+        its own shallow copy of the detector, sharing only the model and the
+        batch scheduler, so frames from concurrent jobs share forward passes.
+
         Args:
             source_path: Path to input video
             output_path: Path to save output video (optional)
@@ -256,18 +282,40 @@ class SeatOccupancyDetector:
         Returns:
             DetectionResults object with all detection data
         """
+        if self.scheduler is None:
+            with self._scheduler_lock:
+                if self.scheduler is None:
+                    self.scheduler = BatchInferenceScheduler(
+                        self.model, self.device, self.half,
+                        max_batch_size=settings.video_batch_max_size,
+                        max_wait_ms=settings.video_batch_wait_ms
+                    )
+
+        return copy.copy(self)._run_video(
+            source_path, output_path, save_video, include_frame_stats, progress_callback
+        )
+
+    def _run_video(
+        self,
+        source_path: str,
+        output_path: Optional[str],
+        save_video: bool,
+        include_frame_stats: bool,
+        progress_callback: Optional[callable]
+    ) -> DetectionResults:
+        """Process one video on a per-job copy (see detect_video)"""
         # Reset state
-        self.global_identities = {}
+        self.global_identities = SeatRegistry()
         self.start_time = time.time()
         self.person_moved = 0
-        self.occupancy_events = []
         self.total_detections = 0
         self.person_detections = 0
         self.chair_detections = 0
         self.frame_stats = []
+        self.sort_tracker = Sort(max_age=5, min_hits=2, iou_threshold=0.2)
 
         # Create dataset
-        dataset = LoadImages(source_path, img_size=self.img_size, stride=self.stride)
+        dataset = open_video_frames(source_path, img_size=self.img_size, stride=self.stride)
 
         # Setup video writer
         vid_writer = None
@@ -277,58 +325,53 @@ class SeatOccupancyDetector:
 
         processing_start = time.time()
         total_frames = 0
+        skipped_frames = 0
+
+        # Frames that barely differ from the last inferred one reuse its detections
+        gate = None
+        if settings.motion_gate_threshold > 0:
+            gate = MotionGate(settings.motion_gate_threshold, settings.motion_gate_max_skip)
+        last_dets: List[Optional[np.ndarray]] = []
 
         logger.info(f"Starting detection on video: {source_path}")
 
-        # Process video frames
-        for frame_idx, (path, img, im0s, vid_cap) in enumerate(dataset):
-            img = torch.from_numpy(img).to(self.device)
-            img = img.half() if self.half else img.float()
-            img /= 255.0
-            if img.ndimension() == 3:
-                img = img.unsqueeze(0)
-
-            # Inference
-            pred = self.model(img, augment=False)[0]
-
-            # Apply NMS
-            pred = non_max_suppression(
-                pred,
-                self.conf_threshold,
-                self.iou_threshold,
-                classes=self.classes,
-                agnostic=False
-            )
+        def handle_frame(frame_idx, img_shape, im0s, vid_cap, raw_pred):
+            """Post-process one frame's prediction (NMS, tracking, drawing, writing)"""
+            nonlocal vid_writer, total_frames, last_dets
+
+            if raw_pred is None:
+                # Gated frame: reuse the last inferred frame's detections
+                frame_dets = last_dets
+            else:
+                # Apply NMS, rescale, and copy each image's (N, 6) detections to host once
+                frame_dets = []
+                for i, det in enumerate(batched_nms(raw_pred, self.conf_threshold, self.iou_threshold,
+                                                    classes=self.classes)):
+                    if len(det):
+                        shape = im0s.shape if isinstance(im0s, np.ndarray) else im0s[i].shape
+                        det[:, :4] = scale_coords(img_shape, det[:, :4], shape).round()
+                        frame_dets.append(det.detach().cpu().numpy().astype(np.float32, copy=False))
+                    else:
+                        frame_dets.append(None)
+                last_dets = frame_dets
 
             # Process detections
-            for i, det in enumerate(pred):
+            for i, dets_to_sort in enumerate(frame_dets):
                 im0 = im0s.copy() if isinstance(im0s, np.ndarray) else im0s[i].copy()
 
                 frame_person_count = 0
                 frame_chair_count = 0
 
-                if len(det):
-                    # Rescale boxes
-                    det[:, :4] = scale_coords(img.shape[2:], det[:, :4], im0.shape).round()
-
+                if dets_to_sort is not None:
                     # Count detections
-                    self.total_detections += len(det)
-
-                    # Prepare for SORT
-                    dets_to_sort = np.empty((0, 6))
-                    for x1, y1, x2, y2, conf, detclass in det.cpu().detach().numpy():
-                        dets_to_sort = np.vstack((
-                            dets_to_sort,
-                            np.array([x1, y1, x2, y2, conf, detclass])
-                        ))
-
-                        # Count by class
-                        if int(detclass) == 0:
-                            frame_person_count += 1
-                            self.person_detections += 1
-                        elif int(detclass) == 56:
-                            frame_chair_count += 1
-                            self.chair_detections += 1
+                    self.total_detections += len(dets_to_sort)
+
+                    # Count by class
+                    cls = dets_to_sort[:, 5].astype(np.int32)
+                    frame_person_count = int(np.count_nonzero(cls == 0))
+                    frame_chair_count = int(np.count_nonzero(cls == 56))
+                    self.person_detections += frame_person_count
+                    self.chair_detections += frame_chair_count
 
                     # Run SORT
                     tracked_dets = self.sort_tracker.update(dets_to_sort)
@@ -345,12 +388,12 @@ class SeatOccupancyDetector:
 
                 # Collect frame statistics
                 if include_frame_stats:
-                    self.frame_stats.append(FrameStatistics(
-                        frame_number=frame_idx,
-                        total_detections=frame_person_count + frame_chair_count,
-                        person_count=frame_person_count,
-                        chair_count=frame_chair_count,
-                        occupied_seats=len(self.global_identities)
+                    self.frame_stats.append((
+                        frame_idx,
+                        frame_person_count + frame_chair_count,
+                        frame_person_count,
+                        frame_chair_count,
+                        len(self.global_identities)
                     ))
 
                 # Save video
@@ -359,7 +402,7 @@ class SeatOccupancyDetector:
                         fps = vid_cap.get(cv2.CAP_PROP_FPS)
                         w = int(vid_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
                         h = int(vid_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                        vid_writer = cv2.VideoWriter(
+                        vid_writer = AsyncVideoWriter(
                             str(output_path),
                             cv2.VideoWriter_fourcc(*'mp4v'),
                             fps,
@@ -374,27 +417,61 @@ class SeatOccupancyDetector:
                 if progress_callback:
                     progress_callback(frame_idx + 1, dataset.nframes if hasattr(dataset, 'nframes') else total_frames)
 
-        # Release video writer
-        if vid_writer:
-            vid_writer.release()
+        # Process video frames: submit frame N to the shared scheduler, then
+        # post-process frame N-1 while N is decoded/queued/inferred
+        pending = None
+        try:
+            for frame_idx, (path, img, im0s, vid_cap) in enumerate(dataset):
+                if gate is None or gate.should_infer(im0s):
+                    future = self.scheduler.submit(img)
+                else:
+                    future = None
+                    skipped_frames += 1
+                if pending is not None:
+                    handle_frame(*pending[:4], pending[4].result() if pending[4] else None)
+                pending = (frame_idx, img.shape[:2], im0s, vid_cap, future)
+
+            if pending is not None:
+                handle_frame(*pending[:4], pending[4].result() if pending[4] else None)
+        finally:
+            # Flush queued frames and stop the encoder thread
+            if vid_writer:
+                vid_writer.release()
 
         processing_time = time.time() - processing_start
         fps = total_frames / processing_time if processing_time > 0 else 0
 
-        logger.info(f"Detection completed: {total_frames} frames in {processing_time:.2f}s ({fps:.2f} FPS)")
+        logger.info(f"Detection completed: {total_frames} frames in {processing_time:.2f}s ({fps:.2f} FPS), "
+                    f"{skipped_frames} reused previous detections")
 
-        # Build occupancy events
+        # Build occupancy events (values are produced here, so skip validation)
         occupancy_events = []
         for seat_bbox, seat_id in self.global_identities.items():
-            occupancy_events.append(OccupancyEvent(
+            occupancy_events.append(OccupancyEvent.model_construct(
                 seat_id=seat_id,
-                bbox=BoundingBox(x1=seat_bbox[0], y1=seat_bbox[1], x2=seat_bbox[2], y2=seat_bbox[3]),
+                bbox=BoundingBox.model_construct(
+                    x1=float(seat_bbox[0]), y1=float(seat_bbox[1]),
+                    x2=float(seat_bbox[2]), y2=float(seat_bbox[3])
+                ),
                 occupied_duration=0.0,  # Would need frame-by-frame tracking for accurate duration
                 time_exceeded=False,
                 first_detected_frame=0,
                 last_detected_frame=total_frames - 1
             ))
 
+        frame_statistics = None
+        if include_frame_stats:
+            frame_statistics = [
+                FrameStatistics.model_construct(
+                    frame_number=frame_number,
+                    total_detections=total,
+                    person_count=persons,
+                    chair_count=chairs,
+                    occupied_seats=occupied
+                )
+                for frame_number, total, persons, chairs, occupied in self.frame_stats
+            ]
+
         # Return results
         return DetectionResults(
             total_frames=total_frames,
@@ -405,11 +482,14 @@ class SeatOccupancyDetector:
             occupancy_events=occupancy_events,
             processing_time=processing_time,
             fps=fps,
-            frame_statistics=self.frame_stats if include_frame_stats else None
+            frame_statistics=frame_statistics
         )
 
     def cleanup(self):
         """Cleanup resources"""
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
         if hasattr(self, 'model'):
             del self.model
         torch.cuda.empty_cache()
@@ -0,0 +1,151 @@
+"""
+Micro-batching for browser-captured frames
+Collects concurrent frame requests and runs them through one model forward pass
+"""
+import asyncio
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from api.config import settings
+from api.services.frame_processor import get_frame_processor
+from api.services.inference_arbiter import get_inference_arbiter
+
+logger = logging.getLogger(__name__)
+
+
+class FrameBatcher:
+    """
+    Dynamic batcher between the frame HTTP handlers and the FrameProcessor
+
+    A batch is dispatched once max_batch_size frames are queued or max_wait_ms
+    has passed since the first frame of the batch arrived, whichever is first.
+    When the previous batch was a single frame and nothing else is queued
+    (one client, or clients far apart), the frame is dispatched at once
+    instead of waiting out max_wait_ms for company that is unlikely to come;
+    under load, frames pile up during each forward pass and batches form
+    without waiting.
+    """
+
+    def __init__(self, max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        """Initialize frame batcher"""
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_batch_size = 0
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the batch loop task is active"""
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the batch loop on the running event loop"""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._batch_loop())
+        logger.info(f"Frame batcher started (max_batch_size={self.max_batch_size}, "
+                    f"max_wait_ms={self.max_wait * 1000:.0f})")
+
+    async def stop(self):
+        """Stop the batch loop and fail any frames still waiting"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        while not self._queue.empty():
+            *_, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Frame batcher stopped"))
+        logger.info("Frame batcher stopped")
+
+    async def submit(self, frame: np.ndarray, session_id: Optional[str] = None) -> Dict:
+        """
+        Queue a frame for batched processing and wait for its result
+
+        Args:
+            frame: BGR image from OpenCV
+            session_id: Client session the frame belongs to (default session if None)
+
+        Returns:
+            Result dict from FrameProcessor for this frame
+        """
+        if not self.is_running:
+            self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        # Counted as in flight from queueing, so batch jobs back off early
+        with get_inference_arbiter().realtime():
+            await self._queue.put((frame, session_id, future))
+            return await future
+
+    async def _collect(self) -> List[Tuple[np.ndarray, Optional[str], asyncio.Future]]:
+        """Wait for the first frame, then gather more until full or timed out"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        if self._last_batch_size <= 1 and self._queue.empty():
+            # Idle fast path: no added latency for a lone client
+            return batch
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _batch_loop(self):
+        """Dispatch collected batches to the processor off the event loop"""
+        while True:
+            batch = await self._collect()
+            self._last_batch_size = len(batch)
+            frames = [frame for frame, _, _ in batch]
+            session_ids = [session_id for _, session_id, _ in batch]
+
+            try:
+                processor = await asyncio.to_thread(get_frame_processor)
+                results = await asyncio.to_thread(processor.process_frames_batch, frames, session_ids)
+            except asyncio.CancelledError:
+                for *_, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"Batch of {len(frames)} frames failed: {e}", exc_info=True)
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (*_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+# Global frame batcher instance
+_frame_batcher: Optional[FrameBatcher] = None
+
+
+def get_frame_batcher() -> FrameBatcher:
+    """Get or create global frame batcher instance"""
+    global _frame_batcher
+    if _frame_batcher is None:
+        _frame_batcher = FrameBatcher(
+            max_batch_size=settings.frame_batch_max_size,
+            max_wait_ms=settings.frame_batch_wait_ms
+        )
+    return _frame_batcher
@@ -3,25 +3,81 @@ Frame processing service for browser-captured video
 Processes individual frames sent from frontend
 """
 import time
+import cv2
 import torch
 import logging
+import threading
+import msgspec
 import numpy as np
 from typing import Dict, List, Optional
 from pathlib import Path
 
-from models.experimental import attempt_load
-from utils.general import check_img_size, non_max_suppression, scale_coords, set_logging
-from utils.torch_utils import select_device, TracedModel
-from sort import Sort
+from utils.general import scale_coords, set_logging
+from utils.torch_utils import select_device
+from sort import Sort, warmup_kernels
 
 from api.config import settings
+from api.services.seat_table import SeatOut, SeatTable
+from api.services.nms import batched_nms
+from api.services.inference_backend import input_memory_format, load_model, scale_input
 from api.services.database_service import get_database_service
 
 logger = logging.getLogger(__name__)
 
+DB_WRITE_INTERVAL = 1.0  # seconds; unchanged seats/stats are rewritten at most this often
+SESSION_IDLE_TIMEOUT = 300.0  # seconds before an idle client's session is dropped
+
+
+def new_tracker() -> Sort:
+    """SORT tracker for one session, configured from SORT_* settings"""
+    return Sort(max_age=settings.sort_max_age, min_hits=settings.sort_min_hits,
+                iou_threshold=settings.sort_iou_threshold)
+
+
+class DetectionOut(msgspec.Struct):
+    """One detection in a frame response, encoded directly with msgspec.json"""
+    bbox: List[float]
+    confidence: float
+    class_id: int = msgspec.field(name='class')
+    class_name: str = 'unknown'
+
+
+class FrameSession:
+    """
+    Tracking state of one browser client
+
+    Each client (camera) gets its own seats, SORT tracker and frame count,
+    so concurrent clients don't match people against each other's seats.
+    The default session (no id) is what anonymous clients share; it owns
+    the plain seat numbers and the stats history. A named session's seats
+    are stored as "<session_id>-<n>".
+    """
+
+    def __init__(self, session_id: Optional[str] = None):
+        self.session_id = session_id
+        self.seats = SeatTable()
+        self.sort_tracker = new_tracker()
+        self.frame_count = 0
+        self.last_process_time = time.time()
+
+        # What was last written to the database, and when
+        self.seats_digest: Optional[bytes] = None
+        self.seats_written_at = 0.0
+        self.stats_written: Optional[tuple] = None
+        self.stats_written_at = 0.0
+
+    def seat_number(self, seat_id: int) -> str:
+        """Database seat number for one of this session's seats"""
+        return str(seat_id) if self.session_id is None else f"{self.session_id}-{seat_id}"
+
 
 class FrameProcessor:
-    """Process individual frames for seat occupancy detection"""
+    """
+    Process individual frames for seat occupancy detection
+
+    One instance holds the model and is shared by all clients; tracking
+    state lives in per-client FrameSession objects (see session()).
+    """
 
     def __init__(
         self,
@@ -44,10 +100,10 @@ class FrameProcessor:
         self.occupancy_time_threshold = occupancy_time_threshold
         self.proximity_threshold = proximity_threshold
 
-        # State tracking
-        self.global_identities: Dict = {}
-        self.frame_count = 0
-        self.last_process_time = time.time()
+        # Per-client tracking state
+        self.default_session = FrameSession()
+        self._sessions: Dict[str, FrameSession] = {}
+        self._sessions_lock = threading.Lock()
 
         # Initialize model
         self.device = None
@@ -55,12 +111,12 @@ class FrameProcessor:
         self.names = None
         self.half = False
         self.stride = None
+        self.memory_format = torch.contiguous_format
+        # Pinned BxHxWx3 staging for batched uploads (CUDA only, grown on demand)
+        self._pinned: Optional[torch.Tensor] = None
 
         self._initialize_model()
 
-        # Initialize SORT tracker
-        self.sort_tracker = Sort(max_age=5, min_hits=2, iou_threshold=0.2)
-
         # Initialize database service
         self.db_service = get_database_service()
 
@@ -70,212 +126,241 @@ class FrameProcessor:
         """Initialize the YOLO model"""
         set_logging()
         self.device = select_device(self.device_name)
-        self.half = self.device.type != 'cpu'
 
         logger.info(f"Loading model from {self.weights_path}")
-        self.model = attempt_load(str(self.weights_path), map_location=self.device)
-        self.stride = int(self.model.stride.max())
-        self.img_size = check_img_size(self.img_size, s=self.stride)
-
-        if self.half:
-            self.model.half()
-
-        self.names = self.model.module.names if hasattr(self.model, 'module') else self.model.names
+        self.model, self.stride, self.img_size, self.names, self.half = load_model(
+            self.weights_path, self.device, self.img_size, trace=True
+        )
+        self.memory_format = input_memory_format(self.model, self.device)
 
         # Warmup
         if self.device.type != 'cpu':
-            self.model(torch.zeros(1, 3, self.img_size, self.img_size)
-                      .to(self.device)
-                      .type_as(next(self.model.parameters())))
+            with torch.inference_mode():
+                self.model(torch.zeros(1, 3, self.img_size, self.img_size, device=self.device,
+                                       dtype=torch.float16 if self.half else torch.float32
+                                       ).to(memory_format=self.memory_format))
+
+        # Compile or load SORT's numba kernels now rather than on the first frame
+        warmup_kernels()
 
         logger.info("Model loaded and warmed up")
 
-    def _is_close(self, box_key: tuple, threshold: Optional[int] = None) -> tuple:
-        """Check if bounding box is close to existing tracked seats"""
+    def session(self, session_id: Optional[str] = None) -> FrameSession:
+        """
+        Get or create a client's session (the default session for None)
+
+        Sessions idle for SESSION_IDLE_TIMEOUT are dropped here, together
+        with their seat rows, so clients that went away don't accumulate.
+        """
+        if session_id is None:
+            return self.default_session
+
+        now = time.time()
+        with self._sessions_lock:
+            stale_ids = [sid for sid, s in self._sessions.items()
+                         if now - s.last_process_time > SESSION_IDLE_TIMEOUT]
+            for stale_id in stale_ids:
+                del self._sessions[stale_id]
+                logger.info(f"Dropped idle frame session {stale_id}")
+
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = FrameSession(session_id)
+
+        for stale_id in stale_ids:
+            self._delete_session_seats(stale_id)
+        return session
+
+    def _delete_session_seats(self, session_id: str):
+        """Remove a named session's seat rows from the database"""
+        try:
+            deleted = self.db_service.delete_session_seats(session_id)
+            logger.debug("Deleted %d seats of frame session %s", deleted, session_id)
+        except Exception as e:
+            logger.error(f"Failed to delete seats of frame session {session_id}: {e}")
+
+    def _is_close(self, session: FrameSession, center: tuple, threshold: Optional[int] = None) -> tuple:
+        """
+        Check if a box center is close to one of the session's tracked seats
+
+        Returns:
+            (box_exist, row of the matching seat or None, first_person)
+        """
         if threshold is None:
             threshold = self.proximity_threshold
 
-        if len(self.global_identities) == 0:
-            return False, box_key, True
+        if len(session.seats) == 0:
+            return False, None, True
+
+        row = session.seats.first_near(center[0], center[1], threshold)
+        return row is not None, row, False
+
+    def _to_device(self, frames: List[np.ndarray]) -> torch.Tensor:
+        """
+        Resize BGR frames to the model input size and upload them as an
+        NxHxWx3 uint8 tensor
+
+        On CUDA the frames are resized straight into a reusable pinned
+        buffer, so the upload is one async copy of the uint8 pixels.
+        """
+        size = (self.img_size, self.img_size)
+        if self.device.type != 'cuda':
+            return torch.from_numpy(np.stack([cv2.resize(frame, size) for frame in frames]))
+
+        if self._pinned is None or len(self._pinned) < len(frames):
+            self._pinned = torch.empty((max(len(frames), settings.frame_batch_max_size),
+                                        self.img_size, self.img_size, 3), dtype=torch.uint8).pin_memory()
+        host = self._pinned[:len(frames)]
+        host_np = host.numpy()
+        for i, frame in enumerate(frames):
+            cv2.resize(frame, size, dst=host_np[i])
+        return host.to(self.device, non_blocking=True)
+
+    def _infer(self, frames: List[np.ndarray]) -> List[torch.Tensor]:
+        """
+        Run one forward pass + NMS over a batch of frames
+
+        Args:
+            frames: BGR images from OpenCV
+
+        Returns:
+            List of N (n,6) detection tensors [xyxy, conf, cls]
+        """
+        # BGR to RGB, HWC to CHW and scaling run on the device
+        img_tensor = scale_input(self._to_device(frames).permute(0, 3, 1, 2).flip(1),
+                                 torch.float16 if self.half else torch.float32, self.memory_format)
 
-        for existing_box_coord, data in self.global_identities.items():
-            existing_center = np.array([
-                (existing_box_coord[0] + existing_box_coord[2]) / 2,
-                (existing_box_coord[1] + existing_box_coord[3]) / 2
-            ])
-            current_center = np.array([
-                (box_key[0] + box_key[2]) / 2,
-                (box_key[1] + box_key[3]) / 2
-            ])
-            if np.linalg.norm(existing_center - current_center) < threshold:
-                return True, existing_box_coord, False
+        # Inference
+        with torch.inference_mode():
+            pred = self.model(img_tensor, augment=False)[0]
 
-        return False, box_key, False
+        # Apply NMS. Its nonzero() waits for the stream, so the upload has
+        # finished reading the staging buffer before the next batch
+        return batched_nms(pred, self.conf_threshold, self.iou_threshold, classes=self.classes)
 
-    def process_frame(self, frame: np.ndarray) -> Dict:
+    def process_frame(self, frame: np.ndarray, session_id: Optional[str] = None) -> Dict:
         """
         Process a single frame and return detection results
 
         Args:
             frame: BGR image from OpenCV
+            session_id: Client whose tracking state the frame advances
+                (default session if None)
 
         Returns:
-            Dict with detections and occupancy statistics
+            Dict with detections and occupancy statistics; detections and
+            seats are msgspec structs, so encode it with msgspec.json
         """
-        import cv2
+        pred = self._infer([frame])
+        return self._update_from_detections(self.session(session_id), frame, pred[0])
 
-        self.frame_count += 1
-        current_time = time.time()
+    def process_frames_batch(
+        self,
+        frames: List[np.ndarray],
+        session_ids: Optional[List[Optional[str]]] = None
+    ) -> List[Dict]:
+        """
+        Process several frames with a single model forward pass
 
-        # Prepare image for inference
-        img = cv2.resize(frame, (self.img_size, self.img_size))
-        img = img[:, :, ::-1].transpose(2, 0, 1)  # BGR to RGB, to 3xHxW
-        img = np.ascontiguousarray(img)
+        Frames may come from different clients. Each session's tracking
+        state is advanced frame by frame in list order, so results match
+        calling process_frame() on each frame in turn.
 
-        img_tensor = torch.from_numpy(img).to(self.device)
-        img_tensor = img_tensor.half() if self.half else img_tensor.float()
-        img_tensor /= 255.0
-        if img_tensor.ndimension() == 3:
-            img_tensor = img_tensor.unsqueeze(0)
+        Args:
+            frames: BGR images from OpenCV
+            session_ids: Per-frame session ids (all default session if None)
 
-        # Inference
-        with torch.no_grad():
-            pred = self.model(img_tensor, augment=False)[0]
+        Returns:
+            List of per-frame result dicts (same shape as process_frame())
+        """
+        if not frames:
+            return []
 
-        # Apply NMS
-        pred = non_max_suppression(
-            pred,
-            self.conf_threshold,
-            self.iou_threshold,
-            classes=self.classes,
-            agnostic=False
-        )
+        sessions = [self.session(session_id) for session_id in (session_ids or [None] * len(frames))]
+        pred = self._infer(frames)
+        return [self._update_from_detections(session, frame, det)
+                for session, frame, det in zip(sessions, frames, pred)]
+
+    def _update_from_detections(self, session: FrameSession, frame: np.ndarray, det: torch.Tensor) -> Dict:
+        """Update a session's tracking/occupancy state from one frame's detections"""
+        session.frame_count += 1
+        current_time = time.time()
 
         # Process detections
-        detections = []
+        detections: List[DetectionOut] = []
         person_count = 0
         chair_count = 0
 
-        for i, det in enumerate(pred):
-            if len(det):
-                # Rescale boxes
-                det[:, :4] = scale_coords(img_tensor.shape[2:], det[:, :4], frame.shape).round()
-
-                # Prepare for SORT
-                dets_to_sort = np.empty((0, 6))
-                for x1, y1, x2, y2, conf, detclass in det.cpu().detach().numpy():
-                    dets_to_sort = np.vstack((
-                        dets_to_sort,
-                        np.array([x1, y1, x2, y2, conf, detclass])
-                    ))
-
-                    # Count by class
-                    class_id = int(detclass)
-                    if class_id == 0:
-                        person_count += 1
-                    elif class_id == 56:
-                        chair_count += 1
-
-                    # Add to detections list
-                    detections.append({
-                        'bbox': [float(x1), float(y1), float(x2), float(y2)],
-                        'confidence': float(conf),
-                        'class': class_id,
-                        'class_name': self.names[class_id] if class_id < len(self.names) else 'unknown'
-                    })
-
-                # Run SORT tracking
-                tracked_dets = self.sort_tracker.update(dets_to_sort)
-
-                # Update seat tracking
-                for track in tracked_dets:
-                    x1, y1, x2, y2 = track[:4]
-                    class_id = int(track[4])
-
-                    if class_id == 0:  # Person
-                        box_key = (int(x1), int(y1), int(x2), int(y2))
-                        box_exist, existing_box_coord, first_person = self._is_close(box_key)
-
-                        if not box_exist and first_person:
-                            obj_id = len(self.global_identities) + 1
-                            self.global_identities[box_key] = {
-                                'id': obj_id,
-                                'start_time': current_time,
-                                'is_occupied': True,
-                                'last_seen': current_time
-                            }
-                        elif box_exist:
-                            self.global_identities[existing_box_coord]['is_occupied'] = True
-                            self.global_identities[existing_box_coord]['last_seen'] = current_time
-            else:
-                self.sort_tracker.update()
+        if len(det):
+            # Rescale boxes
+            det[:, :4] = scale_coords((self.img_size, self.img_size), det[:, :4], frame.shape).round()
+
+            # Prepare for SORT: one device-to-host copy of the (N, 6) detections
+            dets_to_sort = det.detach().cpu().numpy().astype(np.float32, copy=False)
+
+            # Count by class
+            cls = dets_to_sort[:, 5].astype(np.int32)
+            person_count = int(np.count_nonzero(cls == 0))
+            chair_count = int(np.count_nonzero(cls == 56))
+
+            # Detections list, built in one pass over the host rows
+            names, num_names = self.names, len(self.names)
+            detections = [
+                DetectionOut([x1, y1, x2, y2], conf, class_id,
+                             names[class_id] if class_id < num_names else 'unknown')
+                for (x1, y1, x2, y2, conf, _), class_id in zip(dets_to_sort.tolist(), cls.tolist())
+            ]
+
+            # Run SORT tracking
+            tracked_dets = session.sort_tracker.update(dets_to_sort)
+
+            # Update seat tracking; box geometry is computed for all tracks at once
+            boxes = tracked_dets[:, :4].astype(np.int32)
+            centers = ((boxes[:, :2] + boxes[:, 2:]) / 2).tolist()
+            class_ids = tracked_dets[:, 4].astype(int).tolist()
+
+            for box_key, center, class_id in zip(boxes.tolist(), centers, class_ids):
+                if class_id == 0:  # Person
+                    box_exist, row, first_person = self._is_close(session, center)
+
+                    if not box_exist and first_person:
+                        session.seats.add(box_key, len(session.seats) + 1, current_time)
+                    elif box_exist:
+                        session.seats.mark_seen(row, current_time)
+        else:
+            session.sort_tracker.update()
 
         # Clean up old seats (not seen for 10 seconds)
-        seats_to_remove = []
-        for seat_coords, data in self.global_identities.items():
-            if current_time - data['last_seen'] > 10:
-                seats_to_remove.append(seat_coords)
-
-        for coords in seats_to_remove:
-            del self.global_identities[coords]
+        session.seats.remove_unseen_since(current_time - 10)
 
         # Calculate occupancy stats
-        total_seats = len(self.global_identities)
-        occupied_seats = sum(1 for data in self.global_identities.values() if data.get('is_occupied', False))
+        total_seats = len(session.seats)
+        occupied_seats = session.seats.occupied_count
         available_seats = total_seats - occupied_seats
 
         # Build seat details
-        seats = []
-        for bbox, data in self.global_identities.items():
-            duration = current_time - data['start_time']
-            seats.append({
-                'id': data['id'],
-                'occupied': data.get('is_occupied', False),
-                'duration': duration,
-                'time_exceeded': duration >= self.occupancy_time_threshold,
-                'bbox': {
-                    'x1': bbox[0],
-                    'y1': bbox[1],
-                    'x2': bbox[2],
-                    'y2': bbox[3]
-                }
-            })
+        seats = session.seats.seat_structs(current_time, self.occupancy_time_threshold)
+
+        # Skip database writes that would repeat the last ones, but refresh
+        # at least every DB_WRITE_INTERVAL (last_updated, stats history).
+        # Only the default session records the stats history.
+        seats_digest = session.seats.digest(current_time)
+        write_seats = (seats_digest != session.seats_digest
+                       or current_time - session.seats_written_at >= DB_WRITE_INTERVAL)
+        stats_key = (total_seats, occupied_seats, person_count)
+        write_stats = session.session_id is None and (
+            stats_key != session.stats_written
+            or current_time - session.stats_written_at >= DB_WRITE_INTERVAL
+        )
 
         # Reset occupied status for next frame
-        for data in self.global_identities.values():
-            data['is_occupied'] = False
-
-        self.last_process_time = current_time
+        session.seats.clear_occupied()
 
-        # Save to database
-        try:
-            # Prepare seats data for database
-            seats_for_db = []
-            for seat in seats:
-                bbox = seat['bbox']
-                seats_for_db.append({
-                    'seat_number': str(seat['id']),
-                    'status': 'occupied' if seat['occupied'] else 'available',
-                    'person_id': seat['id'] if seat['occupied'] else None,
-                    'bbox': [bbox['x1'], bbox['y1'], bbox['x2'], bbox['y2']],
-                    'duration': int(seat['duration']),
-                    'duration_exceeded': seat['time_exceeded']
-                })
-
-            # Update all seats in database
-            self.db_service.update_all_seats(seats_for_db)
-
-            # Save statistics snapshot
-            self.db_service.save_stats({
-                'total_seats': total_seats,
-                'occupied_seats': occupied_seats,
-                'available_seats': available_seats,
-                'person_count': person_count
-            })
+        session.last_process_time = current_time
 
-            logger.debug(f"Saved {len(seats_for_db)} seats to database")
-        except Exception as e:
-            logger.error(f"Failed to save to database: {e}")
+        if write_seats or write_stats:
+            self._save_frame(session, seats if write_seats else None, seats_digest,
+                             stats_key if write_stats else None, current_time)
 
         return {
             'detections': detections,
@@ -288,32 +373,68 @@ class FrameProcessor:
                 'seats': seats
             },
             'timestamp': current_time,
-            'frame_count': self.frame_count
+            'frame_count': session.frame_count
         }
 
-    def get_current_stats(self) -> Dict:
-        """Get current occupancy statistics without processing a frame"""
+    def _save_frame(self, session: FrameSession, seats: Optional[List[SeatOut]], seats_digest: bytes,
+                    stats_key: Optional[tuple], current_time: float):
+        """Write a session's seats and/or a stats snapshot; both commit together"""
+        self.db_service.begin_frame()
+        try:
+            if seats is not None:
+                # Prepare seats data for database
+                seats_for_db = []
+                for seat in seats:
+                    bbox = seat.bbox
+                    seats_for_db.append({
+                        'seat_number': session.seat_number(seat.id),
+                        'status': 'occupied' if seat.occupied else 'available',
+                        'person_id': seat.id if seat.occupied else None,
+                        'bbox': [bbox.x1, bbox.y1, bbox.x2, bbox.y2],
+                        'duration': int(seat.duration),
+                        'duration_exceeded': seat.time_exceeded
+                    })
+
+                # Update all seats in database
+                self.db_service.update_all_seats(seats_for_db)
+
+            if stats_key is not None:
+                # Save statistics snapshot
+                total_seats, occupied_seats, person_count = stats_key
+                self.db_service.save_stats({
+                    'total_seats': total_seats,
+                    'occupied_seats': occupied_seats,
+                    'available_seats': total_seats - occupied_seats,
+                    'person_count': person_count
+                })
+
+            self.db_service.end_frame()
+        except Exception as e:
+            self.db_service.end_frame(commit=False)
+            logger.error(f"Failed to save to database: {e}")
+            # Retry on the next frame
+            session.seats_digest = None
+            session.stats_written = None
+            return
+
+        if seats is not None:
+            session.seats_digest = seats_digest
+            session.seats_written_at = current_time
+            logger.debug("Saved %d seats to database", len(seats))
+        if stats_key is not None:
+            session.stats_written = stats_key
+            session.stats_written_at = current_time
+
+    def get_current_stats(self, session_id: Optional[str] = None) -> Dict:
+        """Get a session's current occupancy statistics without processing a frame"""
+        session = self.session(session_id)
         current_time = time.time()
 
-        total_seats = len(self.global_identities)
-        occupied_seats = sum(1 for data in self.global_identities.values() if data.get('is_occupied', False))
+        total_seats = len(session.seats)
+        occupied_seats = session.seats.occupied_count
         available_seats = total_seats - occupied_seats
 
-        seats = []
-        for bbox, data in self.global_identities.items():
-            duration = current_time - data['start_time']
-            seats.append({
-                'id': data['id'],
-                'occupied': data.get('is_occupied', False),
-                'duration': duration,
-                'time_exceeded': duration >= self.occupancy_time_threshold,
-                'bbox': {
-                    'x1': bbox[0],
-                    'y1': bbox[1],
-                    'x2': bbox[2],
-                    'y2': bbox[3]
-                }
-            })
+        seats = session.seats.seat_structs(current_time, self.occupancy_time_threshold)
 
         return {
             'total_seats': total_seats,
@@ -324,11 +445,21 @@ class FrameProcessor:
             'seats': seats
         }
 
-    def reset(self):
-        """Reset all tracking data"""
-        self.global_identities = {}
-        self.frame_count = 0
-        self.sort_tracker = Sort(max_age=5, min_hits=2, iou_threshold=0.2)
+    def reset(self, session_id: Optional[str] = None):
+        """
+        Reset tracking data
+
+        A named session is dropped along with its "<session_id>-<n>" seat
+        rows. Resetting the default session clears the whole seats table.
+        """
+        if session_id is not None:
+            with self._sessions_lock:
+                self._sessions.pop(session_id, None)
+            self._delete_session_seats(session_id)
+            logger.info(f"Frame session {session_id} reset")
+            return
+
+        self.default_session = FrameSession()
 
         # Clear database
         try:
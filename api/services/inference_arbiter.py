@@ -0,0 +1,115 @@
+"""
+Inference arbitration between real-time frames and batch video jobs
+Batch jobs yield the shared GPU at every model-call boundary while
+real-time (webcam / browser frame) inference is in flight
+"""
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from api.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceArbiter:
+    """
+    Two-priority gate for the shared model
+
+    Real-time callers wrap their inference in `realtime()`; batch workers call
+    `wait_for_realtime()` before each forward pass and block while more than
+    `yield_threshold` real-time requests are in flight. Batch jobs run in
+    executor threads, so this uses a threading.Condition rather than asyncio
+    primitives; waiting batch workers wake as soon as real-time work drains.
+    """
+
+    def __init__(self, yield_threshold: int = 0, max_wait_seconds: float = 0.5,
+                 max_yield_seconds: float = 10.0):
+        """
+        Initialize arbiter
+
+        Args:
+            yield_threshold: Real-time requests in flight that batch work tolerates
+            max_wait_seconds: How often a waiting batch worker re-checks
+            max_yield_seconds: Longest a batch worker yields before running
+                anyway (a leaked in-flight count must not hang jobs)
+        """
+        self.yield_threshold = yield_threshold
+        self.max_wait_seconds = max_wait_seconds
+        self.max_yield_seconds = max_yield_seconds
+
+        self._cond = threading.Condition()
+        self._inflight_realtime = 0
+
+        # Metrics
+        self.batch_yield_count = 0
+        self.batch_yield_seconds = 0.0
+        self.batch_yield_timeouts = 0
+
+    @property
+    def inflight_realtime(self) -> int:
+        """Number of real-time inference requests currently in flight"""
+        return self._inflight_realtime
+
+    @contextmanager
+    def realtime(self):
+        """Mark a real-time inference request as in flight"""
+        with self._cond:
+            self._inflight_realtime += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._inflight_realtime -= 1
+                if self._inflight_realtime <= self.yield_threshold:
+                    self._cond.notify_all()
+
+    def wait_for_realtime(self):
+        """
+        Block a batch worker while real-time inference is in flight
+
+        Gives up after max_yield_seconds, counting and logging the timeout, so
+        a stuck in-flight counter slows batch jobs down but cannot stall them
+        forever or go unnoticed.
+        """
+        if self._inflight_realtime <= self.yield_threshold:
+            return
+
+        start = time.perf_counter()
+        deadline = start + self.max_yield_seconds
+        with self._cond:
+            while self._inflight_realtime > self.yield_threshold:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self.batch_yield_timeouts += 1
+                    logger.warning(
+                        "Batch inference waited %.1fs for %d real-time request(s); running anyway",
+                        self.max_yield_seconds, self._inflight_realtime
+                    )
+                    break
+                self._cond.wait(min(self.max_wait_seconds, remaining))
+            self.batch_yield_count += 1
+            self.batch_yield_seconds += time.perf_counter() - start
+
+    def metrics(self) -> Dict:
+        """Get arbitration metrics"""
+        return {
+            'inflight_realtime': self._inflight_realtime,
+            'batch_yield_count': self.batch_yield_count,
+            'batch_yield_seconds': round(self.batch_yield_seconds, 3),
+            'batch_yield_timeouts': self.batch_yield_timeouts
+        }
+
+
+# Global arbiter instance
+_inference_arbiter: Optional[InferenceArbiter] = None
+
+
+def get_inference_arbiter() -> InferenceArbiter:
+    """Get or create global inference arbiter instance"""
+    global _inference_arbiter
+    if _inference_arbiter is None:
+        _inference_arbiter = InferenceArbiter(yield_threshold=settings.realtime_yield_threshold)
+    return _inference_arbiter
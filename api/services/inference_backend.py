@@ -0,0 +1,497 @@
+"""
+Model loading with a pluggable inference backend
+"pytorch" runs the YOLOv7 checkpoint eagerly (optionally as a cached
+TorchScript trace, or compiled with torch.compile when MODEL_COMPILE is set);
+"onnxruntime" exports it to ONNX once and runs it through ONNX Runtime,
+on TensorRT (FP16, cached engines) or CUDA when those providers exist;
+"tensorrt" builds a native TensorRT FP16 engine from the same export and
+runs it directly on torch's CUDA stream. Both ONNX backends can run an
+INT8-quantized model instead (MODEL_INT8)
+"""
+import hashlib
+import logging
+import numpy as np
+import torch
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence
+
+from models.experimental import attempt_load
+from utils.general import check_img_size
+
+from api.config import settings
+from api.services.quantization import quantize_onnx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+try:
+    import tensorrt as trt
+except ImportError:
+    trt = None
+
+MODEL_BACKENDS = ("pytorch", "onnxruntime", "tensorrt")
+ONNX_OPSET = 17
+TRT_WORKSPACE_BYTES = 1 << 30
+COMPILE_WARMUP_ITERS = 3  # compile, record the CUDA graph, then one replay
+CUDA_GRAPH_WARMUP_ITERS = 3  # eager runs on a side stream before capture (cuDNN autotune, allocator)
+
+_NUMPY_DTYPES = {torch.float16: np.float16, torch.float32: np.float32}
+
+
+class LoadedModel(NamedTuple):
+    """A ready-to-call model plus the metadata the detectors need"""
+    model: object  # model(img)[0] -> (B, anchors, 5 + nc) predictions
+    stride: int
+    img_size: int
+    names: List[str]
+    half: bool  # feed float16 input (else float32)
+
+
+def export_onnx(model: torch.nn.Module, img_size: int, path: Path, opset: int = ONNX_OPSET) -> Path:
+    """
+    Export a float32 YOLOv7 model to ONNX with dynamic batch and image size
+
+    Letterboxed video frames are not always square, so height and width
+    are dynamic along with the batch dimension.
+    """
+    device = next(model.parameters()).device
+    # Rebuild the anchor grids inside the trace so they follow the input size
+    detect = model.model[-1]
+    detect.grid = [torch.zeros(1)] * detect.nl
+    dummy = torch.zeros(1, 3, img_size, img_size, device=device)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    logger.info(f"Exporting ONNX model to {path}")
+    with torch.no_grad():
+        torch.onnx.export(
+            model, dummy, str(path),
+            opset_version=opset,
+            input_names=["images"],
+            output_names=["output"],
+            dynamic_axes={"images": {0: "batch", 2: "height", 3: "width"},
+                          "output": {0: "batch", 1: "anchors"}}
+        )
+    return path
+
+
+def detect_scope(model: torch.nn.Module) -> str:
+    """ONNX node-name prefix of the model's Detect head (e.g. "/model.105/")"""
+    return f"/model.{len(model.model) - 1}/"
+
+
+class OnnxRuntimeModel:
+    """
+    ONNX Runtime session behind the PyTorch model's call signature
+
+    model(img)[0] returns the prediction tensor on img's device. On CUDA,
+    input and output are bound straight to torch device memory with IO
+    binding, so no host round trip is added. The output shape is derived
+    from the input size and the detection strides, so it can be
+    preallocated before the run.
+    """
+
+    def __init__(self, onnx_path: Path, device: torch.device, strides: Sequence[int],
+                 num_anchors: int, num_outputs: int, fp16: bool = True, int8: bool = False):
+        self.device = device
+        self.strides = [int(s) for s in strides]
+        self.num_anchors = num_anchors
+        self.num_outputs = num_outputs
+
+        available = ort.get_available_providers()
+        providers = []
+        if device.type == 'cuda':
+            device_id = device.index or 0
+            if "TensorrtExecutionProvider" in available:
+                providers.append(("TensorrtExecutionProvider", {
+                    "device_id": device_id,
+                    "trt_fp16_enable": fp16,
+                    # INT8 models carry their scales as QDQ nodes, so no calibration table
+                    "trt_int8_enable": int8,
+                    "trt_engine_cache_enable": True,
+                    "trt_engine_cache_path": str(onnx_path.parent / "trt_cache"),
+                }))
+            if "CUDAExecutionProvider" in available:
+                providers.append(("CUDAExecutionProvider", {"device_id": device_id}))
+        providers.append("CPUExecutionProvider")
+
+        self.session = ort.InferenceSession(str(onnx_path), providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_name = self.session.get_outputs()[0].name
+        self._on_cuda = device.type == 'cuda' and self.session.get_providers()[0] != "CPUExecutionProvider"
+        logger.info(f"ONNX Runtime providers: {self.session.get_providers()}")
+
+    def _output_shape(self, img: torch.Tensor):
+        batch, _, height, width = img.shape
+        anchors = sum((height // s) * (width // s) for s in self.strides) * self.num_anchors
+        return batch, anchors, self.num_outputs
+
+    def __call__(self, img: torch.Tensor, augment: bool = False):
+        img = img.float().contiguous()
+
+        if not self._on_cuda:
+            pred = self.session.run([self.output_name], {self.input_name: img.cpu().numpy()})[0]
+            return (torch.from_numpy(pred).to(self.device),)
+
+        out = torch.empty(self._output_shape(img), dtype=torch.float32, device=img.device)
+        device_id = img.device.index or 0
+        binding = self.session.io_binding()
+        binding.bind_input(self.input_name, 'cuda', device_id, _NUMPY_DTYPES[img.dtype],
+                           tuple(img.shape), img.data_ptr())
+        binding.bind_output(self.output_name, 'cuda', device_id, _NUMPY_DTYPES[out.dtype],
+                            tuple(out.shape), out.data_ptr())
+        # ORT runs on its own stream; make sure the input is ready first
+        torch.cuda.current_stream(img.device).synchronize()
+        self.session.run_with_iobinding(binding)
+        return (out,)
+
+
+def trt_engine_path(onnx_path: Path, img_size: int, max_batch: int, device: torch.device) -> Path:
+    """
+    Cache file of the engine built from onnx_path
+
+    Engines are specific to the input profile and the GPU architecture,
+    so both are part of the name (the ONNX stem already says int8).
+    """
+    major, minor = torch.cuda.get_device_capability(device)
+    return onnx_path.with_name(f"{onnx_path.stem}.{img_size}-b{max_batch}-sm{major}{minor}.engine")
+
+
+def build_trt_engine(onnx_path: Path, engine_path: Path, img_size: int, stride: int,
+                     max_batch: int, int8: bool = False) -> Path:
+    """
+    Build and save a TensorRT engine from an ONNX export
+
+    Layers run in FP16 on tensor cores (INT8 where a QDQ model carries
+    quantization scales, so no calibrator is needed). The optimization
+    profile covers batches of 1..max_batch and letterboxed sizes up to
+    img_size square, tuned for a single square frame.
+    """
+    trt_logger = trt.Logger(trt.Logger.WARNING)
+    builder = trt.Builder(trt_logger)
+    network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+    parser = trt.OnnxParser(network, trt_logger)
+    if not parser.parse_from_file(str(onnx_path)):
+        errors = "; ".join(str(parser.get_error(i)) for i in range(parser.num_errors))
+        raise RuntimeError(f"TensorRT failed to parse {onnx_path}: {errors}")
+
+    config = builder.create_builder_config()
+    config.set_memory_pool_limit(trt.MemoryPoolType.WORKSPACE, TRT_WORKSPACE_BYTES)
+    config.set_flag(trt.BuilderFlag.FP16)
+    if int8:
+        config.set_flag(trt.BuilderFlag.INT8)
+
+    profile = builder.create_optimization_profile()
+    profile.set_shape(network.get_input(0).name,
+                      (1, 3, stride, stride),
+                      (1, 3, img_size, img_size),
+                      (max_batch, 3, img_size, img_size))
+    config.add_optimization_profile(profile)
+
+    logger.info(f"Building TensorRT engine {engine_path} (this takes a few minutes)")
+    serialized = builder.build_serialized_network(network, config)
+    if serialized is None:
+        raise RuntimeError(f"TensorRT failed to build an engine from {onnx_path}")
+    engine_path.write_bytes(bytes(serialized))
+    return engine_path
+
+
+class TensorRTModel:
+    """
+    Native TensorRT engine behind the PyTorch model's call signature
+
+    model(img)[0] returns the prediction tensor on img's device. Input and
+    output are bound as torch device tensors and the engine is enqueued
+    on torch's current stream, so no host copy or stream sync is added.
+    """
+
+    def __init__(self, engine_path: Path, device: torch.device):
+        self.device = device
+        self._runtime = trt.Runtime(trt.Logger(trt.Logger.WARNING))
+        self.engine = self._runtime.deserialize_cuda_engine(engine_path.read_bytes())
+        self.context = self.engine.create_execution_context()
+        names = [self.engine.get_tensor_name(i) for i in range(self.engine.num_io_tensors)]
+        self.input_name = next(n for n in names if self.engine.get_tensor_mode(n) == trt.TensorIOMode.INPUT)
+        self.output_name = next(n for n in names if self.engine.get_tensor_mode(n) == trt.TensorIOMode.OUTPUT)
+        logger.info(f"Loaded TensorRT engine {engine_path}")
+
+    def __call__(self, img: torch.Tensor, augment: bool = False):
+        img = img.float().contiguous()
+        self.context.set_input_shape(self.input_name, tuple(img.shape))
+        out = torch.empty(tuple(self.context.get_tensor_shape(self.output_name)),
+                          dtype=torch.float32, device=img.device)
+        self.context.set_tensor_address(self.input_name, img.data_ptr())
+        self.context.set_tensor_address(self.output_name, out.data_ptr())
+        if not self.context.execute_async_v3(torch.cuda.current_stream(img.device).cuda_stream):
+            raise RuntimeError("TensorRT inference failed")
+        return (out,)
+
+
+def input_memory_format(model, device: torch.device) -> torch.memory_format:
+    """
+    Memory format to build model input in
+
+    load_model converts PyTorch models on CUDA to channels_last (NHWC),
+    which lets cuDNN pick tensor-core convolution kernels without
+    transposing every activation; their input should match. ONNX Runtime,
+    TensorRT and CPU models take plain contiguous NCHW.
+    """
+    if device.type == 'cuda' and not isinstance(model, (OnnxRuntimeModel, TensorRTModel)):
+        return torch.channels_last
+    return torch.contiguous_format
+
+
+def scale_input(img: torch.Tensor, dtype: torch.dtype, memory_format: torch.memory_format) -> torch.Tensor:
+    """
+    Scale an NCHW uint8 image tensor to [0, 1] model input
+
+    The cast, the divide and the layout change are one kernel writing
+    into a tensor of the given dtype and memory format, instead of a cast
+    copy followed by an in-place divide pass.
+    """
+    out = torch.empty(img.shape, dtype=dtype, device=img.device, memory_format=memory_format)
+    return torch.div(img, 255.0, out=out)
+
+
+def _weights_digest(weights_path: Path) -> str:
+    """Short content hash of a checkpoint, so retrained weights never hit a stale cache"""
+    digest = hashlib.sha256()
+    with open(weights_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def torchscript_cache_path(weights_path: Path, img_size: int, half: bool, device: torch.device) -> Path:
+    """Cached trace location next to the weights, keyed by content, size, dtype and device type"""
+    weights_path = Path(weights_path)
+    tag = f"{_weights_digest(weights_path)}-{img_size}-{'fp16' if half else 'fp32'}-{device.type}"
+    return weights_path.with_name(f"{weights_path.stem}.{tag}.torchscript")
+
+
+class ScriptedModel:
+    """
+    YOLOv7 with everything up to the Detect head as frozen TorchScript
+
+    The head stays eager (as in utils.torch_utils.TracedModel): it builds
+    its anchor grids from the feature map sizes, so keeping it out of the
+    trace lets letterboxed, non-square video frames through.
+    """
+
+    def __init__(self, backbone: torch.jit.ScriptModule, detect: torch.nn.Module):
+        self.backbone = backbone
+        self.detect = detect
+
+    def __call__(self, img: torch.Tensor, augment: bool = False):
+        return self.detect(list(self.backbone(img)))
+
+
+def trace_model(model: torch.nn.Module, weights_path: Path, device: torch.device,
+                img_size: int, half: bool) -> ScriptedModel:
+    """
+    Trace, freeze and optimize the model, or load the cached result
+
+    Unlike TracedModel, tracing happens on the target device with the
+    target dtype and memory format (a CPU float32 trace moved to CUDA keeps
+    CPU-specific decisions), and the frozen module is saved so later
+    startups skip tracing entirely.
+    """
+    detect = model.model[-1]
+    path = torchscript_cache_path(weights_path, img_size, half, device)
+    if path.exists():
+        try:
+            backbone = torch.jit.load(str(path), map_location=device)
+            logger.info(f"Loaded cached TorchScript model {path}")
+            return ScriptedModel(backbone, detect)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable TorchScript cache {path}: {e}")
+
+    logger.info(f"Tracing model to {path}")
+    model.traced = True  # forward stops before the Detect head
+    dummy = torch.zeros(1, 3, img_size, img_size, device=device,
+                        dtype=torch.float16 if half else torch.float32
+                        ).to(memory_format=input_memory_format(model, device))
+    with torch.no_grad():
+        traced = torch.jit.trace(model, dummy, strict=False)
+        backbone = torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+    try:
+        torch.jit.save(backbone, str(path))
+    except OSError as e:
+        logger.warning(f"Could not cache TorchScript model: {e}")
+    return ScriptedModel(backbone, detect)
+
+
+class CompiledModel:
+    """
+    torch.compile'd model with the eager model's call signature
+
+    In "reduce-overhead" mode outputs live in CUDA graph memory that the
+    next replay overwrites; the detectors keep a batch's predictions while
+    the next batch runs, so they are cloned out first.
+    """
+
+    def __init__(self, model: torch.nn.Module, mode: str):
+        self.compiled = torch.compile(model, mode=mode, dynamic=False)
+        self.clone_outputs = mode == "reduce-overhead"
+
+    def __call__(self, img: torch.Tensor, augment: bool = False):
+        pred = self.compiled(img)[0]
+        return (pred.clone() if self.clone_outputs else pred,)
+
+
+class CudaGraphModel:
+    """
+    Single-image forward captured once as a CUDA graph and replayed
+
+    Replaying skips the per-kernel PyTorch/cuDNN dispatch and launch
+    overhead. The graph always reads static_input (callers can write the
+    next frame straight into it) and writes one static output that the
+    next replay overwrites, so a prediction has to be consumed (NMS) before
+    the next call. Inputs of any other shape or dtype run the model eagerly.
+    """
+
+    def __init__(self, model, static_input: torch.Tensor, warmup: int = CUDA_GRAPH_WARMUP_ITERS):
+        self.model = model
+        self.static_input = static_input
+        self.graph = torch.cuda.CUDAGraph()
+
+        device = static_input.device
+        stream = torch.cuda.Stream(device=device)
+        stream.wait_stream(torch.cuda.current_stream(device))
+        with torch.inference_mode(), torch.cuda.stream(stream):
+            for _ in range(warmup):
+                model(static_input)
+        torch.cuda.current_stream(device).wait_stream(stream)
+        with torch.inference_mode(), torch.cuda.graph(self.graph):
+            self.static_output = model(static_input)[0]
+
+    def __call__(self, img: torch.Tensor, augment: bool = False):
+        if augment or img.shape != self.static_input.shape or img.dtype != self.static_input.dtype:
+            return self.model(img, augment=augment)
+        if img.data_ptr() != self.static_input.data_ptr():
+            self.static_input.copy_(img, non_blocking=True)
+        self.graph.replay()
+        return (self.static_output,)
+
+
+def capture_cuda_graph(model, static_input: torch.Tensor):
+    """
+    Wrap an eager or TorchScript model in a CudaGraphModel for static_input
+
+    ONNX Runtime, TensorRT and torch.compile models are returned unchanged
+    (the latter already replay CUDA graphs in reduce-overhead mode), as is
+    the model itself if capture fails.
+    """
+    if static_input.device.type != 'cuda' or isinstance(model, (OnnxRuntimeModel, TensorRTModel, CompiledModel)):
+        return model
+    try:
+        graphed = CudaGraphModel(model, static_input)
+    except RuntimeError as e:
+        logger.warning(f"CUDA graph capture failed, running the model eagerly: {e}")
+        return model
+    logger.info(f"Captured CUDA graph for {tuple(static_input.shape)} input")
+    return graphed
+
+
+def load_model(
+    weights_path: Path,
+    device: torch.device,
+    img_size: int,
+    trace: bool = False,
+    backend: Optional[str] = None
+) -> LoadedModel:
+    """
+    Load YOLOv7 weights for inference on device
+
+    Args:
+        weights_path: PyTorch checkpoint
+        device: Device from select_device()
+        img_size: Requested input size (rounded up to a stride multiple)
+        trace: Run the PyTorch model as a cached TorchScript trace
+        backend: One of MODEL_BACKENDS (defaults to settings.model_backend)
+
+    Returns:
+        LoadedModel
+    """
+    backend = (backend or settings.model_backend).lower()
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(f"Unknown model backend '{backend}'. Expected one of: {', '.join(MODEL_BACKENDS)}")
+    if backend == "onnxruntime" and ort is None:
+        logger.warning("MODEL_BACKEND=onnxruntime but onnxruntime is not installed; using PyTorch")
+        backend = "pytorch"
+    if backend == "tensorrt" and (trt is None or device.type != 'cuda'):
+        logger.warning("MODEL_BACKEND=tensorrt needs the tensorrt package and a CUDA device; using PyTorch")
+        backend = "pytorch"
+
+    model = attempt_load(str(weights_path), map_location=device)
+    stride = int(model.stride.max())
+    img_size = check_img_size(img_size, s=stride)
+    names = model.module.names if hasattr(model, 'module') else model.names
+
+    if backend in ("onnxruntime", "tensorrt"):
+        onnx_path = Path(settings.model_onnx_path) if settings.model_onnx_path else Path(weights_path).with_suffix(".onnx")
+        if not onnx_path.exists():
+            export_onnx(model, img_size, onnx_path)
+        int8 = False
+        if settings.model_int8:
+            int8_path = onnx_path.with_suffix(".int8.onnx")
+            if int8_path.exists() or quantize_onnx(
+                onnx_path, int8_path, settings.int8_calibration_path, img_size,
+                num_frames=settings.model_int8_calibration_frames,
+                float_scope=detect_scope(model)
+            ):
+                onnx_path, int8 = int8_path, True
+            else:
+                logger.warning("Running the float ONNX model")
+        if backend == "tensorrt":
+            max_batch = max(settings.video_batch_max_size, settings.frame_batch_max_size)
+            engine_path = (Path(settings.model_trt_engine_path) if settings.model_trt_engine_path
+                           else trt_engine_path(onnx_path, img_size, max_batch, device))
+            if not engine_path.exists():
+                build_trt_engine(onnx_path, engine_path, img_size, stride, max_batch, int8=int8)
+            runtime = TensorRTModel(engine_path, device)
+        else:
+            detect = model.model[-1]
+            runtime = OnnxRuntimeModel(
+                onnx_path, device,
+                strides=model.stride.tolist(),
+                num_anchors=detect.na,
+                num_outputs=detect.no,
+                fp16=device.type != 'cpu',
+                int8=int8
+            )
+        del model
+        if device.type == 'cuda':
+            torch.cuda.empty_cache()
+        # The graph takes float32; TensorRT lowers precision internally
+        return LoadedModel(runtime, stride, img_size, names, half=False)
+
+    compile_model = settings.model_compile and device.type == 'cuda' and hasattr(torch, 'compile')
+
+    half = device.type != 'cpu'
+    if half:
+        model.half()
+    if device.type == 'cuda':
+        model.to(memory_format=torch.channels_last)
+
+    if trace and not compile_model:
+        model = trace_model(model, weights_path, device, img_size, half)
+
+    if compile_model:
+        # Inductor fuses the Conv+BN+activation chains itself; tracing first
+        # would only hide the graph from it
+        logger.info(f"Compiling model with torch.compile (mode={settings.model_compile_mode})")
+        model = CompiledModel(model, settings.model_compile_mode)
+        dummy = torch.zeros(1, 3, img_size, img_size, device=device,
+                            dtype=torch.float16 if half else torch.float32
+                            ).to(memory_format=torch.channels_last)
+        # Pay Inductor compilation and CUDA graph capture at startup, not on
+        # the first real frame
+        with torch.inference_mode():
+            for _ in range(COMPILE_WARMUP_ITERS):
+                model(dummy)
+
+    return LoadedModel(model, stride, img_size, names, half)
@@ -0,0 +1,166 @@
+"""
+Cross-job batch inference for video detection jobs
+Frames from all running jobs are interleaved into shared model forward passes
+"""
+import time
+import queue
+import logging
+import threading
+import numpy as np
+import torch
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+
+from api.services.inference_arbiter import get_inference_arbiter
+from api.services.inference_backend import input_memory_format, scale_input
+
+logger = logging.getLogger(__name__)
+
+
+class BatchInferenceScheduler:
+    """
+    Iteration-level batching over the frames of concurrent video jobs
+
+    Each job thread submits one letterboxed frame at a time and gets back a
+    Future for its raw prediction. A single worker thread drains up to
+    max_batch_size frames from any jobs (waiting at most max_wait_ms after the
+    first), runs one forward pass per input shape, and resolves the futures.
+    When a job finishes, frames from the next job simply join later batches.
+    """
+
+    def __init__(self, model, device, half: bool, max_batch_size: int = 8, max_wait_ms: float = 5.0):
+        """Initialize scheduler and start its worker thread"""
+        self.model = model
+        self.device = device
+        self.half = half
+        self.memory_format = input_memory_format(model, torch.device(device))
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+
+        # Pinned host staging buffers, one (max_batch_size, H, W, 3) per frame shape
+        self._use_pinned = torch.device(device).type == 'cuda'
+        self._pinned: Dict[Tuple[int, ...], torch.Tensor] = {}
+
+        self._queue: "queue.SimpleQueue[Tuple[np.ndarray, Future]]" = queue.SimpleQueue()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="batch-inference", daemon=True)
+        self._thread.start()
+
+    def submit(self, img: np.ndarray) -> Future:
+        """
+        Queue a letterboxed HxWx3 BGR uint8 frame for inference
+
+        Returns:
+            Future resolving to the raw prediction tensor of shape (1, N, 5+nc)
+        """
+        future: Future = Future()
+        if self._stopped.is_set():
+            future.set_exception(RuntimeError("Inference scheduler stopped"))
+        else:
+            self._queue.put((img, future))
+        return future
+
+    def stop(self):
+        """Stop the worker thread"""
+        self._stopped.set()
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _collect(self) -> List[Tuple[np.ndarray, Future]]:
+        """Block for the first frame, then gather more until full or timed out"""
+        item = self._queue.get()
+        if item is None:
+            return []
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # let _run see the stop sentinel
+                break
+            batch.append(item)
+
+        return batch
+
+    def _to_device(self, imgs: List[np.ndarray]) -> torch.Tensor:
+        """
+        Move a batch of uint8 frames to the device
+
+        On CUDA the frames are stacked straight into a reusable pinned buffer
+        so the host-to-device copy is a single async DMA. _infer waits for
+        that copy before returning, so the buffer is free again for the
+        next batch.
+        """
+        if not self._use_pinned:
+            return torch.from_numpy(np.stack(imgs)).to(self.device)
+
+        shape = imgs[0].shape
+        buf = self._pinned.get(shape)
+        if buf is None:
+            buf = torch.empty((self.max_batch_size, *shape), dtype=torch.uint8).pin_memory()
+            self._pinned[shape] = buf
+        host = buf[:len(imgs)]
+        np.stack(imgs, out=host.numpy())
+        return host.to(self.device, non_blocking=True)
+
+    def _infer(self, imgs: List[np.ndarray]) -> torch.Tensor:
+        """Run one forward pass over same-shaped frames"""
+        # Yield to real-time webcam/browser frames first
+        get_inference_arbiter().wait_for_realtime()
+
+        with torch.inference_mode():
+            # BGR to RGB and HWC to CHW on the device; cast and scale are one kernel
+            img = self._to_device(imgs)
+            if self._use_pinned:
+                uploaded = torch.cuda.Event()
+                uploaded.record()
+            img = scale_input(img.permute(0, 3, 1, 2).flip(1),
+                              torch.float16 if self.half else torch.float32, self.memory_format)
+            pred = self.model(img, augment=False)[0]
+            if self._use_pinned:
+                # The staging buffer is reused by the next batch; only the
+                # upload has to finish, the forward pass keeps running
+                uploaded.synchronize()
+            return pred
+
+    def _run(self):
+        """Worker loop"""
+        while not self._stopped.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            # Jobs with different aspect ratios letterbox to different shapes
+            groups = defaultdict(list)
+            for img, future in batch:
+                groups[img.shape].append((img, future))
+
+            for items in groups.values():
+                futures = [future for _, future in items]
+                try:
+                    pred = self._infer([img for img, _ in items])
+                except Exception as e:
+                    logger.error(f"Batched inference over {len(items)} frames failed: {e}", exc_info=True)
+                    for future in futures:
+                        future.set_exception(e)
+                    continue
+
+                for i, future in enumerate(futures):
+                    future.set_result(pred[i:i + 1])
+
+        # Fail anything submitted after stop
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(RuntimeError("Inference scheduler stopped"))
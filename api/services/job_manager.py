@@ -1,14 +1,19 @@
 """
 Job manager for handling background detection tasks
 """
-import json
+import time
+import orjson
+import heapq
 import logging
 import shutil
+import sqlite3
+import threading
+import numpy as np
+from itertools import count
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 from uuid import uuid4
-import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
 from api.models.schemas import JobStatus, JobStatusResponse, DetectionResults
@@ -16,6 +21,11 @@ from api.config import settings
 
 logger = logging.getLogger(__name__)
 
+try:
+    import redis
+except ImportError:
+    redis = None
+
 
 class Job:
     """Represents a detection job"""
@@ -31,11 +41,37 @@ class Job:
         self.completed_at: Optional[datetime] = None
         self.progress: float = 0.0
         self.message: Optional[str] = None
-        self.results: Optional[DetectionResults] = None
+        self._results: Optional[DetectionResults] = None
+        self._results_json: Optional[orjson.Fragment] = None
         self.error: Optional[str] = None
+        # Scheduling: lower priority first, then shortest job (frame count) first
+        self.priority: int = 0
+        self.estimated_work: int = 0
+
+    @property
+    def results(self) -> Optional[DetectionResults]:
+        return self._results
+
+    @results.setter
+    def results(self, results: Optional[DetectionResults]):
+        self._results = results
+        self._results_json = None
+
+    def results_json(self) -> Optional[orjson.Fragment]:
+        """
+        Results as pre-serialized JSON, dumped once per assignment
+
+        Serializing every frame's statistics dominates saving a finished
+        job; the Fragment is embedded as-is by orjson.dumps on later saves.
+        """
+        if self._results is None:
+            return None
+        if self._results_json is None:
+            self._results_json = orjson.Fragment(self._results.model_dump_json())
+        return self._results_json
 
     def to_dict(self) -> Dict:
-        """Convert job to dictionary"""
+        """Convert job to dictionary (results as a pre-serialized orjson.Fragment)"""
         return {
             "job_id": self.job_id,
             "video_path": self.video_path,
@@ -47,8 +83,10 @@ class Job:
             "completed_at": self.completed_at.isoformat() if self.completed_at else None,
             "progress": self.progress,
             "message": self.message,
-            "results": self.results.model_dump(mode='json') if self.results else None,
-            "error": self.error
+            "results": self.results_json(),
+            "error": self.error,
+            "priority": self.priority,
+            "estimated_work": self.estimated_work
         }
 
     @classmethod
@@ -67,25 +105,277 @@ class Job:
         job.progress = data.get("progress", 0.0)
         job.message = data.get("message")
         job.error = data.get("error")
+        job.priority = data.get("priority", 0)
+        job.estimated_work = data.get("estimated_work", 0)
         if data.get("results"):
             job.results = DetectionResults(**data["results"])
         return job
 
-    def save(self, jobs_dir: Path):
-        """Save job state to disk"""
-        job_file = jobs_dir / f"{self.job_id}.json"
-        with open(job_file, 'w') as f:
-            json.dump(self.to_dict(), f, indent=2)
 
-    @classmethod
-    def load(cls, job_id: str, jobs_dir: Path) -> Optional['Job']:
-        """Load job from disk"""
-        job_file = jobs_dir / f"{job_id}.json"
-        if not job_file.exists():
-            return None
-        with open(job_file, 'r') as f:
-            data = json.load(f)
-        return cls.from_dict(data)
+JOBS_DB_NAME = "jobs.db"
+PROGRESS_SAVE_INTERVAL = 0.5  # seconds between persisted progress updates per job
+
+# Kept as columns so progress updates don't re-serialize the whole job
+_JOB_COLUMNS = ("status", "progress", "message")
+
+
+class _JobStore:
+    """
+    Job persistence in a single SQLite file under the jobs directory
+
+    Replaces one JSON file per job, rewritten on every progress callback.
+    The database runs in WAL mode with synchronous=NORMAL, so a progress
+    update is a small UPDATE without an fsync per write. status, progress
+    and message are columns of their own; everything else from
+    Job.to_dict() is stored as a JSON blob. One autocommit connection is
+    shared by all threads behind a lock.
+    """
+
+    shared = False  # only this process writes it
+
+    def __init__(self, path: Path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, progress REAL NOT NULL, "
+            "message TEXT, data TEXT NOT NULL)"
+        )
+
+    def save(self, job: Job):
+        """Insert or replace a job's full state"""
+        data = job.to_dict()
+        row = (job.job_id, *(data.pop(column) for column in _JOB_COLUMNS), orjson.dumps(data))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, progress, message, data) VALUES (?, ?, ?, ?, ?)",
+                row
+            )
+
+    def save_progress(self, job: Job):
+        """Persist only progress and message"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET progress = ?, message = ? WHERE job_id = ?",
+                (job.progress, job.message, job.job_id)
+            )
+
+    def delete(self, job_id: str):
+        """Remove a job"""
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    @staticmethod
+    def _job(row: Tuple) -> Job:
+        *columns, data = row
+        data = orjson.loads(data)
+        data.update(zip(_JOB_COLUMNS, columns))
+        return Job.from_dict(data)
+
+    def load(self, job_id: str) -> Optional[Job]:
+        """Load one job, or None if it is not stored"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, progress, message, data FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return self._job(row) if row else None
+
+    def load_all(self) -> List[Tuple[str, Optional[Job], Optional[Exception]]]:
+        """Every stored job as (job_id, job, error); error is set when a row can't be decoded"""
+        with self._lock:
+            rows = self._conn.execute("SELECT job_id, status, progress, message, data FROM jobs").fetchall()
+        loaded = []
+        for job_id, *row in rows:
+            try:
+                loaded.append((job_id, self._job(row), None))
+            except Exception as e:
+                loaded.append((job_id, None, e))
+        return loaded
+
+    def close(self):
+        """Close the connection"""
+        with self._lock:
+            self._conn.close()
+
+
+class _RedisJobStore:
+    """
+    Job persistence in Redis, shared by every API worker (REDIS_ENABLED)
+
+    One hash per job (jobs:<job_id>) with the same fields as _JobStore's
+    columns, plus a set of all job ids. Because other workers write it
+    too, JobManager re-reads jobs it is not running itself instead of
+    trusting its in-memory copy.
+    """
+
+    shared = True
+    _IDS_KEY = "jobs:ids"
+
+    def __init__(self, client: "redis.Redis"):
+        self._redis = client
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"jobs:{job_id}"
+
+    def save(self, job: Job):
+        """Write a job's full state"""
+        data = job.to_dict()
+        mapping = {column: orjson.dumps(data.pop(column)) for column in _JOB_COLUMNS}
+        mapping["data"] = orjson.dumps(data)
+        pipe = self._redis.pipeline()
+        pipe.hset(self._key(job.job_id), mapping=mapping)
+        pipe.sadd(self._IDS_KEY, job.job_id)
+        pipe.execute()
+
+    def save_progress(self, job: Job):
+        """Persist only progress and message (skipped if the job was deleted meanwhile)"""
+        key = self._key(job.job_id)
+        if self._redis.exists(key):
+            self._redis.hset(key, mapping={
+                "progress": orjson.dumps(job.progress),
+                "message": orjson.dumps(job.message)
+            })
+
+    def delete(self, job_id: str):
+        """Remove a job"""
+        pipe = self._redis.pipeline()
+        pipe.delete(self._key(job_id))
+        pipe.srem(self._IDS_KEY, job_id)
+        pipe.execute()
+
+    @staticmethod
+    def _job(fields: Dict[bytes, bytes]) -> Job:
+        data = orjson.loads(fields[b"data"])
+        data.update((column, orjson.loads(fields[column.encode()])) for column in _JOB_COLUMNS)
+        return Job.from_dict(data)
+
+    def load(self, job_id: str) -> Optional[Job]:
+        """Load one job, or None if it is not stored"""
+        fields = self._redis.hgetall(self._key(job_id))
+        return self._job(fields) if fields else None
+
+    def load_all(self) -> List[Tuple[str, Optional[Job], Optional[Exception]]]:
+        """Every stored job as (job_id, job, error), fetched in one pipeline"""
+        job_ids = [job_id.decode() for job_id in self._redis.smembers(self._IDS_KEY)]
+        pipe = self._redis.pipeline()
+        for job_id in job_ids:
+            pipe.hgetall(self._key(job_id))
+        loaded = []
+        for job_id, fields in zip(job_ids, pipe.execute()):
+            if not fields:
+                continue  # deleted between SMEMBERS and HGETALL
+            try:
+                loaded.append((job_id, self._job(fields), None))
+            except Exception as e:
+                loaded.append((job_id, None, e))
+        return loaded
+
+    def close(self):
+        """Close the connection pool"""
+        self._redis.close()
+
+
+def _open_job_store(jobs_dir: Path):
+    """Redis job store when enabled and reachable, else the local SQLite one"""
+    if settings.redis_enabled:
+        if redis is None:
+            logger.warning("REDIS_ENABLED is set but redis is not installed; storing jobs in SQLite")
+        else:
+            try:
+                client = redis.Redis.from_url(settings.get_redis_url())
+                client.ping()
+                logger.info("Storing jobs in Redis")
+                return _RedisJobStore(client)
+            except redis.RedisError as e:
+                logger.error(f"Redis unavailable ({e}); storing jobs in SQLite")
+    return _JobStore(jobs_dir / JOBS_DB_NAME)
+
+
+_FREE_ROW = -1
+_STATUS_CODES: Dict[JobStatus, int] = {status: code for code, status in enumerate(JobStatus)}
+
+
+def _ns(dt: Optional[datetime]) -> int:
+    """Datetime as integer nanoseconds since the epoch (0 for None)"""
+    return int(dt.timestamp() * 1_000_000_000) if dt else 0
+
+
+class _JobTable:
+    """
+    Struct-of-arrays index over in-memory jobs
+
+    Status codes and created/completed timestamps live in parallel NumPy
+    columns, so filtering by status or age is one vectorized scan instead of
+    a Python loop over Job objects. Rows of deleted jobs are marked free and
+    reused. Not thread-safe; JobManager holds _jobs_lock around every call.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.ids: List[Optional[str]] = []
+        self.status = np.full(capacity, _FREE_ROW, dtype=np.int8)
+        self.created_ns = np.zeros(capacity, dtype=np.int64)
+        self.completed_ns = np.zeros(capacity, dtype=np.int64)
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+
+    def _grow(self):
+        """Double column capacity"""
+        extra = len(self.status)
+        self.status = np.concatenate([self.status, np.full(extra, _FREE_ROW, dtype=np.int8)])
+        self.created_ns = np.concatenate([self.created_ns, np.zeros(extra, dtype=np.int64)])
+        self.completed_ns = np.concatenate([self.completed_ns, np.zeros(extra, dtype=np.int64)])
+
+    def upsert(self, job: Job):
+        """Add a job or refresh its columns"""
+        row = self._rows.get(job.job_id)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+                self.ids[row] = job.job_id
+            else:
+                row = len(self.ids)
+                if row == len(self.status):
+                    self._grow()
+                self.ids.append(job.job_id)
+            self._rows[job.job_id] = row
+        self.status[row] = _STATUS_CODES[job.status]
+        self.created_ns[row] = _ns(job.created_at)
+        self.completed_ns[row] = _ns(job.completed_at)
+
+    def remove(self, job_id: str):
+        """Free a job's row"""
+        row = self._rows.pop(job_id, None)
+        if row is not None:
+            self.ids[row] = None
+            self.status[row] = _FREE_ROW
+            self._free.append(row)
+
+    def newest(self, limit: int, status: Optional[JobStatus] = None) -> List[str]:
+        """IDs of the newest `limit` jobs, optionally with a given status"""
+        if limit <= 0:
+            return []
+        n = len(self.ids)
+        codes = self.status[:n]
+        mask = codes == _STATUS_CODES[status] if status else codes != _FREE_ROW
+        rows = np.flatnonzero(mask)
+        if len(rows) > limit:
+            rows = rows[np.argpartition(self.created_ns[rows], -limit)[-limit:]]
+        rows = rows[np.argsort(self.created_ns[rows], kind='stable')[::-1]]
+        return [self.ids[row] for row in rows]
+
+    def finished_before(self, cutoff: datetime) -> List[str]:
+        """IDs of completed/failed jobs that finished before cutoff"""
+        n = len(self.ids)
+        codes = self.status[:n]
+        completed = self.completed_ns[:n]
+        mask = (
+            ((codes == _STATUS_CODES[JobStatus.COMPLETED]) | (codes == _STATUS_CODES[JobStatus.FAILED]))
+            & (completed > 0) & (completed < _ns(cutoff))
+        )
+        return [self.ids[row] for row in np.flatnonzero(mask)]
 
 
 class JobManager:
@@ -93,11 +383,29 @@ class JobManager:
 
     def __init__(self, max_workers: int = 3):
         self.jobs: Dict[str, Job] = {}
+        # Columnar status/timestamp index, kept in sync with self.jobs via _index/_set_status
+        self._table = _JobTable()
+        # Guards self.jobs/_table against worker threads and the cleanup task
+        self._jobs_lock = threading.RLock()
+        # Result of the most recent cleanup_old_jobs() run
+        self.last_cleanup: Dict = {"jobs_cleaned": 0, "jobs_remaining": 0, "ran_at": None}
         self.max_workers = max_workers
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
         self.jobs_dir = settings.jobs_path
         self.upload_dir = settings.upload_path
         self.output_dir = settings.output_path
+        self._store = _open_job_store(self.jobs_dir)
+        # Jobs queued or running in this process; with a shared store, the
+        # in-memory copy is only authoritative for these
+        self._active: set = set()
+        # Last time each running job's progress was written to the store
+        self._progress_saved: Dict[str, float] = {}
+
+        # Pending jobs as a heap of (priority, estimated_work, created_at, seq, job, detector)
+        self._pending: List[Tuple] = []
+        self._seq = count()
+        self._running = 0
+        self._dispatch_lock = threading.Lock()
 
         # Load existing jobs
         self._load_jobs()
@@ -105,24 +413,31 @@ class JobManager:
         logger.info(f"JobManager initialized with {max_workers} workers")
 
     def _load_jobs(self):
-        """Load existing jobs from disk"""
+        """Load existing jobs from the job store, importing legacy per-job JSON files"""
         for job_file in self.jobs_dir.glob("*.json"):
             try:
-                with open(job_file, 'r') as f:
-                    data = json.load(f)
-                job = Job.from_dict(data)
-                self.jobs[job.job_id] = job
-                logger.info(f"Loaded job {job.job_id} with status {job.status}")
+                job = Job.from_dict(orjson.loads(job_file.read_bytes()))
+                self._store.save(job)
+                job_file.unlink()
+                logger.info(f"Imported job {job.job_id} from {job_file.name}")
             except Exception as e:
-                logger.error(f"Failed to load job from {job_file}: {e}")
+                logger.error(f"Failed to import job from {job_file}: {e}")
 
-    def create_job(self, video_path: str, parameters: Optional[Dict] = None) -> Job:
+        for job_id, job, error in self._store.load_all():
+            if error is not None:
+                logger.error(f"Failed to load job {job_id}: {error}")
+                continue
+            self._index(job)
+            logger.info(f"Loaded job {job.job_id} with status {job.status}")
+
+    def create_job(self, video_path: str, parameters: Optional[Dict] = None, estimated_work: int = 0) -> Job:
         """
         Create a new detection job
 
         Args:
             video_path: Path to uploaded video
             parameters: Optional detection parameters
+            estimated_work: Estimated frame count, used for shortest-job-first dispatch
 
         Returns:
             Created Job object
@@ -138,9 +453,10 @@ class JobManager:
             parameters=parameters
         )
         job.message = "Job created, waiting to start"
+        job.estimated_work = estimated_work
 
-        self.jobs[job_id] = job
-        job.save(self.jobs_dir)
+        self._index(job)
+        self._store.save(job)
 
         logger.info(f"Created job {job_id}")
         return job
@@ -148,14 +464,65 @@ class JobManager:
     def get_job(self, job_id: str) -> Optional[Job]:
         """Get job by ID"""
         # Try memory first
-        if job_id in self.jobs:
-            return self.jobs[job_id]
+        job = self.jobs.get(job_id)
+        if job is not None and (not self._store.shared or job_id in self._active):
+            return job
+
+        # Try the job store (another worker may have updated or deleted it)
+        stored = self._store.load(job_id)
+        if stored is None:
+            if job is not None:
+                self._forget(job_id)
+            return None
+        self._index(stored)
+        return stored
+
+    def _sync_from_store(self):
+        """Refresh the in-memory index from a shared store (jobs of other workers)"""
+        if not self._store.shared:
+            return
+        stored = {job_id: job for job_id, job, error in self._store.load_all() if job is not None}
+        with self._jobs_lock:
+            for job_id in [job_id for job_id in self.jobs if job_id not in stored]:
+                if job_id not in self._active:
+                    self._forget(job_id)
+            for job_id, job in stored.items():
+                if job_id not in self._active:
+                    self._index(job)
+
+    def _forget(self, job_id: str):
+        """Drop a job from memory and the job table"""
+        with self._jobs_lock:
+            self.jobs.pop(job_id, None)
+            self._table.remove(job_id)
+
+    def _index(self, job: Job):
+        """Register a job in memory and in the job table"""
+        with self._jobs_lock:
+            self.jobs[job.job_id] = job
+            self._table.upsert(job)
+
+    def _set_status(self, job: Job, status: JobStatus) -> bool:
+        """
+        Transition a job's status, keeping the job table current
 
-        # Try loading from disk
-        job = Job.load(job_id, self.jobs_dir)
-        if job:
-            self.jobs[job_id] = job
-        return job
+        Returns False, leaving the table alone, if the job was deleted
+        meanwhile, so a still-running worker can't re-index it.
+        """
+        with self._jobs_lock:
+            job.status = status
+            if job.job_id not in self.jobs:
+                return False
+            self._table.upsert(job)
+            return True
+
+    def _save(self, job: Job) -> bool:
+        """Write a job's full state to the store, unless it was deleted meanwhile"""
+        with self._jobs_lock:
+            if job.job_id not in self.jobs:
+                return False
+            self._store.save(job)
+            return True
 
     def list_jobs(self, limit: int = 100, status_filter: Optional[JobStatus] = None) -> List[Job]:
         """
@@ -168,15 +535,15 @@ class JobManager:
         Returns:
             List of Job objects
         """
-        jobs = list(self.jobs.values())
-
-        if status_filter:
-            jobs = [j for j in jobs if j.status == status_filter]
+        self._sync_from_store()
 
-        # Sort by creation time (newest first)
-        jobs.sort(key=lambda x: x.created_at, reverse=True)
+        # Newest first; vectorized filter and partial selection over the table
+        with self._jobs_lock:
+            return [self.jobs[job_id] for job_id in self._table.newest(limit, status_filter)]
 
-        return jobs[:limit]
+    def list_job_responses(self, limit: int = 100, status_filter: Optional[JobStatus] = None) -> List[JobStatusResponse]:
+        """List jobs as API response models in a single pass"""
+        return [self._job_response(job) for job in self.list_jobs(limit, status_filter)]
 
     def delete_job(self, job_id: str) -> bool:
         """
@@ -201,32 +568,30 @@ class JobManager:
         except Exception as e:
             logger.error(f"Error deleting files for job {job_id}: {e}")
 
-        # Delete job file
-        job_file = self.jobs_dir / f"{job_id}.json"
-        if job_file.exists():
-            job_file.unlink()
-
-        # Remove from memory
-        if job_id in self.jobs:
-            del self.jobs[job_id]
+        # Remove from memory and the store under one lock, so a worker still
+        # running this job either saves before the delete or sees it gone
+        with self._jobs_lock:
+            self._forget(job_id)
+            self._store.delete(job_id)
 
         logger.info(f"Deleted job {job_id}")
         return True
 
-    def cleanup_old_jobs(self, max_age_hours: int = 24):
+    def cleanup_old_jobs(self, max_age_hours: int = 24) -> Dict:
         """
         Clean up old completed/failed jobs
 
         Args:
             max_age_hours: Maximum age in hours for completed jobs
+
+        Returns:
+            Dict with jobs_cleaned, jobs_remaining and ran_at (also kept as last_cleanup)
         """
         cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
-        jobs_to_delete = []
+        self._sync_from_store()
 
-        for job_id, job in self.jobs.items():
-            if job.status in [JobStatus.COMPLETED, JobStatus.FAILED]:
-                if job.completed_at and job.completed_at < cutoff_time:
-                    jobs_to_delete.append(job_id)
+        with self._jobs_lock:
+            jobs_to_delete = self._table.finished_before(cutoff_time)
 
         for job_id in jobs_to_delete:
             self.delete_job(job_id)
@@ -235,14 +600,33 @@ class JobManager:
         if jobs_to_delete:
             logger.info(f"Cleaned up {len(jobs_to_delete)} old jobs")
 
+        self.last_cleanup = {
+            "jobs_cleaned": len(jobs_to_delete),
+            "jobs_remaining": len(self.jobs),
+            "ran_at": datetime.now()
+        }
+        return self.last_cleanup
+
     def update_job_progress(self, job_id: str, progress: float, message: Optional[str] = None):
-        """Update job progress"""
+        """
+        Update job progress
+
+        The in-memory job (what the status endpoints read) is always
+        updated; the store is written at most every PROGRESS_SAVE_INTERVAL
+        seconds per job, since detection reports progress every frame.
+        """
         job = self.get_job(job_id)
         if job:
             job.progress = min(100.0, max(0.0, progress))
             if message:
                 job.message = message
-            job.save(self.jobs_dir)
+
+            now = time.monotonic()
+            if now - self._progress_saved.get(job_id, 0.0) >= PROGRESS_SAVE_INTERVAL:
+                self._progress_saved[job_id] = now
+                with self._jobs_lock:
+                    if job_id in self.jobs:
+                        self._store.save_progress(job)
 
     def get_job_status_response(self, job_id: str) -> Optional[JobStatusResponse]:
         """
@@ -257,10 +641,13 @@ class JobManager:
         job = self.get_job(job_id)
         if not job:
             return None
+        return self._job_response(job)
 
+    def _job_response(self, job: Job) -> JobStatusResponse:
+        """Build the API response model for a job"""
         output_video_url = None
         if job.status == JobStatus.COMPLETED and Path(job.output_path).exists():
-            output_video_url = f"/api/download/{job_id}"
+            output_video_url = f"/api/download/{job.job_id}"
 
         return JobStatusResponse(
             job_id=job.job_id,
@@ -282,61 +669,92 @@ class JobManager:
         """
         Submit a job for async processing
 
+        Jobs are queued and dispatched shortest-first (by estimated frame
+        count) as worker slots free up, instead of in arrival order.
+
         Args:
             job: Job to process
             detector: SeatOccupancyDetector instance
         """
-        loop = asyncio.get_event_loop()
-
-        def run_detection():
-            """Run detection in thread pool"""
-            try:
-                job.status = JobStatus.PROCESSING
-                job.started_at = datetime.now()
-                job.message = "Processing video..."
-                job.save(self.jobs_dir)
-
-                logger.info(f"Starting processing for job {job.job_id}")
-
-                # Progress callback
-                def progress_callback(current_frame, total_frames):
-                    progress = (current_frame / total_frames * 100) if total_frames > 0 else 0
-                    self.update_job_progress(job.job_id, progress, f"Processing frame {current_frame}/{total_frames}")
-
-                # Run detection
-                results = detector.detect_video(
-                    source_path=job.video_path,
-                    output_path=job.output_path,
-                    save_video=job.parameters.get('save_video', True),
-                    include_frame_stats=job.parameters.get('include_frame_stats', False),
-                    progress_callback=progress_callback
-                )
-
-                # Update job
-                job.status = JobStatus.COMPLETED
-                job.completed_at = datetime.now()
-                job.progress = 100.0
-                job.results = results
-                job.message = f"Completed: processed {results.total_frames} frames"
-                job.save(self.jobs_dir)
-
-                logger.info(f"Completed job {job.job_id}")
+        # This process now owns the job object; make it the indexed one
+        self._active.add(job.job_id)
+        self._index(job)
+        with self._dispatch_lock:
+            heapq.heappush(self._pending, (
+                job.priority, job.estimated_work, job.created_at, next(self._seq), job, detector
+            ))
+        self._dispatch()
+
+    def _dispatch(self):
+        """Start pending jobs, smallest estimated work first, while workers are free"""
+        with self._dispatch_lock:
+            while self._pending and self._running < self.max_workers:
+                *_, job, detector = heapq.heappop(self._pending)
+                self._running += 1
+                self.executor.submit(self._run_job, job, detector)
+
+    def _run_job(self, job: Job, detector):
+        """Run detection for one job in the thread pool, then dispatch the next"""
+        try:
+            self._run_detection(job, detector)
+        finally:
+            self._active.discard(job.job_id)
+            with self._dispatch_lock:
+                self._running -= 1
+            self._dispatch()
+
+    def _run_detection(self, job: Job, detector):
+        """Run detection and record the outcome on the job"""
+        try:
+            if not self._set_status(job, JobStatus.PROCESSING):
+                logger.info(f"Job {job.job_id} was deleted before it started")
+                return
+            job.started_at = datetime.now()
+            job.message = "Processing video..."
+            self._save(job)
+
+            logger.info(f"Starting processing for job {job.job_id}")
+
+            # Progress callback
+            def progress_callback(current_frame, total_frames):
+                progress = (current_frame / total_frames * 100) if total_frames > 0 else 0
+                self.update_job_progress(job.job_id, progress, f"Processing frame {current_frame}/{total_frames}")
+
+            # Run detection
+            results = detector.detect_video(
+                source_path=job.video_path,
+                output_path=job.output_path,
+                save_video=job.parameters.get('save_video', True),
+                include_frame_stats=job.parameters.get('include_frame_stats', False),
+                progress_callback=progress_callback
+            )
+
+            # Update job
+            job.completed_at = datetime.now()
+            self._set_status(job, JobStatus.COMPLETED)
+            job.progress = 100.0
+            job.results = results
+            job.message = f"Completed: processed {results.total_frames} frames"
+            self._save(job)
+
+            logger.info(f"Completed job {job.job_id}")
 
-            except Exception as e:
-                logger.error(f"Job {job.job_id} failed: {e}", exc_info=True)
-                job.status = JobStatus.FAILED
-                job.completed_at = datetime.now()
-                job.error = str(e)
-                job.message = f"Failed: {str(e)}"
-                job.save(self.jobs_dir)
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {e}", exc_info=True)
+            job.completed_at = datetime.now()
+            self._set_status(job, JobStatus.FAILED)
+            job.error = str(e)
+            job.message = f"Failed: {str(e)}"
+            self._save(job)
 
-        # Submit to thread pool
-        await loop.run_in_executor(self.executor, run_detection)
+        finally:
+            self._progress_saved.pop(job.job_id, None)
 
     def shutdown(self):
         """Shutdown the job manager"""
         logger.info("Shutting down JobManager")
         self.executor.shutdown(wait=True)
+        self._store.close()
 
 
 # Global job manager instance
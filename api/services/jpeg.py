@@ -0,0 +1,88 @@
+"""
+JPEG decode/encode helpers for browser-captured and streamed frames
+Uses libjpeg-turbo via PyTurboJPEG when available, OpenCV otherwise; frames
+streamed from a CUDA detector can be encoded on the GPU with nvJPEG
+"""
+import logging
+import cv2
+import numpy as np
+import torch
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _tj = TurboJPEG()
+except (ImportError, OSError, RuntimeError):  # package or libturbojpeg missing
+    _tj = None
+
+try:
+    from torchvision.io import encode_jpeg as _tv_encode_jpeg
+except ImportError:
+    _tv_encode_jpeg = None
+
+# Cleared the first time nvJPEG encoding fails (torchvision < 0.19 has no CUDA encoder)
+_nvjpeg_ok = _tv_encode_jpeg is not None
+
+_JPEG_MAGIC = b'\xff\xd8'
+DEFAULT_JPEG_QUALITY = 75
+
+
+def decode_image(data: bytes) -> Optional[np.ndarray]:
+    """
+    Decode JPEG/PNG bytes to a BGR image
+
+    JPEGs go through TurboJPEG when installed; everything else (and any
+    TurboJPEG failure) falls back to cv2.imdecode.
+
+    Returns:
+        BGR image, or None if the bytes could not be decoded
+    """
+    if _tj is not None and data[:2] == _JPEG_MAGIC:
+        try:
+            return _tj.decode(data, pixel_format=TJPF_BGR)
+        except (OSError, ValueError) as e:
+            logger.debug("TurboJPEG decode failed, falling back to OpenCV: %s", e)
+
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def _encode_jpeg_cuda(frame: np.ndarray, quality: int, device: torch.device) -> Optional[bytes]:
+    """nvJPEG encode: upload the BGR frame, flip to RGB CHW on the GPU, copy back only the bytes"""
+    global _nvjpeg_ok
+    try:
+        img = torch.from_numpy(frame).to(device, non_blocking=True).permute(2, 0, 1).flip(0)
+        return _tv_encode_jpeg(img, quality=quality).cpu().numpy().tobytes()
+    except RuntimeError as e:
+        _nvjpeg_ok = False
+        logger.info("nvJPEG encoding unavailable, using the CPU encoder: %s", e)
+        return None
+
+
+def encode_jpeg(frame: np.ndarray, quality: int = DEFAULT_JPEG_QUALITY,
+                device: Optional[torch.device] = None) -> Optional[bytes]:
+    """
+    Encode a BGR image as JPEG
+
+    With a CUDA device, encodes on the GPU (torchvision nvJPEG); frames
+    in pinned memory upload asynchronously. Otherwise, or if that is
+    unavailable, uses TurboJPEG's SIMD encoder when installed and
+    cv2.imencode as the last resort.
+
+    Returns:
+        JPEG bytes, or None if encoding failed
+    """
+    if device is not None and device.type == 'cuda' and _nvjpeg_ok:
+        jpg = _encode_jpeg_cuda(frame, quality, device)
+        if jpg is not None:
+            return jpg
+
+    if _tj is not None:
+        try:
+            return _tj.encode(frame, quality=quality, pixel_format=TJPF_BGR)
+        except (OSError, ValueError) as e:
+            logger.debug("TurboJPEG encode failed, falling back to OpenCV: %s", e)
+
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes() if ok else None
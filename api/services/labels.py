@@ -0,0 +1,64 @@
+"""
+Cached text labels for frame overlays
+The same few label strings are drawn on every frame, so their text sizes
+(and the duration labels themselves) are computed once and reused
+"""
+import cv2
+from functools import lru_cache
+from typing import Tuple
+
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+@lru_cache(maxsize=1024)
+def label_width(text: str, scale: float = 0.6, thickness: int = 1) -> int:
+    """Pixel width of text in LABEL_FONT (cached cv2.getTextSize)"""
+    (w, _), _ = cv2.getTextSize(text, LABEL_FONT, scale, thickness)
+    return w
+
+
+@lru_cache(maxsize=1024)
+def seat_label(seat_id: int) -> Tuple[str, int]:
+    """"Seat <id>: Occupied" and its width at the webcam overlay's scale 0.6, thickness 2"""
+    label = f"Seat {seat_id}: Occupied"
+    return label, label_width(label, 0.6, 2)
+
+
+@lru_cache(maxsize=1024)
+def _occupied_label(tenths: int, exceeded: bool) -> Tuple[str, int]:
+    label = f"Occupied for {tenths / 10:.1f} seconds"
+    if exceeded:
+        label += " - TIME EXCEEDED"
+    return label, label_width(label)
+
+
+@lru_cache(maxsize=4096)
+def _exceeded_label(tenths: int) -> str:
+    return f"Time: {tenths / 10:.1f}s - EXCEEDED"
+
+
+def exceeded_label(duration: float) -> str:
+    """Webcam overlay label for a seat past the time limit (duration quantized to 0.1s like occupied_label)"""
+    return _exceeded_label(round(duration * 10))
+
+
+@lru_cache(maxsize=256)
+def info_labels(total: int, occupied: int, available: int, persons: int, chairs: int) -> Tuple[str, ...]:
+    """Webcam info overlay lines; the counts rarely change between frames"""
+    return (
+        f"Total Seats: {total}",
+        f"Occupied: {occupied}",
+        f"Available: {available}",
+        f"Person Count: {persons}",
+        f"Chair Count: {chairs}"
+    )
+
+
+def occupied_label(duration: float, exceeded: bool) -> Tuple[str, int]:
+    """
+    Label and its width for a seat occupied for duration seconds
+
+    Durations are quantized to 0.1s so a frame reuses the label built for
+    any earlier frame with the same reading.
+    """
+    return _occupied_label(round(duration * 10), exceeded)
@@ -0,0 +1,53 @@
+"""
+Scene-change gate for skipping inference on static frames
+Library footage changes slowly, so consecutive frames that look the same
+at thumbnail scale can reuse the last detections
+"""
+import cv2
+import numpy as np
+from typing import Optional
+
+GATE_THUMB_SIZE = 64  # frames are compared as 64x64 grayscale
+
+
+class MotionGate:
+    """
+    Decide per frame whether the model needs to run
+
+    A frame is compared with the last frame that was inferred (not the
+    previous frame), so slow drift still triggers inference once it adds
+    up. At most max_skip frames in a row are skipped regardless.
+    """
+
+    def __init__(self, threshold: float = 2.0, max_skip: int = 30, size: int = GATE_THUMB_SIZE):
+        """
+        Args:
+            threshold: Mean absolute gray-level difference (0-255) below
+                which a frame counts as unchanged
+            max_skip: Maximum consecutive frames to skip
+            size: Thumbnail side length
+        """
+        self.threshold = threshold
+        self.max_skip = max_skip
+        self.size = size
+        self._reference: Optional[np.ndarray] = None
+        self._skipped = 0
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        """Whether frame differs enough from the last inferred frame"""
+        thumb = cv2.resize(frame, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+
+        if (self._reference is not None and self._skipped < self.max_skip
+                and cv2.absdiff(thumb, self._reference).mean() < self.threshold):
+            self._skipped += 1
+            return False
+
+        self._reference = thumb
+        self._skipped = 0
+        return True
+
+    def reset(self):
+        """Forget the reference frame (next frame is always inferred)"""
+        self._reference = None
+        self._skipped = 0
@@ -0,0 +1,71 @@
+"""
+Batched non-maximum suppression for YOLO predictions
+"""
+import torch
+import torchvision
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+from utils.general import xywh2xyxy
+
+MAX_DET = 300  # maximum detections kept per image
+
+
+@lru_cache(maxsize=16)
+def _class_filter(classes: Tuple[int, ...], device: torch.device) -> torch.Tensor:
+    """Class-id tensor on device, built once per (classes, device) instead of per frame"""
+    return torch.tensor(classes, device=device)
+
+
+def batched_nms(
+    prediction: torch.Tensor,
+    conf_thres: float,
+    iou_thres: float,
+    classes: Optional[Sequence[int]] = None,
+    max_det: int = MAX_DET
+) -> List[torch.Tensor]:
+    """
+    Drop-in replacement for utils.general.non_max_suppression (best class
+    per box, class-aware, no merge)
+
+    Candidates from every image in the batch are filtered with tensor ops and
+    suppressed with a single torchvision.ops.batched_nms call, grouped by
+    (image, class), instead of one filter/cat/nms round per image.
+
+    Args:
+        prediction: Raw model output of shape (B, N, 5 + nc), boxes as xywh
+        conf_thres: Minimum obj_conf * cls_conf
+        iou_thres: IoU threshold for suppression
+        classes: Class ids to keep (all if None)
+        max_det: Maximum detections per image
+
+    Returns:
+        List of B tensors of shape (n, 6): x1, y1, x2, y2, conf, cls
+    """
+    batch_size, _, width = prediction.shape
+    nc = width - 5
+    device = prediction.device
+
+    # Objectness prefilter over the whole batch
+    img_idx, box_idx = (prediction[..., 4] > conf_thres).nonzero(as_tuple=True)
+    x = prediction[img_idx, box_idx]
+
+    if nc == 1:
+        scores, cls = x[:, 4], torch.zeros(len(x), dtype=torch.long, device=device)
+    else:
+        scores, cls = (x[:, 5:] * x[:, 4:5]).max(1)
+
+    keep = scores > conf_thres
+    if classes is not None:
+        keep &= torch.isin(cls, _class_filter(tuple(classes), device))
+    x, scores, cls, img_idx = x[keep], scores[keep], cls[keep], img_idx[keep]
+
+    boxes, scores = xywh2xyxy(x[:, :4]).float(), scores.float()
+    # Sorted by decreasing score, like the per-image torchvision.ops.nms path
+    kept = torchvision.ops.batched_nms(boxes, scores, img_idx * max(nc, 1) + cls, iou_thres)
+    dets = torch.cat((boxes[kept], scores[kept, None], cls[kept, None].float()), 1)
+    kept_img = img_idx[kept]
+
+    if batch_size == 1:
+        return [dets[:max_det]]
+    return [dets[kept_img == b][:max_det] for b in range(batch_size)]
@@ -0,0 +1,140 @@
+"""
+INT8 post-training quantization for the ONNX Runtime backend
+Calibrates on frames sampled from library images or videos (webcam
+captures saved by export_int8.py, or the uploaded videos) and writes a QDQ
+model, which runs on ONNX Runtime's int8 CPU kernels (VNNI on x86) and as
+an INT8 TensorRT engine on NVIDIA GPUs
+"""
+import logging
+import cv2
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.datasets import img_formats, letterbox, vid_formats
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    )
+except ImportError:
+    onnx = None
+    CalibrationDataReader = object
+    quantize_static = None
+
+MAX_CALIBRATION_VIDEOS = 8  # frames are spread over at most this many uploads
+
+
+def model_input(frame: np.ndarray, img_size: int) -> np.ndarray:
+    """Letterbox a BGR frame to a (1, 3, img_size, img_size) float32 RGB array in [0, 1]"""
+    img = letterbox(frame, img_size, auto=False)[0]
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)
+    return img[None].astype(np.float32) / 255.0
+
+
+def calibration_frames(video_dir: Path, img_size: int, num_frames: int) -> List[np.ndarray]:
+    """
+    Sample model-ready frames from the images and videos in video_dir
+
+    Still images (e.g. webcam captures) are used first, spread evenly
+    over the directory in name order; any remaining budget is taken
+    evenly across each video (and videos in name order). Frames are
+    letterboxed to a square img_size input, like the real inputs.
+
+    Returns:
+        List of (1, 3, img_size, img_size) float32 RGB arrays in [0, 1]
+    """
+    files = sorted(Path(video_dir).glob("*"))
+    images = [p for p in files if p.suffix.lower().lstrip('.') in img_formats]
+    videos = [p for p in files if p.suffix.lower().lstrip('.') in vid_formats][:MAX_CALIBRATION_VIDEOS]
+
+    frames = []
+    if images:
+        for index in np.unique(np.linspace(0, len(images) - 1, min(num_frames, len(images))).astype(int)):
+            frame = cv2.imread(str(images[index]))
+            if frame is not None:
+                frames.append(model_input(frame, img_size))
+    if len(frames) >= num_frames or not videos:
+        return frames[:num_frames]
+
+    per_video = max(1, -(-(num_frames - len(frames)) // len(videos)))
+    for video in videos:
+        cap = cv2.VideoCapture(str(video))
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        for index in np.linspace(0, max(total - 1, 0), per_video).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ok, frame = cap.read()
+            if not ok:
+                continue
+            frames.append(model_input(frame, img_size))
+        cap.release()
+        if len(frames) >= num_frames:
+            break
+    return frames[:num_frames]
+
+
+class _FrameReader(CalibrationDataReader):
+    """Feeds calibration frames to quantize_static one at a time"""
+
+    def __init__(self, input_name: str, frames: List[np.ndarray]):
+        self._inputs = iter([{input_name: frame} for frame in frames])
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        return next(self._inputs, None)
+
+
+def nodes_under(onnx_path: Path, scope: str) -> List[str]:
+    """Names of the ONNX nodes exported from the module at scope (e.g. "/model.105/")"""
+    graph = onnx.load(str(onnx_path), load_external_data=False).graph
+    return [node.name for node in graph.node if node.name.startswith(scope)]
+
+
+def quantize_onnx(
+    onnx_path: Path,
+    output_path: Path,
+    video_dir: Path,
+    img_size: int,
+    num_frames: int = 64,
+    input_name: str = "images",
+    float_scope: Optional[str] = None
+) -> Optional[Path]:
+    """
+    Statically quantize an ONNX model to INT8 (QDQ format)
+
+    Weights are quantized per channel; activation ranges come from
+    num_frames calibration frames out of video_dir. Calibrate on footage
+    from the deployed camera where possible: activation ranges fitted to
+    other scenes (lighting, distance) are the usual cause of INT8 mAP loss.
+
+    Nodes under float_scope (the Detect head) stay in float: its output
+    mixes pixel-scale boxes with [0, 1] scores in one tensor, and a single
+    Q/DQ scale over both rounds the scores away.
+
+    Returns:
+        output_path, or None if onnxruntime.quantization or calibration
+        frames are unavailable
+    """
+    if quantize_static is None:
+        logger.warning("onnxruntime.quantization is not available; skipping INT8 quantization")
+        return None
+
+    frames = calibration_frames(video_dir, img_size, num_frames)
+    if not frames:
+        logger.warning(f"No calibration images or videos in {video_dir}; skipping INT8 quantization")
+        return None
+
+    excluded = nodes_under(onnx_path, float_scope) if float_scope else []
+    logger.info(f"Quantizing {onnx_path} to INT8 with {len(frames)} calibration frames "
+                f"({len(excluded)} head nodes kept in float)")
+    quantize_static(
+        str(onnx_path), str(output_path), _FrameReader(input_name, frames),
+        quant_format=QuantFormat.QDQ,
+        nodes_to_exclude=excluded,
+        activation_type=QuantType.QInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+    return output_path
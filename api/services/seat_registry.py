@@ -0,0 +1,106 @@
+"""
+Seat registry with vectorized proximity lookup
+"""
+import numpy as np
+from typing import Optional, Tuple
+
+BoxKey = Tuple[int, int, int, int]
+
+
+class SeatRegistry(dict):
+    """
+    Mapping of seat bounding box (x1, y1, x2, y2) -> seat data
+
+    Behaves like the plain dict it replaces, but also keeps the box centers
+    in an Mx2 NumPy array (struct-of-arrays, in insertion order) so finding
+    the seat near a detection is one vectorized distance pass instead of a
+    Python loop building 2-element arrays per seat. New boxes are appended
+    in amortized O(1) into a buffer that doubles when full; any other
+    mutation rebuilds the centers lazily on next lookup.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._rebuild()
+
+    def _rebuild(self):
+        self._keys = list(self)
+        self._buffer = self._compute_centers(self._keys)
+        self._count = len(self._keys)
+        self._dirty = False
+
+    @property
+    def _centers(self) -> np.ndarray:
+        return self._buffer[:self._count]
+
+    @staticmethod
+    def _compute_centers(keys) -> np.ndarray:
+        if not keys:
+            return np.empty((0, 2), dtype=np.float64)
+        boxes = np.asarray(keys, dtype=np.float64)
+        return np.column_stack(((boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2))
+
+    def __setitem__(self, key, value):
+        if key not in self and not self._dirty:
+            if self._count == len(self._buffer):
+                grown = np.empty((max(8, 2 * self._count), 2), dtype=np.float64)
+                grown[:self._count] = self._centers
+                self._buffer = grown
+            self._buffer[self._count] = ((key[0] + key[2]) / 2, (key[1] + key[3]) / 2)
+            self._keys.append(key)
+            self._count += 1
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._dirty = True
+
+    def pop(self, *args):
+        self._dirty = True
+        return super().pop(*args)
+
+    def popitem(self):
+        self._dirty = True
+        return super().popitem()
+
+    def clear(self):
+        super().clear()
+        self._dirty = True
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._dirty = True
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def first_within(self, box_key: BoxKey, threshold: float) -> Optional[BoxKey]:
+        """
+        Find the earliest-registered seat whose center is within threshold
+        pixels of box_key's center
+
+        Returns:
+            The matching seat's box key, or None
+        """
+        return self.first_near((box_key[0] + box_key[2]) / 2, (box_key[1] + box_key[3]) / 2, threshold)
+
+    def first_near(self, cx: float, cy: float, threshold: float) -> Optional[BoxKey]:
+        """
+        Find the earliest-registered seat whose center is within threshold
+        pixels of (cx, cy)
+
+        Compares squared distances, so no square root is taken.
+
+        Returns:
+            The matching seat's box key, or None
+        """
+        if self._dirty:
+            self._rebuild()
+        if not self._keys:
+            return None
+
+        delta = self._centers - (cx, cy)
+        hits = np.flatnonzero(np.einsum('ij,ij->i', delta, delta) < threshold * threshold)
+        return self._keys[hits[0]] if len(hits) else None
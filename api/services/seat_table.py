@@ -0,0 +1,160 @@
+"""
+Struct-of-arrays seat table for the browser-frame processor
+"""
+import hashlib
+import msgspec
+import numpy as np
+from typing import List, Optional
+
+_INITIAL_CAPACITY = 64
+
+
+class SeatBox(msgspec.Struct):
+    x1: int
+    y1: int
+    x2: int
+    y2: int
+
+
+class SeatOut(msgspec.Struct):
+    """One seat in a frame response, encoded directly with msgspec.json"""
+    id: int
+    occupied: bool
+    duration: float
+    time_exceeded: bool
+    bbox: SeatBox
+
+
+class SeatTable:
+    """
+    Seat state as parallel NumPy columns, one row per seat
+
+    Columns: bboxes (N,4) int32, centers (N,2) float64, ids (N,) int32,
+    start_time / last_seen (N,) float64 and is_occupied (N,) bool. Rows
+    stay in insertion order (removal compacts instead of swap-popping),
+    so "first seat within range" keeps meaning the earliest-registered one.
+    Storage doubles when full; the public columns are views of the
+    filled rows.
+    """
+
+    def __init__(self, capacity: int = _INITIAL_CAPACITY):
+        self._count = 0
+        self._bboxes = np.empty((capacity, 4), dtype=np.int32)
+        self._centers = np.empty((capacity, 2), dtype=np.float64)
+        self._ids = np.empty(capacity, dtype=np.int32)
+        self._start_time = np.empty(capacity, dtype=np.float64)
+        self._last_seen = np.empty(capacity, dtype=np.float64)
+        self._is_occupied = np.zeros(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def bboxes(self) -> np.ndarray:
+        return self._bboxes[:self._count]
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self._count]
+
+    @property
+    def start_time(self) -> np.ndarray:
+        return self._start_time[:self._count]
+
+    @property
+    def last_seen(self) -> np.ndarray:
+        return self._last_seen[:self._count]
+
+    @property
+    def is_occupied(self) -> np.ndarray:
+        return self._is_occupied[:self._count]
+
+    @property
+    def occupied_count(self) -> int:
+        return int(np.count_nonzero(self.is_occupied))
+
+    def _grow(self):
+        capacity = 2 * len(self._ids)
+        for name in ('_bboxes', '_centers', '_ids', '_start_time', '_last_seen', '_is_occupied'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._count] = old[:self._count]
+            setattr(self, name, new)
+
+    def add(self, bbox, seat_id: int, now: float) -> int:
+        """Append an occupied seat first seen at now; returns its row"""
+        if self._count == len(self._ids):
+            self._grow()
+        row = self._count
+        x1, y1, x2, y2 = bbox
+        self._bboxes[row] = bbox
+        self._centers[row] = ((x1 + x2) / 2, (y1 + y2) / 2)
+        self._ids[row] = seat_id
+        self._start_time[row] = now
+        self._last_seen[row] = now
+        self._is_occupied[row] = True
+        self._count += 1
+        return row
+
+    def mark_seen(self, row: int, now: float):
+        """Mark a seat occupied in the current frame"""
+        self._is_occupied[row] = True
+        self._last_seen[row] = now
+
+    def first_near(self, cx: float, cy: float, threshold: float) -> Optional[int]:
+        """Row of the earliest-registered seat whose center is within threshold of (cx, cy)"""
+        if not self._count:
+            return None
+        delta = self._centers[:self._count] - (cx, cy)
+        hits = np.flatnonzero(np.einsum('ij,ij->i', delta, delta) < threshold * threshold)
+        return int(hits[0]) if len(hits) else None
+
+    def first_near_many(self, centers: np.ndarray, threshold: float) -> List[Optional[int]]:
+        """first_near() for a batch of (cx, cy) centers, as one (P, N) distance pass"""
+        if not self._count or not len(centers):
+            return [None] * len(centers)
+        delta = np.asarray(centers, dtype=np.float64)[:, None, :] - self._centers[None, :self._count]
+        hits = np.einsum('pnk,pnk->pn', delta, delta) < threshold * threshold
+        first = hits.argmax(axis=1).tolist()
+        return [row if hit else None for row, hit in zip(first, hits.any(axis=1).tolist())]
+
+    def remove_unseen_since(self, cutoff: float) -> int:
+        """Drop seats last seen before cutoff; returns how many were removed"""
+        kept = np.flatnonzero(self.last_seen >= cutoff)
+        n = len(kept)
+        removed = self._count - n
+        if removed:
+            for name in ('_bboxes', '_centers', '_ids', '_start_time', '_last_seen', '_is_occupied'):
+                column = getattr(self, name)
+                column[:n] = column[kept]
+            self._count = n
+        return removed
+
+    def clear_occupied(self):
+        """Reset every seat to unoccupied (start of the next frame)"""
+        self._is_occupied[:self._count] = False
+
+    def digest(self, now: float) -> bytes:
+        """
+        Fingerprint of the per-seat state that gets persisted (id, bbox,
+        occupied flag, whole-second duration); equal digests mean a
+        database write would change nothing
+        """
+        h = hashlib.blake2b(digest_size=8)
+        h.update(self.ids.tobytes())
+        h.update(self.bboxes.tobytes())
+        h.update(self.is_occupied.tobytes())
+        h.update((now - self.start_time).astype(np.int64).tobytes())
+        return h.digest()
+
+    def seat_structs(self, now: float, time_threshold: float) -> List[SeatOut]:
+        """Per-seat structs for API responses (one pass over the columns)"""
+        durations = now - self.start_time
+        exceeded = durations >= time_threshold
+        return [
+            SeatOut(seat_id, occupied, duration, over, SeatBox(*bbox))
+            for seat_id, occupied, duration, over, bbox in zip(
+                self.ids.tolist(), self.is_occupied.tolist(), durations.tolist(),
+                exceeded.tolist(), self.bboxes.tolist()
+            )
+        ]
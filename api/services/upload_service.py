@@ -0,0 +1,222 @@
+"""
+Streaming multipart upload handling
+Parses the request body as it arrives and writes the file part straight to
+its final path, bypassing Starlette's SpooledTemporaryFile
+"""
+import time
+import uuid
+import asyncio
+import logging
+from pathlib import Path
+from typing import BinaryIO, Collection, Dict, Optional
+
+from fastapi import Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_WRITE_BUFFER = 1 << 20  # 1MB
+MULTIPART_OVERHEAD_SLACK = 64 * 1024  # boundaries, part headers, small form fields
+
+
+class UploadError(ValueError):
+    """Malformed or unacceptable upload (maps to HTTP 400)"""
+
+
+class UploadTooLargeError(UploadError):
+    """File part exceeded the configured maximum size (maps to HTTP 413)"""
+
+
+def upload_path_for(upload_dir: Path, filename: str) -> Path:
+    """
+    Build a collision-free on-disk path for an uploaded file
+
+    The monotonic-clock prefix keeps names ordered by arrival and the random
+    suffix keeps concurrent uploads of the same file apart.
+    """
+    return upload_dir / f"{time.monotonic_ns():020d}_{uuid.uuid4().hex[:8]}_{Path(filename).name}"
+
+
+class _FileFieldWriter:
+    """MultipartParser callbacks that write one named file field to disk"""
+
+    def __init__(self, field_name: str, upload_dir: Path, max_size: int,
+                 allowed_extensions: Collection[str]):
+        self.field_name = field_name
+        self.upload_dir = upload_dir
+        self.max_size = max_size
+        self.allowed_extensions = allowed_extensions
+
+        self.path: Optional[Path] = None
+        self.size = 0
+        self._file: Optional[BinaryIO] = None
+        self._writing = False
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b''
+        self._header_value = b''
+
+    def callbacks(self) -> Dict:
+        return {
+            'on_part_begin': self.on_part_begin,
+            'on_header_field': self.on_header_field,
+            'on_header_value': self.on_header_value,
+            'on_header_end': self.on_header_end,
+            'on_headers_finished': self.on_headers_finished,
+            'on_part_data': self.on_part_data,
+            'on_part_end': self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b''
+        self._header_value = b''
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b'content-disposition', b''))
+        name = options.get(b'name', b'').decode('latin-1')
+        filename = options.get(b'filename')
+        if name != self.field_name or filename is None or self.path is not None:
+            return
+
+        filename = filename.decode('utf-8', errors='replace')
+        file_ext = Path(filename).suffix.lower().lstrip('.')
+        if file_ext not in self.allowed_extensions:
+            raise UploadError(f"Invalid file type. Allowed: {', '.join(sorted(self.allowed_extensions))}")
+
+        self.path = upload_path_for(self.upload_dir, filename)
+        self._file = open(self.path, 'wb', buffering=UPLOAD_WRITE_BUFFER)
+        self._writing = True
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self._writing:
+            return
+        self.size += end - start
+        if self.size > self.max_size:
+            raise UploadTooLargeError(
+                f"File too large. Maximum size: {self.max_size / 1024 / 1024:.0f}MB"
+            )
+        self._file.write(data[start:end])
+
+    def on_part_end(self):
+        if self._writing:
+            self._writing = False
+            self._file.close()
+
+    def close(self):
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+
+
+async def stream_upload_to_disk(
+    request: Request,
+    field_name: str,
+    upload_dir: Path,
+    max_size: int,
+    allowed_extensions: Collection[str]
+) -> Path:
+    """
+    Stream a multipart/form-data file field straight to upload_dir
+
+    The body is collected as it arrives and handed to the parser in ~1MB
+    batches on a worker thread, so opening, writing and flushing the file
+    never block the event loop (and there is one thread hop per batch, not
+    per chunk). A partial file is removed on any failure.
+
+    A declared Content-Length larger than max_size plus multipart overhead is
+    rejected before any of the body is read. The running size check still
+    applies, for chunked bodies and clients that understate the length.
+
+    Args:
+        request: Incoming request with a multipart/form-data body
+        field_name: Form field holding the file
+        upload_dir: Destination directory
+        max_size: Maximum accepted file size in bytes
+        allowed_extensions: Accepted lowercase extensions without the dot
+
+    Returns:
+        Path of the saved file
+
+    Raises:
+        UploadError: Body is not multipart, the field is missing, or the
+            extension is not allowed
+        UploadTooLargeError: File (or the declared body) exceeds max_size
+    """
+    content_type, params = parse_options_header(request.headers.get('content-type', ''))
+    boundary = params.get(b'boundary')
+    if content_type != b'multipart/form-data' or not boundary:
+        raise UploadError("Expected a multipart/form-data body")
+
+    content_length = request.headers.get('content-length')
+    if content_length is not None:
+        try:
+            declared = int(content_length)
+        except ValueError:
+            raise UploadError("Invalid Content-Length header")
+        if declared > max_size + MULTIPART_OVERHEAD_SLACK:
+            raise UploadTooLargeError(
+                f"File too large. Maximum size: {max_size / 1024 / 1024:.0f}MB"
+            )
+
+    writer = _FileFieldWriter(field_name, upload_dir, max_size, allowed_extensions)
+    parser = MultipartParser(boundary, writer.callbacks())
+
+    def finish():
+        parser.finalize()
+        writer.close()
+
+    def discard():
+        writer.close()
+        if writer.path is not None:
+            writer.path.unlink(missing_ok=True)
+
+    # The thread call in progress; shielded so a client disconnect never
+    # closes or unlinks the file while a write is still running
+    inflight: Optional[asyncio.Future] = None
+
+    async def in_thread(fn, *args):
+        nonlocal inflight
+        inflight = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+        await asyncio.shield(inflight)
+
+    pending = []
+    pending_size = 0
+    try:
+        async for chunk in request.stream():
+            if not chunk:
+                continue
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size >= UPLOAD_WRITE_BUFFER:
+                await in_thread(parser.write, b''.join(pending))
+                pending.clear()
+                pending_size = 0
+        if pending:
+            await in_thread(parser.write, b''.join(pending))
+        await in_thread(finish)
+    except BaseException:
+        # Also on cancellation: let the running write end, then remove the partial file
+        if inflight is not None:
+            await asyncio.wait([inflight])
+            if not inflight.cancelled():
+                inflight.exception()  # retrieved (it is the error being raised, if any)
+        await asyncio.to_thread(discard)
+        raise
+
+    if writer.path is None:
+        raise UploadError(f"Missing file field '{field_name}'")
+
+    logger.debug("Streamed %d bytes to %s", writer.size, writer.path)
+    return writer.path
@@ -0,0 +1,139 @@
+"""
+Video frame source for detection jobs
+Decodes with decord in chunks when it is installed and enabled
+(VIDEO_DECODER=decord), otherwise with OpenCV. Frames come out as
+letterboxed HxWx3 BGR uint8; the channel flip and CHW permute happen on
+the inference device.
+"""
+import logging
+import cv2
+import numpy as np
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from utils.datasets import LoadImages, letterbox, vid_formats
+from api.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import decord
+except ImportError:
+    decord = None
+
+DECODE_CHUNK_SIZE = 16  # frames fetched per get_batch call
+
+
+class DecordVideoFrames:
+    """
+    LoadImages replacement for a single video file, backed by decord
+
+    Frames are fetched DECODE_CHUNK_SIZE at a time with VideoReader.get_batch
+    (multithreaded FFmpeg decode into one array) instead of one
+    VideoCapture.read() per frame. Yields (path, img, im0, cap) like
+    OpenCVVideoFrames; the reader itself stands in for cap and answers the
+    VideoCapture.get() properties the writer needs.
+    """
+
+    def __init__(self, path: str, img_size: int = 640, stride: int = 32,
+                 chunk_size: int = DECODE_CHUNK_SIZE):
+        self.path = str(Path(path).absolute())
+        self.img_size = img_size
+        self.stride = stride
+        self.chunk_size = chunk_size
+        self._reader = decord.VideoReader(self.path, ctx=decord.cpu(0))
+        self.nframes = len(self._reader)
+        self._fps = self._reader.get_avg_fps()
+        self._size: Tuple[int, int] = (0, 0)
+
+    def get(self, prop_id: int) -> float:
+        """VideoCapture.get() for the properties detection uses"""
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self._fps
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return self._size[0]
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self._size[1]
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return self.nframes
+        return 0
+
+    def __iter__(self) -> Iterator[Tuple[str, np.ndarray, np.ndarray, "DecordVideoFrames"]]:
+        for start in range(0, self.nframes, self.chunk_size):
+            indices = list(range(start, min(start + self.chunk_size, self.nframes)))
+            frames = self._reader.get_batch(indices).asnumpy()  # N x H x W x 3, RGB
+            self._size = (frames.shape[2], frames.shape[1])
+
+            for rgb in frames:
+                # One SIMD pass to BGR, shared by drawing/writing and the model input
+                im0 = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+                img = letterbox(im0, self.img_size, stride=self.stride)[0]
+                yield self.path, img, im0, self
+
+    def __len__(self) -> int:
+        return 1  # number of files, like LoadImages
+
+
+class OpenCVVideoFrames:
+    """
+    Single video file read with cv2.VideoCapture
+
+    Yields (path, img, im0, cap): img is the letterboxed HxWx3 BGR frame
+    (not LoadImages' flipped, transposed, contiguous 3xHxW copy), im0 the
+    original frame, cap the VideoCapture.
+    """
+
+    def __init__(self, path: str, img_size: int = 640, stride: int = 32):
+        self.path = str(Path(path).absolute())
+        self.img_size = img_size
+        self.stride = stride
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"Could not open video {self.path}")
+        self.nframes = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def __iter__(self) -> Iterator[Tuple[str, np.ndarray, np.ndarray, cv2.VideoCapture]]:
+        try:
+            while True:
+                ok, im0 = self.cap.read()
+                if not ok:
+                    break
+                yield self.path, letterbox(im0, self.img_size, stride=self.stride)[0], im0, self.cap
+        finally:
+            self.cap.release()
+
+    def __len__(self) -> int:
+        return 1  # number of files, like LoadImages
+
+
+def _hwc_frames(dataset: LoadImages) -> Iterator[Tuple[str, np.ndarray, np.ndarray, object]]:
+    """LoadImages output converted back to HxWx3 BGR (still images / directories only)"""
+    for path, img, im0, cap in dataset:
+        yield path, np.ascontiguousarray(img[::-1].transpose(1, 2, 0)), im0, cap
+
+
+def open_video_frames(source_path: str, img_size: int, stride: int, decoder: Optional[str] = None):
+    """
+    Open a frame source for source_path
+
+    Args:
+        source_path: Video file (or anything LoadImages accepts)
+        img_size: Model input size
+        stride: Model stride (for letterboxing)
+        decoder: "decord" or "opencv" (defaults to settings.video_decoder)
+
+    Returns:
+        Iterable of (path, img, im0, cap), img being letterboxed HxWx3 BGR
+        uint8; video sources also have an nframes attribute
+    """
+    decoder = (decoder or settings.video_decoder).lower()
+    is_video = Path(source_path).suffix.lower().lstrip('.') in vid_formats
+
+    if decoder == "decord" and is_video:
+        if decord is not None:
+            return DecordVideoFrames(source_path, img_size=img_size, stride=stride)
+        logger.warning("VIDEO_DECODER=decord but decord is not installed; using OpenCV")
+
+    if is_video:
+        return OpenCVVideoFrames(source_path, img_size=img_size, stride=stride)
+    return _hwc_frames(LoadImages(source_path, img_size=img_size, stride=stride))
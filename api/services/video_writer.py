@@ -0,0 +1,62 @@
+"""
+Background video writer
+Encodes annotated frames on a dedicated thread so the detection loop only
+pays a queue put per frame
+"""
+import queue
+import logging
+import threading
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WRITER_QUEUE_SIZE = 8  # frames buffered ahead of the encoder
+
+
+class AsyncVideoWriter:
+    """
+    cv2.VideoWriter whose write() hands frames to an encoder thread
+
+    The bounded queue applies backpressure: if encoding falls behind by
+    WRITER_QUEUE_SIZE frames, write() blocks until the encoder catches up.
+    Frames must not be modified after they are written.
+    """
+
+    def __init__(self, path: str, fourcc: int, fps: float, size: Tuple[int, int]):
+        """Open the underlying writer and start the encoder thread"""
+        self._writer = cv2.VideoWriter(path, fourcc, fps, size)
+        self._queue: queue.Queue = queue.Queue(maxsize=WRITER_QUEUE_SIZE)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="video-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Encoder loop; a None frame stops it"""
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            if self._error is not None:
+                continue  # drain so write() never blocks on a dead encoder
+            try:
+                self._writer.write(frame)
+            except Exception as e:
+                logger.error(f"Video writer failed: {e}")
+                self._error = e
+
+    def write(self, frame: np.ndarray):
+        """Queue a frame for encoding"""
+        if self._error is not None:
+            raise self._error
+        self._queue.put(frame)
+
+    def release(self):
+        """Encode the remaining frames and close the file"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._writer.release()
+        if self._error is not None:
+            raise self._error
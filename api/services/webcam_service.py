@@ -4,21 +4,192 @@ Real-time webcam detection service with WebSocket support
 import cv2
 import time
 import torch
+import torch.nn.functional as F
+import queue
 import logging
 import asyncio
+import threading
 import numpy as np
-from typing import Optional, Dict, List, Callable
+from typing import Optional, Dict, List, Callable, Tuple
 from pathlib import Path
 
-from models.experimental import attempt_load
-from utils.general import check_img_size, non_max_suppression, scale_coords, set_logging
-from utils.torch_utils import select_device, TracedModel
-from sort import Sort
+from utils.general import scale_coords, set_logging
+from utils.torch_utils import select_device
+from sort import Sort, warmup_kernels
 
 from api.config import settings
+from api.services.seat_table import SeatTable
+from api.services.nms import batched_nms
+from api.services.inference_backend import capture_cuda_graph, input_memory_format, load_model
+from api.services.inference_arbiter import get_inference_arbiter
+from api.services.camera_probe import cache_probe, camera_backends, get_cached_probe, invalidate_probe
+from api.services.jpeg import encode_jpeg
+from api.services.labels import exceeded_label, info_labels, seat_label
 
 logger = logging.getLogger(__name__)
 
+MJPEG_PART_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n'
+PIPELINE_DEPTH = 2  # frames queued between each pair of streaming stages
+_QUEUE_POLL = 0.1  # seconds; how often a blocked stage checks for shutdown
+
+
+class _StreamPipeline:
+    """
+    Capture -> inference -> JPEG encode for the running webcam, each stage
+    in its own thread
+
+    The detector runs one pipeline from start_webcam() to stop_webcam(),
+    however many clients are streaming: stream clients only wait for the
+    latest encoded frame (next_jpeg), so cap.read() and process_frame()
+    (SORT, the seat table and the device input buffers) each stay on a
+    single thread. Stages hand frames over through bounded queues, so
+    capturing and encoding neighbouring frames overlaps inference of the
+    current one. Frames live in a fixed ring of capture buffers (pinned on
+    CUDA) that return to the free list once encoded; that also bounds how
+    far capture can run ahead of inference.
+    """
+
+    def __init__(self, detector: 'WebcamDetector', depth: int = PIPELINE_DEPTH):
+        self.detector = detector
+        self._stop = threading.Event()
+        self._free: queue.Queue = queue.Queue()
+        self._captured: queue.Queue = queue.Queue(maxsize=depth)
+        self._annotated: queue.Queue = queue.Queue(maxsize=depth)
+        # Each stage holds one frame besides the ones queued between them
+        for _ in range(2 * depth + 3):
+            self._free.put(detector._capture_buffer())
+        # Latest encoded frame, its sequence number, and the stream clients
+        # waiting for a newer one (their loop and future)
+        self._latest_lock = threading.Lock()
+        self._latest: Optional[bytes] = None
+        self._seq = 0
+        self._finished = False
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._threads = [
+            threading.Thread(target=target, name=f"webcam-{name}", daemon=True)
+            for name, target in (("capture", self._capture), ("inference", self._infer),
+                                 ("encode", self._encode))
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def close(self):
+        """Stop all stages (the current frames are dropped) and end every stream"""
+        self._stop.set()
+        for thread in self._threads:
+            # No timeout: the capture thread must be out of cap.read()
+            # before stop_webcam() releases the camera
+            thread.join()
+        self._publish(None)
+
+    def _get(self, q: queue.Queue):
+        """Next item from q, or None once the pipeline is stopped"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_QUEUE_POLL)
+            except queue.Empty:
+                pass
+        return None
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Queue item, waiting for room; False if the pipeline was stopped"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_QUEUE_POLL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    @staticmethod
+    def _wake(future: asyncio.Future):
+        if not future.done():
+            future.set_result(None)
+
+    def _publish(self, jpg: Optional[bytes]):
+        """Make jpg the latest frame (None: the stream has ended) and wake waiting clients"""
+        with self._latest_lock:
+            if jpg is None:
+                self._finished = True
+            else:
+                self._latest = jpg
+                self._seq += 1
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(self._wake, future)
+            except RuntimeError:  # the client's event loop has closed
+                pass
+
+    async def next_jpeg(self, after: int) -> Tuple[int, Optional[bytes]]:
+        """
+        Wait for a frame newer than sequence number after
+
+        Slow clients skip frames rather than holding up the pipeline.
+
+        Returns:
+            (sequence number, JPEG bytes), or (after, None) once the
+            stream has ended
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._latest_lock:
+                if self._seq > after:
+                    return self._seq, self._latest
+                if self._finished:
+                    return after, None
+                future = loop.create_future()
+                self._waiters.append((loop, future))
+            await future
+
+    def _capture(self):
+        detector = self.detector
+        try:
+            while detector.is_running and detector.cap is not None and detector.cap.isOpened():
+                slot = self._get(self._free)
+                if slot is None:
+                    return
+                ret, frame = detector.cap.read(slot[1])
+                if not ret:
+                    logger.warning("Failed to read frame from webcam")
+                    return
+                if not self._put(self._captured, (slot, frame)):
+                    return
+        finally:
+            self._put(self._captured, None)
+
+    def _infer(self):
+        try:
+            while True:
+                item = self._get(self._captured)
+                if item is None:
+                    return
+                slot, frame = item
+                annotated, _ = self.detector.process_frame(frame, pinned=slot[0])
+                if not self._put(self._annotated, (slot, annotated)):
+                    return
+        except Exception as e:
+            logger.error(f"Webcam stream inference failed: {e}", exc_info=True)
+        finally:
+            self._put(self._annotated, None)
+
+    def _encode(self):
+        try:
+            while True:
+                item = self._get(self._annotated)
+                if item is None:
+                    return
+                slot, annotated = item
+                jpg = encode_jpeg(annotated, device=self.detector.device)
+                # Encoding has finished reading the buffer; capture may reuse it
+                self._free.put(slot)
+                if jpg:
+                    self._publish(jpg)
+        finally:
+            self._publish(None)
+
 
 class WebcamDetector:
     """Real-time webcam detection with seat occupancy tracking"""
@@ -32,9 +203,16 @@ class WebcamDetector:
         device: str = "",
         classes: Optional[List[int]] = None,
         occupancy_time_threshold: int = 10,
-        proximity_threshold: int = 100
+        proximity_threshold: int = 100,
+        infer_every: int = 1
     ):
-        """Initialize webcam detector"""
+        """
+        Initialize webcam detector
+
+        Args:
+            infer_every: Run the model on every Nth frame; frames in between
+                reuse the last detections (SORT and drawing still run)
+        """
         self.weights_path = Path(weights_path)
         self.img_size = img_size
         self.conf_threshold = conf_threshold
@@ -43,9 +221,15 @@ class WebcamDetector:
         self.classes = classes if classes is not None else [0, 56]
         self.occupancy_time_threshold = occupancy_time_threshold
         self.proximity_threshold = proximity_threshold
+        self.infer_every = max(1, infer_every)
+        # Host (N, 6) detections of the last inferred frame, and how many
+        # frames have reused them since
+        self._last_dets: Optional[np.ndarray] = None
+        self._frames_since_infer = self.infer_every
 
         # State tracking
-        self.global_identities: Dict = {}
+        # Seats are only ever appended, so a seat's id is its row + 1
+        self.seats = SeatTable()
         self.start_time: float = time.time()
         self.person_moved: int = 0
         self.occupancy_stats: Dict = {
@@ -54,6 +238,8 @@ class WebcamDetector:
             'available_seats': 0,
             'occupancy_events': []
         }
+        # Per-seat columns snapshotted each frame for the stats endpoints
+        self._seat_state: Tuple[np.ndarray, np.ndarray] = (np.zeros(0, bool), np.zeros(0, np.float64))
 
         # Initialize model
         self.device = None
@@ -61,15 +247,25 @@ class WebcamDetector:
         self.names = None
         self.half = False
         self.stride = None
+        # Reused per-frame input buffers (CUDA only): pinned capture-size BGR
+        # host staging that cap.read() fills, its uint8 device copy, and the
+        # 1x3xSxS tensor the model reads
+        self._pinned: Optional[torch.Tensor] = None
+        self._staging: Optional[np.ndarray] = None
+        self._frame_u8: Optional[torch.Tensor] = None
+        self._input: Optional[torch.Tensor] = None
 
         self._initialize_model()
 
         # Initialize SORT tracker
         self.sort_tracker = Sort(max_age=5, min_hits=2, iou_threshold=0.2)
 
-        # Webcam
+        # Webcam, and the one capture/inference/encode pipeline that runs
+        # while it is started (start_webcam and stop_webcam hold the lock)
         self.cap: Optional[cv2.VideoCapture] = None
         self.is_running = False
+        self._pipeline: Optional[_StreamPipeline] = None
+        self._lifecycle_lock = threading.Lock()
 
         logger.info(f"WebcamDetector initialized with device: {self.device}")
 
@@ -77,72 +273,106 @@ class WebcamDetector:
         """Initialize the YOLO model"""
         set_logging()
         self.device = select_device(self.device_name)
-        self.half = self.device.type != 'cpu'
 
         logger.info(f"Loading model from {self.weights_path}")
-        self.model = attempt_load(str(self.weights_path), map_location=self.device)
-        self.stride = int(self.model.stride.max())
-        self.img_size = check_img_size(self.img_size, s=self.stride)
-
-        if self.half:
-            self.model.half()
-
-        self.names = self.model.module.names if hasattr(self.model, 'module') else self.model.names
+        self.model, self.stride, self.img_size, self.names, self.half = load_model(
+            self.weights_path, self.device, self.img_size, trace=True
+        )
 
         # Warmup
         if self.device.type != 'cpu':
-            self.model(torch.zeros(1, 3, self.img_size, self.img_size)
-                      .to(self.device)
-                      .type_as(next(self.model.parameters())))
+            # channels_last: the permuted HWC frame copies in without a transpose
+            self._input = torch.zeros(1, 3, self.img_size, self.img_size,
+                                      device=self.device, dtype=torch.float16 if self.half else torch.float32
+                                      ).to(memory_format=input_memory_format(self.model, self.device))
+            self.model(self._input)
+            if settings.webcam_cuda_graph:
+                # _detect() writes every frame into self._input, which the
+                # graph reads in place
+                self.model = capture_cuda_graph(self.model, self._input)
+
+        # Compile or load SORT's numba kernels now rather than on the first frame
+        warmup_kernels()
 
         logger.info("Model loaded and warmed up")
 
-    def _is_close(self, box_key: tuple, threshold: Optional[int] = None) -> tuple:
-        """Check if bounding box is close to existing tracked seats"""
+    def _staging_frame(self, shape: tuple) -> np.ndarray:
+        """Pinned host buffer for one capture-size frame, reallocated if the size changes"""
+        if self._staging is None or self._staging.shape != shape:
+            self._pinned = torch.empty(shape, dtype=torch.uint8).pin_memory()
+            self._staging = self._pinned.numpy()
+            self._frame_u8 = torch.empty_like(self._pinned, device=self.device)
+        return self._staging
+
+    def _capture_buffer(self) -> Tuple[Optional[torch.Tensor], Optional[np.ndarray]]:
+        """
+        One more capture-size frame buffer for the streaming pipeline
+
+        Returns:
+            (pinned tensor, NumPy view of it) on CUDA once the capture
+            size is known, else (None, None) so cap.read() allocates
+        """
+        if self._staging is None:
+            return None, None
+        pinned = torch.empty(self._staging.shape, dtype=torch.uint8).pin_memory()
+        return pinned, pinned.numpy()
+
+    def _is_close(self, center: tuple, threshold: Optional[int] = None) -> tuple:
+        """
+        Check if a box center is close to an existing tracked seat
+
+        Returns:
+            (box_exist, seat row or None, first_person)
+        """
         if threshold is None:
             threshold = self.proximity_threshold
 
-        if len(self.global_identities) == 0:
-            return False, box_key, True
-
-        for existing_box_coord, data in self.global_identities.items():
-            existing_center = np.array([
-                (existing_box_coord[0] + existing_box_coord[2]) / 2,
-                (existing_box_coord[1] + existing_box_coord[3]) / 2
-            ])
-            current_center = np.array([
-                (box_key[0] + box_key[2]) / 2,
-                (box_key[1] + box_key[3]) / 2
-            ])
-            if np.linalg.norm(existing_center - current_center) < threshold:
-                return True, existing_box_coord, False
-
-        return False, box_key, False
-
-    def _draw_boxes(self, img: np.ndarray, bbox: np.ndarray, categories: Optional[np.ndarray] = None) -> np.ndarray:
-        """Draw bounding boxes and occupancy status on image"""
-        for i, box in enumerate(bbox):
-            x1, y1, x2, y2 = [int(val) for val in box]
-            cat = int(categories[i]) if categories is not None else 0
+        if len(self.seats) == 0:
+            return False, None, True
+
+        row = self.seats.first_near(center[0], center[1], threshold)
+        return row is not None, row, False
+
+    def _draw_boxes(self, img: np.ndarray, bbox: np.ndarray, categories: Optional[np.ndarray] = None,
+                    now: Optional[float] = None) -> np.ndarray:
+        """Draw bounding boxes and occupancy status on image (now: the frame's timestamp)"""
+        # Geometry for all boxes at once; the loop below only tracks and draws
+        boxes = np.asarray(bbox).astype(np.int32)
+        center_array = (boxes[:, :2] + boxes[:, 2:]) / 2
+        centers = center_array.tolist()
+        cat_array = (np.asarray(categories).astype(int) if categories is not None
+                     else np.zeros(len(boxes), dtype=int))
+        cats = cat_array.tolist()
+        if now is None:
+            now = time.time()
+
+        # New seats are only registered into an empty registry, so once
+        # seats exist they stay fixed for the frame and every person box
+        # can be matched against them in one pass
+        matches = None
+        if len(self.seats):
+            person_rows = np.flatnonzero(cat_array == 0)
+            matches = dict(zip(person_rows.tolist(), self.seats.first_near_many(
+                center_array[person_rows], self.proximity_threshold)))
+
+        for i, (x1, y1, x2, y2) in enumerate(boxes.tolist()):
+            cat = cats[i]
 
             if cat == 0:  # Person
-                box_key = (x1, y1, x2, y2)
-                box_exist, existing_box_coord, first_person = self._is_close(box_key)
+                if matches is not None:
+                    row = matches[i]
+                    box_exist, first_person = row is not None, False
+                else:
+                    box_exist, row, first_person = self._is_close(centers[i])
 
                 if not box_exist and first_person:
-                    obj_id = len(self.global_identities) + 1
-                    self.global_identities[box_key] = {
-                        'id': obj_id,
-                        'start_time': time.time(),
-                        'is_occupied': True
-                    }
+                    self.seats.add((x1, y1, x2, y2), len(self.seats) + 1, now)
                 elif box_exist:
                     if self.person_moved == 1:
                         self.person_moved = 0
-                    data = self.global_identities[existing_box_coord]
-                    obj_id = data['id']
-                    label = f"Seat {obj_id}: Occupied"
-                    (w, h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+                    obj_id = row + 1
+                    existing_box_coord = self.seats.bboxes[row].tolist()
+                    label, w = seat_label(obj_id)
                     cv2.rectangle(img, (existing_box_coord[0], existing_box_coord[1]),
                                 (existing_box_coord[2], existing_box_coord[3]), (0, 255, 0), 2)
                     cv2.rectangle(img, (existing_box_coord[0], existing_box_coord[1] - 25),
@@ -151,10 +381,9 @@ class WebcamDetector:
                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, [0, 0, 0], 2)
 
                     # Check occupancy duration
-                    duration = time.time() - data['start_time']
+                    duration = now - float(self.seats.start_time[row])
                     if duration >= self.occupancy_time_threshold:
-                        time_label = f"Time: {duration:.1f}s - EXCEEDED"
-                        cv2.putText(img, time_label, (existing_box_coord[0], existing_box_coord[1] + 20),
+                        cv2.putText(img, exceeded_label(duration), (existing_box_coord[0], existing_box_coord[1] + 20),
                                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, [0, 0, 255], 2)
                 elif not box_exist and not first_person:
                     self.person_moved = 1
@@ -168,26 +397,32 @@ class WebcamDetector:
         return img
 
     def start_webcam(self, camera_index: int = 0) -> bool:
-        """Start webcam capture"""
-        try:
-            import sys
+        """Start webcam capture and the streaming pipeline"""
+        with self._lifecycle_lock:
+            if self.is_running:
+                return True
+            return self._start_webcam(camera_index)
 
+    def _start_webcam(self, camera_index: int) -> bool:
+        try:
             logger.info(f"Attempting to open camera {camera_index}...")
 
-            # Try normal approach first
-            self.cap = cv2.VideoCapture(camera_index)
-
-            # If failed, try DirectShow on Windows
-            if not self.cap.isOpened() and sys.platform == 'win32':
-                logger.info("Retrying with DirectShow backend...")
-                self.cap = cv2.VideoCapture(camera_index, cv2.CAP_DSHOW)
-
-            # If still failed, try MSMF backend on Windows
-            if not self.cap.isOpened() and sys.platform == 'win32':
-                logger.info("Retrying with MSMF backend...")
-                self.cap = cv2.VideoCapture(camera_index, cv2.CAP_MSMF)
+            # A recent healthy probe tells us which backend works; try it first
+            backends = camera_backends()
+            probe = get_cached_probe(camera_index)
+            if probe and probe["success"] and probe["backend"] in backends:
+                backends.remove(probe["backend"])
+                backends.insert(0, probe["backend"])
+
+            for backend in backends:
+                self.cap = cv2.VideoCapture(camera_index, backend)
+                if self.cap.isOpened():
+                    break
+                self.cap.release()
+                logger.info("Retrying with next camera backend...")
 
             if not self.cap.isOpened():
+                invalidate_probe(camera_index)
                 logger.error(f"Failed to open camera {camera_index} with all backends")
                 logger.error("Possible causes:")
                 logger.error("  1. Camera is not connected")
@@ -196,21 +431,45 @@ class WebcamDetector:
                 logger.error("  4. Try a different camera index (0, 1, 2)")
                 return False
 
-            # Set camera properties
+            # Set camera properties. MJPG goes first, since it decides which
+            # resolutions and rates the camera offers: over USB 2 most
+            # webcams only reach 720p30 compressed, raw YUYV tops out lower
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+            # Queue at most one frame in the driver, so a read after a slow
+            # frame returns the newest image instead of a stale one
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
             # Try to read a test frame
             ret, frame = self.cap.read()
             if not ret or frame is None:
                 logger.error("Camera opened but cannot read frames")
+                invalidate_probe(camera_index)
                 self.cap.release()
                 self.cap = None
                 return False
 
             logger.info(f"Successfully read test frame: {frame.shape}")
+            if self._input is not None:
+                self._staging_frame(frame.shape)
+            cache_probe(camera_index, {
+                "success": True,
+                "opened": True,
+                "backend": backend,
+                "width": frame.shape[1],
+                "height": frame.shape[0],
+                "fps": int(self.cap.get(cv2.CAP_PROP_FPS)),
+                "frame_shape": list(frame.shape)
+            })
+
+            # The first streamed frame always runs the model
+            self._last_dets = None
+            self._frames_since_infer = self.infer_every
 
             self.is_running = True
+            self._pipeline = _StreamPipeline(self)
+            self._pipeline.start()
             logger.info(f"Webcam started successfully on camera {camera_index}")
             return True
         except Exception as e:
@@ -221,93 +480,122 @@ class WebcamDetector:
             return False
 
     def stop_webcam(self):
-        """Stop webcam capture"""
-        self.is_running = False
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        """Stop the streaming pipeline (ending every stream) and webcam capture"""
+        with self._lifecycle_lock:
+            self.is_running = False
+            if self._pipeline is not None:
+                self._pipeline.close()
+                self._pipeline = None
+            if self.cap:
+                self.cap.release()
+                self.cap = None
         logger.info("Webcam stopped")
 
-    def process_frame(self, frame: np.ndarray) -> tuple:
+    def _detect(self, frame: np.ndarray, pinned: Optional[torch.Tensor] = None) -> Optional[np.ndarray]:
         """
-        Process a single frame and return annotated frame + stats
+        Run the model + NMS on one frame
+
+        Args:
+            frame: BGR image from OpenCV
+            pinned: Page-locked tensor frame was captured into; uploaded
+                directly instead of through the staging buffer
 
         Returns:
-            (annotated_frame, occupancy_stats)
+            (N, 6) float32 host detections [xyxy, conf, cls] in frame
+            coordinates, or None if nothing was detected
         """
         # Prepare image
-        img = cv2.resize(frame, (self.img_size, self.img_size))
-        img = img[:, :, ::-1].transpose(2, 0, 1)  # BGR to RGB, to 3xHxW
-        img = np.ascontiguousarray(img)
-
-        img_tensor = torch.from_numpy(img).to(self.device)
-        img_tensor = img_tensor.half() if self.half else img_tensor.float()
-        img_tensor /= 255.0
-        if img_tensor.ndimension() == 3:
-            img_tensor = img_tensor.unsqueeze(0)
+        size = (self.img_size, self.img_size)
+        if self._input is not None:
+            # Upload the uint8 HWC frame at capture size (cap.read() already
+            # wrote webcam frames into the pinned buffer); BGR to RGB, HWC to
+            # CHW, the resize and the scaled float cast all happen on the GPU
+            staging = self._staging_frame(frame.shape)
+            if pinned is None or pinned.data_ptr() != frame.ctypes.data or tuple(pinned.shape) != frame.shape:
+                if frame.ctypes.data != staging.ctypes.data:
+                    np.copyto(staging, frame)
+                pinned = self._pinned
+            self._frame_u8.copy_(pinned, non_blocking=True)
+            img = self._frame_u8.permute(2, 0, 1).flip(0)[None]
+            if img.shape[2:] != self._input.shape[2:]:
+                img = F.interpolate(img.to(self._input.dtype), size=size, mode='bilinear', align_corners=False)
+            # Cast and scale in one kernel, written into the channels_last input
+            img_tensor = torch.div(img, 255.0, out=self._input)
+        else:
+            img_tensor = torch.from_numpy(cv2.resize(frame, size)).permute(2, 0, 1).flip(0)[None].float()
+            img_tensor.div_(255.0)
 
         # Inference
-        with torch.no_grad():
+        with get_inference_arbiter().realtime(), torch.inference_mode():
             pred = self.model(img_tensor, augment=False)[0]
 
-        # Apply NMS
-        pred = non_max_suppression(
-            pred,
-            self.conf_threshold,
-            self.iou_threshold,
-            classes=self.classes,
-            agnostic=False
-        )
+        # Apply NMS (one image). Its nonzero() waits for the stream, so the
+        # upload has finished reading the host buffer before the next capture
+        det = batched_nms(pred, self.conf_threshold, self.iou_threshold, classes=self.classes)[0]
+        if not len(det):
+            return None
+
+        # Rescale boxes
+        det[:, :4] = scale_coords(img_tensor.shape[2:], det[:, :4], frame.shape).round()
+
+        # Prepare for SORT: one device-to-host copy of the (N, 6) detections
+        return det.detach().cpu().numpy().astype(np.float32, copy=False)
+
+    def process_frame(self, frame: np.ndarray, pinned: Optional[torch.Tensor] = None) -> tuple:
+        """
+        Process a single frame and return annotated frame + stats
+
+        Only every infer_every-th frame runs the model; seat occupancy
+        changes over seconds, so the frames in between feed SORT the last
+        detections again and are redrawn from them.
+
+        Args:
+            frame: BGR image from OpenCV
+            pinned: Page-locked tensor frame was captured into (see _detect)
+
+        Returns:
+            (annotated_frame, occupancy_stats)
+        """
+        if self._frames_since_infer + 1 >= self.infer_every:
+            self._last_dets = self._detect(frame, pinned)
+            self._frames_since_infer = 0
+        else:
+            self._frames_since_infer += 1
+        dets_to_sort = self._last_dets
+        now = time.time()
 
         # Process detections
         person_count = 0
         chair_count = 0
 
-        for i, det in enumerate(pred):
-            if len(det):
-                # Rescale boxes
-                det[:, :4] = scale_coords(img_tensor.shape[2:], det[:, :4], frame.shape).round()
-
-                # Prepare for SORT
-                dets_to_sort = np.empty((0, 6))
-                for x1, y1, x2, y2, conf, detclass in det.cpu().detach().numpy():
-                    dets_to_sort = np.vstack((
-                        dets_to_sort,
-                        np.array([x1, y1, x2, y2, conf, detclass])
-                    ))
-
-                    if int(detclass) == 0:
-                        person_count += 1
-                    elif int(detclass) == 56:
-                        chair_count += 1
-
-                # Run SORT
-                tracked_dets = self.sort_tracker.update(dets_to_sort)
-
-                # Draw boxes
-                if len(tracked_dets) > 0:
-                    bbox_xyxy = tracked_dets[:, :4]
-                    categories = tracked_dets[:, 4]
-                    frame = self._draw_boxes(frame, bbox_xyxy, categories)
-            else:
-                self.sort_tracker.update()
-
-        # Calculate occupancy stats
-        total_seats = len(self.global_identities)
-        occupied_seats = sum(1 for data in self.global_identities.values() if data.get('is_occupied', False))
+        if dets_to_sort is not None:
+            cls = dets_to_sort[:, 5].astype(np.int32)
+            person_count = int(np.count_nonzero(cls == 0))
+            chair_count = int(np.count_nonzero(cls == 56))
+
+            # Run SORT
+            tracked_dets = self.sort_tracker.update(dets_to_sort)
+
+            # Draw boxes
+            if len(tracked_dets) > 0:
+                bbox_xyxy = tracked_dets[:, :4]
+                categories = tracked_dets[:, 4]
+                frame = self._draw_boxes(frame, bbox_xyxy, categories, now)
+        else:
+            self.sort_tracker.update()
+
+        # Calculate occupancy stats (copies: the stats endpoints read them
+        # from other threads while the table keeps growing)
+        total_seats = len(self.seats)
+        occupied = self.seats.is_occupied.copy()
+        start_times = self.seats.start_time.copy()
+        self._seat_state = (occupied, start_times)
+        occupied_seats = int(occupied.sum())
         available_seats = total_seats - occupied_seats
 
         # Add info overlay
-        info_text = [
-            f"Total Seats: {total_seats}",
-            f"Occupied: {occupied_seats}",
-            f"Available: {available_seats}",
-            f"Person Count: {person_count}",
-            f"Chair Count: {chair_count}"
-        ]
-
         y_offset = 30
-        for text in info_text:
+        for text in info_labels(total_seats, occupied_seats, available_seats, person_count, chair_count):
             cv2.putText(frame, text, (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX,
                        0.7, (255, 255, 255), 2, cv2.LINE_AA)
             y_offset += 30
@@ -318,45 +606,80 @@ class WebcamDetector:
             'occupied_seats': occupied_seats,
             'available_seats': available_seats,
             'person_count': person_count,
-            'chair_count': chair_count,
-            'seats': [
-                {
-                    'id': data['id'],
-                    'occupied': data.get('is_occupied', False),
-                    'duration': time.time() - data['start_time'],
-                    'time_exceeded': (time.time() - data['start_time']) >= self.occupancy_time_threshold
-                }
-                for bbox, data in self.global_identities.items()
-            ]
+            'chair_count': chair_count
         }
 
         return frame, self.occupancy_stats
 
     async def generate_frames(self):
         """Generator for video frames (for HTTP streaming)"""
-        while self.is_running and self.cap and self.cap.isOpened():
-            ret, frame = self.cap.read()
-            if not ret:
-                logger.warning("Failed to read frame from webcam")
+        pipeline = self._pipeline
+        if not self.is_running or pipeline is None:
+            return
+
+        # Every client reads the shared pipeline's latest JPEG; capture,
+        # inference and encoding are never duplicated per viewer
+        seq = 0
+        while True:
+            seq, jpg = await pipeline.next_jpeg(seq)
+            if jpg is None:
                 break
+            yield b''.join((MJPEG_PART_HEADER % len(jpg), jpg, b'\r\n'))
+
+    def _seat_dicts(self, occupied: np.ndarray, durations: np.ndarray, indices) -> List[Dict]:
+        """Build per-seat dicts for the given seat indices (one pass over the gathered columns)"""
+        rows = np.asarray(indices, dtype=np.intp)
+        seat_durations = durations[rows]
+        return [
+            {
+                'id': seat_id,
+                'occupied': occ,
+                'duration': duration,
+                'time_exceeded': over
+            }
+            for seat_id, occ, duration, over in zip(
+                (rows + 1).tolist(), occupied[rows].tolist(), seat_durations.tolist(),
+                (seat_durations >= self.occupancy_time_threshold).tolist()
+            )
+        ]
 
-            # Process frame
-            annotated_frame, stats = self.process_frame(frame)
-
-            # Encode frame as JPEG
-            ret, buffer = cv2.imencode('.jpg', annotated_frame)
-            if not ret:
-                continue
+    def get_occupancy_stats(self) -> Dict:
+        """Get current occupancy statistics"""
+        occupied, start_times = self._seat_state
+        durations = time.time() - start_times
+        return {**self.occupancy_stats, 'seats': self._seat_dicts(occupied, durations, range(len(occupied)))}
 
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+    def get_occupancy_delta(self, since_bitmap: Optional[bytes] = None) -> Tuple[bytes, Dict]:
+        """
+        Get occupancy statistics with only the seats that changed
 
-            await asyncio.sleep(0.033)  # ~30 FPS
+        Seat state is packed two bits per seat (occupied, time exceeded)
+        after a 4-byte little-endian seat count. Seats whose bits differ from
+        since_bitmap, a bitmap previously returned by this method, are
+        included, as are seats added since; with no since_bitmap every seat is.
 
-    def get_occupancy_stats(self) -> Dict:
-        """Get current occupancy statistics"""
-        return self.occupancy_stats
+        Returns:
+            (current bitmap, stats dict whose 'seats' holds the changed seats)
+        """
+        occupied, start_times = self._seat_state
+        seat_count = len(occupied)
+        durations = time.time() - start_times
+        exceeded = durations >= self.occupancy_time_threshold
+        bits = np.packbits(np.column_stack((occupied, exceeded)).ravel())
+
+        if since_bitmap is None or len(since_bitmap) < 4:
+            changed = np.arange(seat_count)
+        else:
+            old_count = min(int.from_bytes(since_bitmap[:4], 'little'), seat_count)
+            old = np.frombuffer(since_bitmap, dtype=np.uint8, offset=4)
+            diff = np.zeros(max(len(old), len(bits)), dtype=np.uint8)
+            diff[:len(bits)] = bits
+            diff[:len(old)] ^= old
+            flipped = np.unique(np.flatnonzero(np.unpackbits(diff)) // 2)
+            changed = np.concatenate((flipped[flipped < old_count], np.arange(old_count, seat_count)))
+
+        stats = {**self.occupancy_stats, 'seats': self._seat_dicts(occupied, durations, changed)}
+        return seat_count.to_bytes(4, 'little') + bits.tobytes(), stats
 
     def cleanup(self):
         """Cleanup resources"""
@@ -382,6 +705,7 @@ def get_webcam_detector() -> WebcamDetector:
             device=settings.model_device,
             classes=settings.detection_class_list,
             occupancy_time_threshold=settings.occupancy_time_threshold,
-            proximity_threshold=settings.occupancy_proximity_threshold
+            proximity_threshold=settings.occupancy_proximity_threshold,
+            infer_every=settings.webcam_infer_every
         )
     return _webcam_detector
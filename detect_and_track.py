@@ -225,13 +225,9 @@ def detect(save_img=False):
                     s += f"{n} {names[int(c)]}{'s' * (n > 1)}, "  # add to string
 
                 #..................USE TRACK FUNCTION....................
-                #pass an empty array to sort
-                dets_to_sort = np.empty((0,6))
-                
                 # NOTE: We send in detected object class too
-                for x1,y1,x2,y2,conf,detclass in det.cpu().detach().numpy():
-                    dets_to_sort = np.vstack((dets_to_sort, 
-                                np.array([x1, y1, x2, y2, conf, detclass])))
+                # (x1, y1, x2, y2, conf, detclass) rows, one device-to-host copy
+                dets_to_sort = det[:, :6].detach().cpu().numpy().astype(np.float64)
                 
                 # Run SORT
                 tracked_dets = sort_tracker.update(dets_to_sort)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Build the INT8 ONNX model used by MODEL_BACKEND=onnxruntime/tensorrt with MODEL_INT8=True
+
+Steps:
+  1. Optionally capture calibration stills from the library webcam (--capture)
+  2. Export <weights>.onnx if it does not exist yet
+  3. Statically quantize it to <weights>.int8.onnx (QDQ, per-channel weights),
+     calibrated on the images/videos in MODEL_INT8_CALIBRATION_DIR
+  4. Optionally compare the float and INT8 models on a validation clip (--validate)
+
+INT8 accuracy depends on the calibration data and on where the Q/DQ nodes
+go. Calibrate on frames from the camera that will be monitored, keep the
+Detect head in float (done here), and check the --validate agreement
+before switching the API over.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import torch
+
+from api.config import settings
+from api.services.camera_probe import camera_backends
+from api.services.inference_backend import detect_scope, export_onnx
+from api.services.quantization import model_input, quantize_onnx
+from models.experimental import attempt_load
+from utils.general import box_iou, check_img_size, non_max_suppression
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+
+def capture_frames(camera_index: int, count: int, interval: float, out_dir: Path) -> int:
+    """Save count webcam frames, interval seconds apart, as JPEGs in out_dir"""
+    cap = None
+    for backend in camera_backends():
+        cap = cv2.VideoCapture(camera_index, backend)
+        if cap.isOpened():
+            break
+        cap.release()
+    if cap is None or not cap.isOpened():
+        print(f"❌ Could not open camera {camera_index}")
+        return 0
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    saved = 0
+    try:
+        while saved < count:
+            ok, frame = cap.read()
+            if not ok:
+                print("❌ Camera stopped delivering frames")
+                break
+            cv2.imwrite(str(out_dir / f"calib_{stamp}_{saved:04d}.jpg"), frame)
+            saved += 1
+            print(f"\r📸 Captured {saved}/{count}", end="", flush=True)
+            time.sleep(interval)
+    finally:
+        cap.release()
+    print()
+    return saved
+
+
+def validate(float_path: Path, int8_path: Path, video: Path, img_size: int, max_frames: int):
+    """Run both models on CPU over a clip and report latency and detection agreement"""
+    if ort is None:
+        print("❌ onnxruntime is not installed; skipping validation")
+        return
+    sessions = {name: ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+                for name, path in (("float", float_path), ("int8", int8_path))}
+    elapsed = {name: 0.0 for name in sessions}
+    classes = list(settings.detection_class_list)
+    matched = total = frames = 0
+
+    cap = cv2.VideoCapture(str(video))
+    while frames < max_frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        img = model_input(frame, img_size)
+        dets = {}
+        for name, session in sessions.items():
+            start = time.perf_counter()
+            pred = session.run(None, {session.get_inputs()[0].name: img})[0]
+            elapsed[name] += time.perf_counter() - start
+            dets[name] = non_max_suppression(torch.from_numpy(pred), settings.model_conf_threshold,
+                                             settings.model_iou_threshold, classes=classes)[0]
+        reference, quantized = dets["float"], dets["int8"]
+        total += len(reference)
+        if len(reference) and len(quantized):
+            iou = box_iou(reference[:, :4], quantized[:, :4])
+            same_class = reference[:, None, 5] == quantized[None, :, 5]
+            matched += int(((iou > 0.5) & same_class).any(dim=1).sum())
+        frames += 1
+    cap.release()
+
+    if not frames:
+        print(f"❌ Could not read frames from {video}")
+        return
+    print(f"\n📊 Validation on {frames} frames of {video.name}:")
+    for name in sessions:
+        print(f"   • {name}: {1000 * elapsed[name] / frames:.1f} ms/frame")
+    if total:
+        print(f"   • INT8 recovers {100 * matched / total:.1f}% of {total} float detections (IoU>0.5, same class)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--weights', type=str, default=str(settings.weights_path), help='model.pt path')
+    parser.add_argument('--img-size', type=int, default=settings.model_img_size, help='inference size (pixels)')
+    parser.add_argument('--calib-dir', type=str, default=str(settings.int8_calibration_path),
+                        help='calibration images/videos (captures are saved here too)')
+    parser.add_argument('--frames', type=int, default=settings.model_int8_calibration_frames,
+                        help='number of calibration frames')
+    parser.add_argument('--capture', type=int, default=0, help='capture this many webcam frames first')
+    parser.add_argument('--camera', type=int, default=0, help='webcam index')
+    parser.add_argument('--interval', type=float, default=2.0, help='seconds between captured frames')
+    parser.add_argument('--force', action='store_true', help='re-quantize even if the INT8 model exists')
+    parser.add_argument('--validate', type=str, default='', help='clip to compare float and INT8 models on')
+    parser.add_argument('--validate-frames', type=int, default=500, help='frames of the clip to compare')
+    opt = parser.parse_args()
+
+    calib_dir = Path(opt.calib_dir)
+    if opt.capture and not capture_frames(opt.camera, opt.capture, opt.interval, calib_dir):
+        sys.exit(1)
+
+    model = attempt_load(opt.weights, map_location=torch.device('cpu'))
+    img_size = check_img_size(opt.img_size, s=int(model.stride.max()))
+    onnx_path = Path(settings.model_onnx_path) if settings.model_onnx_path else Path(opt.weights).with_suffix(".onnx")
+    if not onnx_path.exists():
+        export_onnx(model, img_size, onnx_path)
+
+    int8_path = onnx_path.with_suffix(".int8.onnx")
+    if int8_path.exists() and not opt.force:
+        print(f"ℹ️  {int8_path} already exists (use --force to rebuild)")
+    elif not quantize_onnx(onnx_path, int8_path, calib_dir, img_size,
+                           num_frames=opt.frames, float_scope=detect_scope(model)):
+        print("❌ Quantization failed (see the log above)")
+        sys.exit(1)
+    else:
+        print(f"✅ Wrote {int8_path}")
+
+    if opt.validate:
+        validate(onnx_path, int8_path, Path(opt.validate), img_size, opt.validate_frames)
+
+    print("💡 Set MODEL_BACKEND=onnxruntime (or tensorrt) and MODEL_INT8=True to serve it")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,11 @@ from pathlib import Path
 
 # Fix Windows console encoding for emojis
 if sys.platform == 'win32':
-    import codecs
-    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
-    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.reconfigure(encoding='utf-8', errors='replace')
+        except AttributeError:  # replaced by a non-TextIOWrapper stream
+            pass
 
 def check_requirements():
     """Check if required packages are installed"""
@@ -129,6 +131,11 @@ def main():
             host=settings.api_host,
             port=settings.api_port,
             reload=settings.api_reload,
+            # uvloop is not available on Windows
+            loop="asyncio" if sys.platform == 'win32' else "uvloop",
+            http="httptools",
+            # One process: the webcam detector and its seat state live in it
+            workers=1,
             log_level=settings.log_level.lower()
         )
     except KeyboardInterrupt:
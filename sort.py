@@ -15,19 +15,50 @@ from filterpy.kalman import KalmanFilter
 
 np.random.seed(0)
 
+#resolved once at import; a failed import inside linear_assignment was retried every frame
+try:
+    from scipy.optimize import linear_sum_assignment #C++ solver since SciPy 1.4
+except ImportError:
+    linear_sum_assignment = None
+
+#optional numba kernels for the per-frame IOU matrix and the per-track Kalman steps;
+#numba's np.linalg needs SciPy, so both have to be present (else NumPy/filterpy as before)
+try:
+    from numba import njit
+    USE_NUMBA = linear_sum_assignment is not None
+except ImportError:
+    USE_NUMBA = False
+    def njit(*args, **kwargs):
+        return lambda f: f
+
 def linear_assignment(cost_matrix):
-    try:
-        import lap #linear assignment problem solver
-        _, x, y = lap.lapjv(cost_matrix, extend_cost = True)
-        return np.array([[y[i],i] for i in x if i>=0])
-    except ImportError:
-        from scipy.optimize import linear_sum_assignment
+    if linear_sum_assignment is not None:
         x,y = linear_sum_assignment(cost_matrix)
-        return np.array(list(zip(x,y)))
+        return np.column_stack((x,y))
+    import lap #linear assignment problem solver
+    _, x, y = lap.lapjv(cost_matrix, extend_cost = True)
+    return np.array([[y[i],i] for i in x if i>=0])
+
+
+@njit(cache=True)
+def _iou_matrix(bb_test, bb_gt):
+    #loop form of iou_batch for numba: no (N,M) temporaries
+    o = np.empty((bb_test.shape[0], bb_gt.shape[0]))
+    for i in range(bb_test.shape[0]):
+        area_test = (bb_test[i,2] - bb_test[i,0]) * (bb_test[i,3] - bb_test[i,1])
+        for j in range(bb_gt.shape[0]):
+            w = max(0., min(bb_test[i,2], bb_gt[j,2]) - max(bb_test[i,0], bb_gt[j,0]))
+            h = max(0., min(bb_test[i,3], bb_gt[j,3]) - max(bb_test[i,1], bb_gt[j,1]))
+            wh = w * h
+            o[i,j] = wh / (area_test + (bb_gt[j,2] - bb_gt[j,0]) * (bb_gt[j,3] - bb_gt[j,1]) - wh)
+    return o
 
 
 """From SORT: Computes IOU between two boxes in the form [x1,y1,x2,y2]"""
 def iou_batch(bb_test, bb_gt):
+    if USE_NUMBA:
+        return _iou_matrix(np.ascontiguousarray(bb_test[:, :4], dtype=np.float64),
+                           np.ascontiguousarray(bb_gt[:, :4], dtype=np.float64))
     
     bb_gt = np.expand_dims(bb_gt, 0)
     bb_test = np.expand_dims(bb_test, 1)
@@ -66,6 +97,34 @@ def convert_x_to_bbox(x, score=None):
     else:
         return np.array([x[0]-w/2.,x[1]-h/2.,x[0]+w/2.,x[1]+h/2.,score]).reshape((1,5))
 
+#same math as filterpy's KalmanFilter.predict()/update() (Joseph-form covariance update),
+#without its per-call bookkeeping copies; x and P are updated in place
+@njit(cache=True)
+def _kf_predict(x, P, F, Q):
+    x[:] = F @ x
+    P[:] = F @ P @ F.T + Q
+
+@njit(cache=True)
+def _kf_update(x, P, z, H, R):
+    y = z - H @ x
+    PHT = P @ H.T
+    K = PHT @ np.linalg.inv(H @ PHT + R)
+    x += K @ y
+    I_KH = np.eye(x.shape[0]) - K @ H
+    P[:] = I_KH @ P @ I_KH.T + K @ R @ K.T
+
+def warmup_kernels():
+    """Compile (or load from the numba cache) the kernels before the first real frame"""
+    if not USE_NUMBA:
+        return
+    boxes = np.array([[0., 0., 10., 10.]])
+    _iou_matrix(boxes, boxes)
+    trk = KalmanBoxTracker(np.array([0., 0., 10., 10., 1., 0.]))
+    trk.predict()
+    trk.update(np.array([1., 1., 11., 11., 1., 0.]))
+    KalmanBoxTracker.count -= 1
+
+
 """This class represents the internal state of individual tracked objects observed as bbox."""
 class KalmanBoxTracker(object):
     
@@ -77,8 +136,9 @@ class KalmanBoxTracker(object):
         Parameter 'bbox' must have 'detected class' int number at the -1 position.
         """
         self.kf = KalmanFilter(dim_x=7, dim_z=4)
-        self.kf.F = np.array([[1,0,0,0,1,0,0],[0,1,0,0,0,1,0],[0,0,1,0,0,0,1],[0,0,0,1,0,0,0],[0,0,0,0,1,0,0],[0,0,0,0,0,1,0],[0,0,0,0,0,0,1]])
-        self.kf.H = np.array([[1,0,0,0,0,0,0],[0,1,0,0,0,0,0],[0,0,1,0,0,0,0],[0,0,0,1,0,0,0]])
+        #float so the numba kernels (same-dtype matmuls) can use them too
+        self.kf.F = np.array([[1,0,0,0,1,0,0],[0,1,0,0,0,1,0],[0,0,1,0,0,0,1],[0,0,0,1,0,0,0],[0,0,0,0,1,0,0],[0,0,0,0,0,1,0],[0,0,0,0,0,0,1]], dtype=float)
+        self.kf.H = np.array([[1,0,0,0,0,0,0],[0,1,0,0,0,0,0],[0,0,1,0,0,0,0],[0,0,0,1,0,0,0]], dtype=float)
 
         self.kf.R[2:,2:] *= 10. # R: Covariance matrix of measurement noise (set to high for noisy inputs -> more 'inertia' of boxes')
         self.kf.P[4:,4:] *= 1000. #give high uncertainty to the unobservable initial velocities
@@ -113,7 +173,10 @@ class KalmanBoxTracker(object):
         self.history = []
         self.hits += 1
         self.hit_streak += 1
-        self.kf.update(convert_bbox_to_z(bbox))
+        if USE_NUMBA:
+            _kf_update(self.kf.x, self.kf.P, convert_bbox_to_z(bbox).astype(float), self.kf.H, self.kf.R)
+        else:
+            self.kf.update(convert_bbox_to_z(bbox))
         self.detclass = bbox[5]
         CX = (bbox[0]+bbox[2])//2
         CY = (bbox[1]+bbox[3])//2
@@ -126,7 +189,10 @@ class KalmanBoxTracker(object):
         """
         if((self.kf.x[6]+self.kf.x[2])<=0):
             self.kf.x[6] *= 0.0
-        self.kf.predict()
+        if USE_NUMBA:
+            _kf_predict(self.kf.x, self.kf.P, self.kf.F, self.kf.Q)
+        else:
+            self.kf.predict()
         self.age += 1
         if(self.time_since_update>0):
             self.hit_streak = 0
@@ -179,31 +245,21 @@ def associate_detections_to_trackers(detections, trackers, iou_threshold = 0.5):
     else:
         matched_indices = np.empty(shape=(0,2))
     
-    unmatched_detections = []
-    for d, det in enumerate(detections):
-        if(d not in matched_indices[:,0]):
-            unmatched_detections.append(d)
-    
-    unmatched_trackers = []
-    for t, trk in enumerate(trackers):
-        if(t not in matched_indices[:,1]):
-            unmatched_trackers.append(t)
-    
-    #filter out matched with low IOU
-    matches = []
-    for m in matched_indices:
-        if(iou_matrix[m[0], m[1]]<iou_threshold):
-            unmatched_detections.append(m[0])
-            unmatched_trackers.append(m[1])
-        else:
-            matches.append(m.reshape(1,2))
-    
-    if(len(matches)==0):
-        matches = np.empty((0,2), dtype=int)
-    else:
-        matches = np.concatenate(matches, axis=0)
-        
-    return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
+    matched_indices = matched_indices.astype(int, copy=False)
+
+    #unassigned rows/columns, found with masks instead of per-index membership tests
+    det_assigned = np.zeros(len(detections), dtype=bool)
+    det_assigned[matched_indices[:,0]] = True
+    trk_assigned = np.zeros(len(trackers), dtype=bool)
+    trk_assigned[matched_indices[:,1]] = True
+
+    #filter out matched with low IOU (appended after the unassigned ones, as before)
+    low_iou = iou_matrix[matched_indices[:,0], matched_indices[:,1]] < iou_threshold
+    unmatched_detections = np.concatenate((np.flatnonzero(~det_assigned), matched_indices[low_iou,0]))
+    unmatched_trackers = np.concatenate((np.flatnonzero(~trk_assigned), matched_indices[low_iou,1]))
+    matches = matched_indices[~low_iou].reshape(-1,2)
+
+    return matches, unmatched_detections, unmatched_trackers
     
 
 class Sort(object):
@@ -273,16 +273,16 @@ async function processFrame() {
             AppState.canvasElement.height
         );
 
-        // Convert to base64 JPEG
-        const frameData = AppState.canvasElement.toDataURL('image/jpeg', 0.8);
+        // Encode as a JPEG blob (raw bytes, no base64)
+        const frameBlob = await new Promise(resolve =>
+            AppState.canvasElement.toBlob(resolve, 'image/jpeg', 0.8)
+        );
 
         // Send to backend for processing
-        const formData = new FormData();
-        formData.append('frame_data', frameData);
-
-        const response = await fetch(`${AppState.API_BASE}/api/process/frame`, {
+        const response = await fetch(`${AppState.API_BASE}/api/process/frame-raw`, {
             method: 'POST',
-            body: formData
+            headers: { 'Content-Type': 'image/jpeg' },
+            body: frameBlob
         });
 
         if (!response.ok) {
@@ -3,100 +3,270 @@
 Quick camera test script
 Run this to diagnose camera issues
 """
+import os
+
+# Set before OpenCV loads its video backends: MSMF's hardware transforms
+# can stall camera open for many seconds per index/backend tried, and the
+# failed probes would otherwise flood the console with OpenCV warnings
+os.environ.setdefault("OPENCV_VIDEOIO_MSMF_ENABLE_HW_TRANSFORMS", "0")
+os.environ.setdefault("OPENCV_VIDEOIO_MSMF_READ_WRITE_DISABLE_CONVERTERS", "1")
+os.environ.setdefault("OPENCV_LOG_LEVEL", "ERROR")
+
 import cv2
 import sys
-import codecs
+import contextlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from cv2_enumerate_cameras import enumerate_cameras
+except ImportError:
+    enumerate_cameras = None
+
+MAX_BLIND_PROBE = 3  # indices tried when cameras cannot be enumerated
+OPEN_TIMEOUT = 3.0  # seconds before an open attempt is abandoned (hung MSMF drivers)
+# Small MJPG frames come back quickly; passing them to the constructor
+# keeps DSHOW/MSMF from reopening the device on a later cap.set()
+PROBE_PARAMS = [
+    cv2.CAP_PROP_FRAME_WIDTH, 320,
+    cv2.CAP_PROP_FRAME_HEIGHT, 240,
+    cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'),
+]
+
+_IS_WIN = sys.platform == 'win32'
+_IS_LINUX = sys.platform.startswith('linux')
+_BAR = '=' * 60
+# Full reports for people at a console; redirected runs (CI, scripts) get
+# just the one-line summary
+_VERBOSE = sys.stdout.isatty()
 
 # Fix Windows console encoding
-if sys.platform == 'win32':
-    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
-    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+if _IS_WIN:
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.reconfigure(encoding='utf-8', errors='replace')
+        except AttributeError:  # replaced by a non-TextIOWrapper stream
+            pass
 
-def test_camera(index=0):
-    """Test camera access"""
-    print(f"\n{'='*60}")
-    print(f"Testing Camera {index}")
-    print(f"{'='*60}\n")
-
-    # Test 1: Normal VideoCapture
-    print(f"Test 1: Normal VideoCapture({index})...")
-    cap = cv2.VideoCapture(index)
-    if cap.isOpened():
-        print("✅ Camera opened successfully with default backend")
-        ret, frame = cap.read()
-        if ret:
-            print(f"✅ Successfully read frame: {frame.shape}")
-            cap.release()
-            return True
-        else:
-            print("❌ Camera opened but cannot read frames")
-        cap.release()
-    else:
-        print("❌ Failed with default backend")
-
-    # Test 2: DirectShow (Windows)
-    if sys.platform == 'win32':
-        print(f"\nTest 2: DirectShow backend...")
-        cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)
-        if cap.isOpened():
-            print("✅ Camera opened with DirectShow")
-            ret, frame = cap.read()
-            if ret:
-                print(f"✅ Successfully read frame: {frame.shape}")
+def camera_backends():
+    """(VideoCapture API, name) pairs to try, fastest-opening first"""
+    if _IS_WIN:
+        # The default backend on Windows is MSMF, which is slow to open;
+        # DirectShow usually works and opens quickly
+        return [(cv2.CAP_DSHOW, "DirectShow"), (cv2.CAP_MSMF, "MSMF")]
+    if _IS_LINUX:
+        return [(cv2.CAP_ANY, "default"), (cv2.CAP_V4L2, "V4L2")]
+    return [(cv2.CAP_ANY, "default")]
+
+def open_camera(index, backend):
+    """VideoCapture opened with PROBE_PARAMS (OpenCV 4.5.2+), else plainly"""
+    try:
+        return cv2.VideoCapture(index, backend, PROBE_PARAMS)
+    except (TypeError, cv2.error):
+        return cv2.VideoCapture(index, backend)
+
+class PendingOpen:
+    """
+    open_camera() running on a daemon thread
+
+    A capture that finishes opening after being abandoned is released by
+    its thread, so a hung or unwanted open never holds the device.
+    """
+
+    def __init__(self, index, backend):
+        self._lock = threading.Lock()
+        self._cap = None
+        self._abandoned = False
+        self._thread = threading.Thread(target=self._run, args=(index, backend),
+                                        name=f"open-camera-{index}", daemon=True)
+        self._thread.start()
+
+    def _run(self, index, backend):
+        cap = open_camera(index, backend)
+        with self._lock:
+            if self._abandoned:
                 cap.release()
-                return True
+            else:
+                self._cap = cap
+
+    def result(self, timeout):
+        """The VideoCapture, or None (and the open abandoned) if not done within timeout"""
+        self._thread.join(timeout)
+        with self._lock:
+            if self._cap is None:
+                self._abandoned = True
+            return self._cap
+
+    def abandon(self):
+        """Give up on the open, releasing the capture if it already exists"""
+        with self._lock:
+            self._abandoned = True
+            cap, self._cap = self._cap, None
+        if cap is not None:
             cap.release()
-        else:
-            print("❌ Failed with DirectShow")
-
-        # Test 3: MSMF (Windows)
-        print(f"\nTest 3: MSMF backend...")
-        cap = cv2.VideoCapture(index, cv2.CAP_MSMF)
-        if cap.isOpened():
-            print("✅ Camera opened with MSMF")
-            ret, frame = cap.read()
-            if ret:
-                print(f"✅ Successfully read frame: {frame.shape}")
-                cap.release()
-                return True
+
+# (index, backend) -> open started ahead of its probe (see main)
+_pending_opens = {}
+
+def open_with_timeout(index, backend, timeout=OPEN_TIMEOUT):
+    """
+    Open a camera, giving up after timeout seconds
+
+    Reuses an open started earlier for the same index and backend.
+
+    Returns:
+        The VideoCapture, or None if the open did not finish in time
+    """
+    pending = _pending_opens.pop((index, backend), None) or PendingOpen(index, backend)
+    return pending.result(timeout)
+
+@contextlib.contextmanager
+def opened_camera(index, backend):
+    """open_with_timeout() as a context manager; the capture (None on timeout) is always released"""
+    cap = open_with_timeout(index, backend)
+    try:
+        yield cap
+    finally:
+        if cap is not None:
             cap.release()
-        else:
-            print("❌ Failed with MSMF")
 
+def _try_backend(index, backend, name, log):
+    """Open camera index with one backend and check it delivers a frame"""
+    with opened_camera(index, backend) as cap:
+        if cap is None:
+            log.append(f"❌ Timed out after {OPEN_TIMEOUT:.0f}s with {name} backend\n")
+            return False
+        if not cap.isOpened():
+            log.append(f"❌ Failed with {name} backend\n")
+            return False
+        log.append(f"✅ Camera opened with {name} backend")
+        # grab() proves frames arrive without decoding one; the size
+        # the driver negotiated gives the shape read() would return
+        if cap.grab():
+            if _VERBOSE:
+                shape = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+                log.append(f"✅ Successfully read frame: {shape}")
+            return True
+        log.append("❌ Camera opened but cannot read frames\n")
+        return False
+
+def _probe_camera(index, log):
+    """Try each backend until one delivers a frame, appending report lines to log"""
+    log.append(f"\n{_BAR}")
+    log.append(f"Testing Camera {index}")
+    log.append(f"{_BAR}\n")
+
+    for test_number, (backend, name) in enumerate(camera_backends(), 1):
+        log.append(f"Test {test_number}: VideoCapture({index}) with {name} backend...")
+        if _try_backend(index, backend, name, log):
+            return True
     return False
 
+def camera_indices():
+    """
+    Indices of the cameras attached, with their names when known
+
+    cv2_enumerate_cameras lists devices without opening them, so absent
+    indices cost nothing; without it, indices 0-2 are probed blindly.
+    """
+    if enumerate_cameras is None:
+        return [(i, None) for i in range(MAX_BLIND_PROBE)]
+    if _IS_WIN:
+        api = cv2.CAP_DSHOW
+    elif _IS_LINUX:
+        api = cv2.CAP_V4L2
+    else:
+        api = cv2.CAP_ANY
+    cameras = {}
+    for info in enumerate_cameras(api):
+        # info.index carries the backend offset (e.g. 700 + n for DirectShow)
+        cameras.setdefault(info.index % 100, info.name)
+    return sorted(cameras.items())
+
+def test_camera_quiet(index):
+    """
+    Test camera access without printing
+
+    Returns:
+        (camera works, report text), so concurrent probes can print
+        their reports whole and in order
+    """
+    log = []
+    found = _probe_camera(index, log)
+    return found, "\n".join(log) + "\n"
+
+def test_camera(index=0):
+    """Test camera access, writing the report in one go"""
+    found, report = test_camera_quiet(index)
+    sys.stdout.write(report)
+    return found
+
 def main():
-    print("\n" + "="*60)
-    print("Camera Diagnostic Tool")
-    print("="*60)
-    print("\nChecking OpenCV installation...")
-    print(f"OpenCV version: {cv2.__version__}")
-    print("✅ OpenCV is installed")
-
-    # Test cameras 0, 1, 2
+    # Camera 0 on the first backend is almost always probed; start its
+    # driver initialization now so it overlaps enumeration and the banner
+    first_backend = camera_backends()[0][0]
+    _pending_opens[(0, first_backend)] = PendingOpen(0, first_backend)
+
+    if _VERBOSE:
+        print(f"\n{_BAR}")
+        print("Camera Diagnostic Tool")
+        print(_BAR)
+        print("\nChecking OpenCV installation...")
+        print(f"OpenCV version: {cv2.__version__}")
+        print("✅ OpenCV is installed")
+
+    cameras = camera_indices()
+    if _VERBOSE and enumerate_cameras is not None:
+        print(f"\nEnumerated {len(cameras)} camera(s):")
+        for i, name in cameras:
+            print(f"   {i}: {name}")
+    indices = [i for i, _ in cameras]
+    if not indices:
+        results = []
+    else:
+        # Opening a camera mostly waits on the driver (outside the GIL), so
+        # probe them concurrently; reports are printed in index order
+        with ThreadPoolExecutor(max_workers=len(indices)) as executor:
+            results = list(executor.map(test_camera_quiet, indices))
+
     cameras_found = []
-    for i in range(3):
-        if test_camera(i):
+    for i, (found, report) in zip(indices, results):
+        if _VERBOSE:
+            sys.stdout.write(report)
+        if found:
             cameras_found.append(i)
 
-    print(f"\n{'='*60}")
-    print("Summary")
-    print(f"{'='*60}")
+    if _VERBOSE:
+        write_summary(cameras_found)
+    elif cameras_found:
+        print(f"Working cameras: {cameras_found}")
+    else:
+        print("No working cameras found")
+
+    # Early opens that were never probed (camera 0 not enumerated)
+    for pending in _pending_opens.values():
+        pending.abandon()
+    _pending_opens.clear()
+
+def write_summary(cameras_found):
+    """Print the summary block with troubleshooting steps if nothing works"""
+    summary = [f"\n{_BAR}", "Summary", _BAR]
 
     if cameras_found:
-        print(f"\n✅ Found {len(cameras_found)} working camera(s): {cameras_found}")
-        print(f"\n🎯 Use camera index {cameras_found[0]} in the web app")
+        summary.append(f"\n✅ Found {len(cameras_found)} working camera(s): {cameras_found}")
+        summary.append(f"\n🎯 Use camera index {cameras_found[0]} in the web app")
     else:
-        print("\n❌ No working cameras found!")
-        print("\n📋 Troubleshooting steps:")
-        print("   1. Check if camera is physically connected")
-        print("   2. Close other applications using the camera (Zoom, Teams, Skype)")
-        print("   3. Check Windows Settings > Privacy > Camera")
-        print("   4. Enable camera access for Python/Desktop apps")
-        print("   5. Try restarting your computer")
-        print("   6. Check Device Manager for camera drivers")
-
-    print(f"\n{'='*60}\n")
+        summary.append("\n❌ No working cameras found!")
+        summary.append("\n📋 Troubleshooting steps:")
+        summary.append("   1. Check if camera is physically connected")
+        summary.append("   2. Close other applications using the camera (Zoom, Teams, Skype)")
+        summary.append("   3. Check Windows Settings > Privacy > Camera")
+        summary.append("   4. Enable camera access for Python/Desktop apps")
+        summary.append("   5. Try restarting your computer")
+        summary.append("   6. Check Device Manager for camera drivers")
+
+    summary.append(f"\n{_BAR}\n")
+    sys.stdout.write("\n".join(summary) + "\n")
 
 if __name__ == "__main__":
     try:
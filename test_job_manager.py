@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Regression tests for JobManager - run with: python test_job_manager.py
+"""
+import asyncio
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from api.models.schemas import DetectionResults, JobStatus
+from api.services import job_manager as jm
+
+
+class BlockingDetector:
+    """Detector whose detect_video waits until the test releases it"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def detect_video(self, progress_callback=None, **kwargs):
+        self.started.set()
+        self.release.wait(timeout=10)
+        if progress_callback:
+            progress_callback(1, 1)
+        return DetectionResults(
+            total_frames=1, total_detections=0, person_detections=0, chair_detections=0,
+            unique_tracked_objects=0, processing_time=0.0, fps=0.0
+        )
+
+
+class DeleteWhileRunningTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        jobs_dir = Path(self._tmp.name)
+        patcher = mock.patch.object(jm, "_open_job_store", lambda _: jm._JobStore(jobs_dir / jm.JOBS_DB_NAME))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.manager = jm.JobManager(max_workers=1)
+        self.addCleanup(self._tmp.cleanup)
+        self.addCleanup(self.manager.shutdown)
+
+    def _submit(self, detector):
+        job = self.manager.create_job(str(Path(self._tmp.name) / "missing.mp4"))
+        asyncio.run(self.manager.submit_job_async(job, detector))
+        return job
+
+    def test_delete_running_job_stays_deleted(self):
+        detector = BlockingDetector()
+        job = self._submit(detector)
+        self.assertTrue(detector.started.wait(timeout=10))
+
+        self.assertTrue(self.manager.delete_job(job.job_id))
+        detector.release.set()
+        self.manager.executor.shutdown(wait=True)
+
+        self.assertEqual(self.manager.list_jobs(), [])
+        self.assertEqual(self.manager.list_jobs(status_filter=JobStatus.COMPLETED), [])
+        self.assertIsNone(self.manager.get_job(job.job_id))
+        self.assertIsNone(self.manager._store.load(job.job_id))
+
+
+if __name__ == "__main__":
+    unittest.main()